@@ -0,0 +1,411 @@
+"""
+Reprodukálható szintetikus inbox generátor a benchmarkokhoz.
+Csak szabványos könyvtárat használ: a PDF, JPEG/PNG (EXIF/GPS blokkal vagy anélkül),
+MP3/WAV (ID3 taggel vagy anélkül), DOCX/XLSX és EXE fájlok bájtszinten készülnek.
+Az azonos seed ugyanazt a korpuszt adja.
+
+Használat: python benchmarks/corpus.py KIMENETI_MAPPA [--files 1000] [--seed 1]
+           [--mix pdf=30,jpg=25,png=5,mp3=15,wav=5,docx=8,xlsx=7,exe=5] [--duplicates 0.05]
+"""
+import argparse
+import io
+import json
+import os
+import random
+import struct
+import time
+import zipfile
+import zlib
+from pathlib import Path
+
+DEFAULT_MIX = {"pdf": 30, "jpg": 25, "png": 5, "mp3": 15, "wav": 5, "docx": 8, "xlsx": 7, "exe": 5}
+
+# a stub felismerő válaszai (fájlnév → Shazam-szerű válasz) ide kerülnek a korpusz gyökerébe
+STUB_RESPONSES = "stub_responses.json"
+
+PDF_TYPES = [
+    ("SZAMLA", ["Szamla", "Fizetendo osszeg", "Adoszam"]),
+    ("SZERZODES", ["Szerzodes", "Felek megallapodnak"]),
+    ("BIZTOSITAS", ["Biztositasi kotveny", "Biztosito"]),
+    ("BANK", ["Bankszamlakivonat", "Egyenleg"]),
+]
+ARTISTS = ["Quimby", "Kispal es a Borz", "Tankcsapda", "Republic", "Bikini", "Edda", "Omega"]
+WORDS = ["alfa", "beta", "gamma", "delta", "nyar", "tel", "utazas", "csalad", "munka", "projekt"]
+
+
+def parse_mix(text: str) -> dict:
+    """
+    "pdf=30,jpg=20" → {"pdf": 30, "jpg": 20}
+    """
+    mix = {}
+    for part in text.split(","):
+        if part.strip():
+            kind, _, weight = part.partition("=")
+            mix[kind.strip().lower()] = float(weight or 1)
+    return mix
+
+
+# ---------------------------------------------------------------- PDF
+
+def _pdf_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def make_pdf(lines: list[str], pages: int = 1) -> bytes:
+    """
+    Minimális, szabványos szöveges PDF (Helvetica), oldalanként ugyanazokkal a sorokkal
+    """
+    objects = []
+    page_ids = [4 + 2 * i for i in range(pages)]
+    objects.append(b"<< /Type /Catalog /Pages 2 0 R >>")
+    kids = " ".join(f"{pid} 0 R" for pid in page_ids)
+    objects.append(f"<< /Type /Pages /Kids [{kids}] /Count {pages} >>".encode())
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+    for i in range(pages):
+        body = ["BT", "/F1 11 Tf", "14 TL", "60 780 Td"]
+        body += [f"({_pdf_escape(line)}) '" for line in lines + [f"{i + 1}. oldal"]]
+        body.append("ET")
+        stream = "\n".join(body).encode("cp1252", "replace")
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {page_ids[i] + 1} 0 R >>".encode()
+        )
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    offsets = []
+    for number, obj in enumerate(objects, start=1):
+        offsets.append(out.tell())
+        out.write(b"%d 0 obj\n" % number + obj + b"\nendobj\n")
+    xref = out.tell()
+    out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    for offset in offsets:
+        out.write(b"%010d 00000 n \n" % offset)
+    out.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref))
+    return out.getvalue()
+
+
+def pdf_document(rng: random.Random) -> bytes:
+    tipus, keywords = rng.choice(PDF_TYPES)
+    date = f"{rng.randint(2015, 2025)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+    lines = [f"{rng.choice(keywords)} – {rng.choice(WORDS)} Kft."]
+    if tipus == "SZAMLA" and rng.random() < 0.8:
+        lines.append(f"Szamlaszam: INV-{rng.randint(2015, 2025)}-{rng.randint(1, 99999):05d}")
+    if rng.random() < 0.9:
+        lines.append(f"Kelt: {date}")
+    lines += [" ".join(rng.choices(WORDS, k=12)) for _ in range(rng.randint(5, 30))]
+    return make_pdf(lines, pages=rng.choice([1, 1, 1, 2, 3, 8]))
+
+
+# ---------------------------------------------------------------- EXIF / JPEG / PNG
+
+def _rational(value: float) -> tuple[int, int]:
+    return int(round(value * 10000)), 10000
+
+
+def make_exif(date: str | None, gps: tuple[float, float] | None) -> bytes:
+    """
+    Little-endian TIFF/EXIF blokk: IFD0 → Exif IFD (DateTimeOriginal) és GPS IFD
+    """
+    entries0 = []   # (tag, típus, darab, érték bájtok)
+    exif_ifd = []
+    gps_ifd = []
+    if date:
+        exif_ifd.append((0x9003, 2, 20, date.encode("ascii") + b"\x00"))
+    if gps:
+        lat, lon = gps
+        def dms(value):
+            value = abs(value)
+            d = int(value)
+            m = int((value - d) * 60)
+            s = (value - d - m / 60) * 3600
+            return b"".join(struct.pack("<II", *_rational(x)) for x in (d, m, s))
+        gps_ifd += [
+            (1, 2, 2, (b"N" if lat >= 0 else b"S") + b"\x00"),
+            (2, 5, 3, dms(lat)),
+            (3, 2, 2, (b"E" if lon >= 0 else b"W") + b"\x00"),
+            (4, 5, 3, dms(lon)),
+        ]
+
+    def ifd_size(entries):
+        return 2 + 12 * len(entries) + 4 + sum(len(v) for *_, v in entries if len(v) > 4)
+
+    # elrendezés: fejléc (8) | IFD0 | Exif IFD | GPS IFD
+    if exif_ifd:
+        entries0.append((0x8769, 4, 1, b"\x00" * 4))
+    if gps_ifd:
+        entries0.append((0x8825, 4, 1, b"\x00" * 4))
+    ifd0_offset = 8
+    exif_offset = ifd0_offset + ifd_size(entries0)
+    gps_offset = exif_offset + (ifd_size(exif_ifd) if exif_ifd else 0)
+    entries0 = [(tag, typ, count, struct.pack("<I", exif_offset if tag == 0x8769 else gps_offset))
+                for tag, typ, count, _ in entries0]
+
+    def pack_ifd(entries, offset):
+        data_offset = offset + 2 + 12 * len(entries) + 4
+        head = struct.pack("<H", len(entries))
+        data = b""
+        for tag, typ, count, value in sorted(entries):
+            if len(value) > 4:
+                head += struct.pack("<HHII", tag, typ, count, data_offset + len(data))
+                data += value
+            else:
+                head += struct.pack("<HHI", tag, typ, count) + value.ljust(4, b"\x00")
+        return head + struct.pack("<I", 0) + data
+
+    block = b"II*\x00" + struct.pack("<I", ifd0_offset) + pack_ifd(entries0, ifd0_offset)
+    if exif_ifd:
+        block += pack_ifd(exif_ifd, exif_offset)
+    if gps_ifd:
+        block += pack_ifd(gps_ifd, gps_offset)
+    return block
+
+
+def _segment(marker: int, payload: bytes) -> bytes:
+    return struct.pack(">BBH", 0xFF, marker, len(payload) + 2) + payload
+
+
+def make_jpeg(exif: bytes | None = None, padding: int = 0, size: int = 8, seed: int = 0) -> bytes:
+    """
+    Baseline, szürkeárnyalatos JPEG (size×size), 8×8-as blokkonként véletlen, egyszínű
+    tónussal (csak DC együtthatók). Opcionális APP1/EXIF szegmens és COM kitöltés a
+    valósághűbb fájlméretért.
+    """
+    rng = random.Random(seed)
+    blocks = ((size + 7) // 8) ** 2
+    out = bytearray(b"\xff\xd8")
+    if exif:
+        out += _segment(0xE1, b"Exif\x00\x00" + exif)
+    out += _segment(0xDB, b"\x00" + b"\x01" * 64)
+    out += _segment(0xC0, struct.pack(">BHHB", 8, size, size, 1) + b"\x01\x11\x00")
+    # DC tábla: a 0–11. kategória 4 bites kódokkal; AC tábla: egyetlen kód ("0") az EOB-ra
+    out += _segment(0xC4, b"\x00" + bytes([0, 0, 0, 12] + [0] * 12) + bytes(range(12)))
+    out += _segment(0xC4, b"\x10" + b"\x01" + b"\x00" * 15 + b"\x00")
+    remaining = padding
+    while remaining > 0:
+        chunk = min(remaining, 65000)
+        out += _segment(0xFE, b"\x00" * chunk)
+        remaining -= chunk
+    out += _segment(0xDA, b"\x01\x01\x00\x00\x3f\x00")
+    bits = []
+    previous = 0
+    for _ in range(blocks):
+        dc = rng.randint(-120, 120) * 8   # (tónus - 128) * 8, 1-es kvantálással
+        diff = dc - previous
+        previous = dc
+        category = abs(diff).bit_length()
+        extra = diff if diff >= 0 else diff + (1 << category) - 1
+        bits.append(format(category, "04b") + (format(extra, f"0{category}b") if category else "") + "0")
+    bits = "".join(bits)
+    bits += "1" * (-len(bits) % 8)
+    for i in range(0, len(bits), 8):
+        byte = int(bits[i:i + 8], 2)
+        out.append(byte)
+        if byte == 0xFF:
+            out.append(0x00)
+    out += b"\xff\xd9"
+    return bytes(out)
+
+
+def _png_chunk(kind: bytes, data: bytes) -> bytes:
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+
+
+def make_png(exif: bytes | None = None, size: int = 8, seed: int = 0) -> bytes:
+    """
+    Szürkeárnyalatos PNG, opcionális eXIf chunkkal
+    """
+    rng = random.Random(seed)
+    raw = b"".join(b"\x00" + bytes(rng.randrange(256) for _ in range(size)) for _ in range(size))
+    out = b"\x89PNG\r\n\x1a\n" + _png_chunk(b"IHDR", struct.pack(">IIBBBBB", size, size, 8, 0, 0, 0, 0))
+    if exif:
+        out += _png_chunk(b"eXIf", exif)
+    return out + _png_chunk(b"IDAT", zlib.compress(raw)) + _png_chunk(b"IEND", b"")
+
+
+def _photo_metadata(rng: random.Random):
+    date = None
+    gps = None
+    if rng.random() < 0.8:
+        date = f"{rng.randint(2012, 2025)}:{rng.randint(1, 12):02d}:{rng.randint(1, 28):02d} " \
+               f"{rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}:{rng.randint(0, 59):02d}"
+        if rng.random() < 0.5:
+            gps = (rng.uniform(45.8, 48.5), rng.uniform(16.1, 22.8))  # Magyarország
+    return make_exif(date, gps) if date else None
+
+
+# ---------------------------------------------------------------- MP3 / WAV
+
+def _id3_frame(frame_id: str, text: str) -> bytes:
+    data = b"\x03" + text.encode("utf-8")
+    return frame_id.encode("ascii") + struct.pack(">I", len(data)) + b"\x00\x00" + data
+
+
+def make_id3(title: str, artist: str) -> bytes:
+    frames = _id3_frame("TIT2", title) + _id3_frame("TPE1", artist)
+    size = len(frames)
+    synchsafe = bytes([(size >> 21) & 0x7F, (size >> 14) & 0x7F, (size >> 7) & 0x7F, size & 0x7F])
+    return b"ID3\x03\x00\x00" + synchsafe + frames
+
+
+def make_mp3(rng: random.Random, frames: int, tags: bytes | None = None) -> bytes:
+    """
+    MPEG-1 Layer III, 128 kbps, 44,1 kHz keretek (417 bájt) véletlen hangadattal
+    """
+    header = b"\xff\xfb\x90\x64"
+    body = b"".join(header + rng.randbytes(417 - 4) for _ in range(frames))
+    return (tags or b"") + body
+
+
+def make_wav(rng: random.Random, seconds: float) -> bytes:
+    rate, channels, width = 22050, 1, 2
+    data = rng.randbytes(int(rate * seconds) * channels * width)
+    fmt = struct.pack("<HHIIHH", 1, channels, rate, rate * channels * width, channels * width, width * 8)
+    body = b"WAVE" + b"fmt " + struct.pack("<I", len(fmt)) + fmt + b"data" + struct.pack("<I", len(data)) + data
+    return b"RIFF" + struct.pack("<I", len(body)) + body
+
+
+# ---------------------------------------------------------------- DOCX / XLSX / EXE
+
+def _xml_escape(text: str) -> str:
+    return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+
+def make_docx(paragraphs: list[str]) -> bytes:
+    w = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+    body = "".join(f"<w:p><w:r><w:t>{_xml_escape(p)}</w:t></w:r></w:p>" for p in paragraphs)
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("[Content_Types].xml",
+                    '<?xml version="1.0" encoding="UTF-8"?><Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+                    '<Default Extension="xml" ContentType="application/xml"/>'
+                    '<Override PartName="/word/document.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/></Types>')
+        zf.writestr("word/document.xml", f'<?xml version="1.0" encoding="UTF-8"?><w:document xmlns:w="{w}"><w:body>{body}</w:body></w:document>')
+    return buf.getvalue()
+
+
+def make_xlsx(rows: list[list[str]]) -> bytes:
+    s = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+    strings = sorted({cell for row in rows for cell in row})
+    index = {text: i for i, text in enumerate(strings)}
+    sheet = "".join(
+        f'<row r="{r + 1}">' + "".join(f'<c t="s"><v>{index[cell]}</v></c>' for cell in row) + "</row>"
+        for r, row in enumerate(rows)
+    )
+    shared = "".join(f"<si><t>{_xml_escape(text)}</t></si>" for text in strings)
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("xl/workbook.xml", f'<?xml version="1.0" encoding="UTF-8"?><workbook xmlns="{s}"><sheets><sheet name="Munka1" sheetId="1"/></sheets></workbook>')
+        zf.writestr("xl/sharedStrings.xml", f'<?xml version="1.0" encoding="UTF-8"?><sst xmlns="{s}">{shared}</sst>')
+        zf.writestr("xl/worksheets/sheet1.xml", f'<?xml version="1.0" encoding="UTF-8"?><worksheet xmlns="{s}"><sheetData>{sheet}</sheetData></worksheet>')
+    return buf.getvalue()
+
+
+def make_exe(rng: random.Random, size: int) -> bytes:
+    """
+    "MZ" fejlécű, PE aláírással ellátott álfájl (nem futtatható)
+    """
+    header = bytearray(b"MZ" + b"\x00" * 62)
+    header[0x3C:0x40] = struct.pack("<I", 64)
+    return bytes(header) + b"PE\x00\x00" + rng.randbytes(max(size - 68, 0))
+
+
+# ---------------------------------------------------------------- korpusz
+
+def make_file(kind: str, rng: random.Random, index: int, responses: dict) -> tuple[str, bytes]:
+    """
+    Egy fájl (név, tartalom) a megadott típusból
+    """
+    word = rng.choice(WORDS)
+    if kind == "pdf":
+        return f"scan_{index:06d}.pdf", pdf_document(rng)
+    if kind in ("jpg", "jpeg"):
+        return f"IMG_{index:06d}.jpg", make_jpeg(_photo_metadata(rng), padding=rng.randint(20_000, 400_000),
+                                                  size=rng.choice([32, 64, 128]), seed=index)
+    if kind == "png":
+        return f"screenshot_{index:06d}.png", make_png(_photo_metadata(rng), size=rng.choice([32, 64]), seed=index)
+    if kind == "mp3":
+        artist, title = rng.choice(ARTISTS), f"{word.capitalize()} {index}"
+        name = f"track_{index:06d}.mp3"
+        tags = None
+        if rng.random() < 0.6:
+            tags = make_id3(title, artist)
+        else:
+            responses[name] = {"track": {"title": title, "subtitle": artist, "sections": []}}
+        return name, make_mp3(rng, frames=rng.randint(50, 600), tags=tags)
+    if kind == "wav":
+        name = f"felvetel_{index:06d}.wav"
+        responses[name] = {"track": {"title": f"Felvetel {index}", "subtitle": rng.choice(ARTISTS), "sections": []}}
+        return name, make_wav(rng, seconds=rng.uniform(0.5, 5))
+    if kind == "docx":
+        tipus, keywords = rng.choice(PDF_TYPES)
+        paragraphs = [rng.choice(keywords)] + [" ".join(rng.choices(WORDS, k=10)) for _ in range(rng.randint(5, 80))]
+        return f"dokumentum_{index:06d}.docx", make_docx(paragraphs)
+    if kind == "xlsx":
+        rows = [[rng.choice(["Szamla", "Tetel", "Osszeg", word])] + [str(rng.randint(1, 10**6)) for _ in range(5)]
+                for _ in range(rng.randint(10, 500))]
+        return f"tablazat_{index:06d}.xlsx", make_xlsx(rows)
+    if kind == "exe":
+        return f"setup_{index:06d}.exe", make_exe(rng, rng.randint(50_000, 2_000_000))
+    raise ValueError(f"Ismeretlen fájltípus: {kind}")
+
+
+def generate(root: Path, files: int = 1000, seed: int = 1, mix: dict = None, duplicates: float = 0.0,
+             age: float = 3 * 3600) -> dict:
+    """
+    Korpusz generálása a root mappába (alkönyvtárakba szétszórva).
+    A fájlok mtime-ja age másodperccel korábbi, hogy a MINIMUM_AGE ne szűrje ki őket.
+    A stub felismerő válaszai a root melletti stub_responses.json fájlba kerülnek.
+
+    :return: típusonkénti darabszám
+    """
+    rng = random.Random(seed)
+    mix = mix or DEFAULT_MIX
+    kinds = list(mix)
+    weights = [mix[k] for k in kinds]
+    root = Path(root)
+    root.mkdir(parents=True, exist_ok=True)
+    subdirs = [root] + [root / f"letoltes_{i}" for i in range(4)]
+    for directory in subdirs:
+        directory.mkdir(exist_ok=True)
+
+    mtime = time.time() - age
+    counts = {}
+    responses = {}
+    written = []
+    for i in range(files):
+        if written and rng.random() < duplicates:
+            # bájtra azonos másolat más néven (böngésző "(1)" letöltés)
+            source = rng.choice(written)
+            path = source.with_name(f"{source.stem} ({i}){source.suffix}")
+            data = source.read_bytes()
+            kind = "duplicate"
+        else:
+            kind = rng.choices(kinds, weights)[0]
+            name, data = make_file(kind, rng, i, responses)
+            path = rng.choice(subdirs) / name
+        path.write_bytes(data)
+        os.utime(path, (mtime, mtime))
+        written.append(path)
+        counts[kind] = counts.get(kind, 0) + 1
+
+    (root.parent / STUB_RESPONSES).write_text(json.dumps(responses, ensure_ascii=False), encoding="utf-8")
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Szintetikus inbox generálása")
+    parser.add_argument("output", type=Path, help="a generált inbox mappa")
+    parser.add_argument("--files", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX,
+                        help="típusok súlya, pl. pdf=30,jpg=20,mp3=10")
+    parser.add_argument("--duplicates", type=float, default=0.0, help="bájtra azonos másolatok aránya")
+    args = parser.parse_args(argv)
+    counts = generate(args.output, args.files, args.seed, args.mix, args.duplicates)
+    print(json.dumps(counts, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
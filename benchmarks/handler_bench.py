@@ -0,0 +1,211 @@
+"""
+Kezelőnkénti és teljes futásos (main.main) áteresztőképesség-benchmark szintetikus inboxon.
+Minden szcenárió friss folyamatban, külön munkakönyvtárban fut (BUTLER_WORK_DIR), a hálózati
+zenefelismerést a LocalStubRecognizer helyettesíti állítható késleltetéssel.
+Mért értékek: fájl/mp, fájlonkénti késleltetés percentilisek, csúcs memória (RSS).
+Az eredmény JSON-ba menthető, és egy korábbi eredménnyel összevethető.
+
+Használat: python benchmarks/handler_bench.py [--files 300] [--seed 1] [--latency 0.05]
+           [--workers 1] [--scenarios process_pdf,main] [--output eredmeny.json] [--compare regi.json]
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from benchmarks.corpus import generate, DEFAULT_MIX, STUB_RESPONSES
+
+# szcenárió → (kezelő "modul:függvény", vagy None a teljes futáshoz; korpusz összetétel)
+SCENARIOS = {
+    "process_pdf": ("file_utils.pdf:process_pdf", {"pdf": 1}),
+    "process_image": ("file_utils.images:process_image", {"jpg": 5, "png": 1}),
+    "process_mp3": ("file_utils.mp3:process_mp3", {"mp3": 3, "wav": 1}),
+    "process_office": ("file_utils.office:process_office", {"docx": 1, "xlsx": 1}),
+    "process_exe": ("file_utils.exe:process_exe", {"exe": 1}),
+    "main": (None, DEFAULT_MIX),
+}
+
+
+def percentiles(values: list[float]) -> dict:
+    """
+    p50/p90/p99/max (legközelebbi rang módszer), milliszekundumban
+    """
+    if not values:
+        return {}
+    ordered = sorted(values)
+
+    def rank(p):
+        return ordered[min(len(ordered) - 1, max(0, int(round(p / 100 * len(ordered))) - 1))]
+
+    return {f"p{p}": round(rank(p) * 1000, 3) for p in (50, 90, 99)} | {"max": round(ordered[-1] * 1000, 3)}
+
+
+def _max_rss_mb(who) -> float | None:
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF if who == "self" else resource.RUSAGE_CHILDREN).ru_maxrss
+    return round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def install_stub(work_dir: Path, latency: float):
+    """
+    A Shazam kliens lecserélése a korpuszhoz generált válaszokat adó stub felismerőre
+    """
+    import file_utils.mp3 as mp3
+    responses_path = work_dir / STUB_RESPONSES
+    responses = json.loads(responses_path.read_text(encoding="utf-8")) if responses_path.exists() else {}
+    stub = mp3.LocalStubRecognizer(responses, latency=latency)
+    mp3.create_recognizer = lambda: stub
+
+
+def run_child(name: str, latency: float, workers: int):
+    """
+    Egy szcenárió futtatása az aktuális folyamatban (a BUTLER_WORK_DIR alatti inboxon);
+    az eredmény JSON az utolsó kimeneti sor
+    """
+    from config import cfg, WORK_DIR
+    from file_utils.common import flush_log
+    from file_utils.registry import LazyHandler
+
+    target, _mix = SCENARIOS[name]
+    files = sorted(p for p in Path(cfg["input"]).rglob("*") if p.is_file())
+    latencies = []
+    error = None
+    start = time.perf_counter()
+    try:
+        try:
+            install_stub(WORK_DIR, latency)
+        except ImportError:
+            if name in ("process_mp3", "main"):
+                raise
+        if target is None:
+            import main as butler
+            butler.main(["--workers", str(workers)])
+        else:
+            handler = LazyHandler(target).load()
+            for file_path in files:
+                t0 = time.perf_counter()
+                handler(file_path)
+                latencies.append(time.perf_counter() - t0)
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    elapsed = time.perf_counter() - start
+    flush_log()
+
+    remaining = sum(1 for p in Path(cfg["input"]).rglob("*") if p.is_file())
+    result = {
+        "files": len(files),
+        "processed": len(files) - remaining,
+        "seconds": round(elapsed, 4),
+        "files_per_sec": round(len(files) / elapsed, 2) if elapsed else None,
+        "latency_ms": percentiles(latencies),
+        "peak_rss_mb": _max_rss_mb("self"),
+        "peak_rss_children_mb": _max_rss_mb("children"),
+        "error": error,
+    }
+    print(json.dumps(result))
+
+
+def run_scenario(name: str, args) -> dict:
+    """
+    Friss korpusz generálása egy ideiglenes munkakönyvtárba, majd a szcenárió futtatása külön folyamatban
+    """
+    _target, mix = SCENARIOS[name]
+    with tempfile.TemporaryDirectory(prefix=f"butler_bench_{name}_") as tmp:
+        work_dir = Path(tmp)
+        generate(work_dir / "input", args.files, args.seed, mix, args.duplicates)
+        env = dict(os.environ, BUTLER_WORK_DIR=str(work_dir), TERM=os.environ.get("TERM", "dumb"))
+        out = subprocess.run(
+            [sys.executable, str(Path(__file__).resolve()), "--child", name,
+             "--latency", str(args.latency), "--workers", str(args.workers)],
+            cwd=ROOT, env=env, capture_output=True, text=True,
+        )
+    lines = out.stdout.strip().splitlines()
+    try:
+        return json.loads(lines[-1])
+    except (IndexError, ValueError):
+        return {"error": (out.stderr.strip().splitlines() or ["ismeretlen hiba"])[-1]}
+
+
+def git_revision() -> str | None:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True)
+        return out.stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare(results: dict, baseline_path: Path):
+    """
+    Fájl/mp és p90 késleltetés összevetése egy korábbi eredményfájllal
+    """
+    baseline = json.loads(baseline_path.read_text(encoding="utf-8")).get("scenarios", {})
+    print(f"\nÖsszevetés: {baseline_path}")
+    for name, result in results.items():
+        old = baseline.get(name)
+        if not old or not old.get("files_per_sec") or not result.get("files_per_sec"):
+            continue
+        ratio = result["files_per_sec"] / old["files_per_sec"]
+        p90 = f"  p90 {old.get('latency_ms', {}).get('p90', '-')} → {result.get('latency_ms', {}).get('p90', '-')} ms"
+        print(f"{name:<16} {old['files_per_sec']:>9.1f} → {result['files_per_sec']:>9.1f} fájl/mp  ({ratio:.2f}x){p90}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="AI File Butler kezelő benchmark")
+    parser.add_argument("--files", type=int, default=300, help="fájlok száma szcenáriónként")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--duplicates", type=float, default=0.0, help="bájtra azonos másolatok aránya")
+    parser.add_argument("--latency", type=float, default=0.05, help="a stub felismerő késleltetése (mp)")
+    parser.add_argument("--workers", type=int, default=1, help="workerek száma a main szcenárióban")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="vesszővel elválasztott lista")
+    parser.add_argument("--output", type=Path, help="eredmény JSON fájl")
+    parser.add_argument("--compare", type=Path, help="korábbi eredmény JSON az összevetéshez")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        run_child(args.child, args.latency, args.workers)
+        return
+
+    results = {}
+    for name in [n.strip() for n in args.scenarios.split(",") if n.strip()]:
+        result = run_scenario(name, args)
+        results[name] = result
+        if result.get("error") and "files_per_sec" not in result:
+            print(f"{name:<16} hiba: {result['error']}")
+            continue
+        latency = result["latency_ms"]
+        status = f"  (hiba: {result['error']})" if result["error"] else ""
+        print(f"{name:<16} {result['files_per_sec'] or 0:>9.1f} fájl/mp  "
+              f"p50 {latency.get('p50', '-')} ms  p90 {latency.get('p90', '-')} ms  p99 {latency.get('p99', '-')} ms  "
+              f"RSS {result['peak_rss_mb']} MB{status}")
+
+    report = {
+        "meta": {
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "files": args.files, "seed": args.seed, "duplicates": args.duplicates,
+            "latency": args.latency, "workers": args.workers,
+        },
+        "scenarios": results,
+    }
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
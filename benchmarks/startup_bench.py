@@ -0,0 +1,88 @@
+"""
+Hidegindítási benchmark.
+Friss Python folyamatokban méri, mennyi idő a main importja, és mennyibe kerül egy
+csak PDF-eket tartalmazó inbox első fájljáig eljutni (csak a PDF kezelő töltődik be),
+összevetve azzal, ha minden kezelő modult előre importálnánk.
+
+Használat: python benchmarks/startup_bench.py [--runs 10] [--output eredmeny.json]
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+HEAVY_MODULES = ["fitz", "PIL", "mutagen", "shazamio", "requests", "win32api", "win32com"]
+
+# Minden szcenárió egy külön folyamatban fut; JSON-t ír a stdout-ra
+SCENARIOS = {
+    "import_main": "import main",
+    "pdf_only_inbox": (
+        "import main\n"
+        "from file_utils.registry import get_handler\n"
+        "get_handler('.pdf')[0].load()"
+    ),
+    "eager_all_handlers": (
+        "import main\n"
+        "from file_utils.registry import HANDLERS\n"
+        "missing = []\n"
+        "for handler, _kind in set(HANDLERS.values()):\n"
+        "    try:\n"
+        "        handler.load()\n"
+        "    except ImportError as e:\n"
+        "        missing.append(str(e))\n"
+        "if missing:\n"
+        "    raise ImportError('; '.join(sorted(missing)))"
+    ),
+}
+
+_RUNNER = """
+import json, sys, time
+sys.argv = ["main.py"]
+t0 = time.perf_counter()
+error = None
+try:
+    exec(compile({code!r}, "<scenario>", "exec"))
+except Exception as e:
+    error = f"{{type(e).__name__}}: {{e}}"
+elapsed = time.perf_counter() - t0
+heavy = [m for m in {heavy!r} if m in sys.modules]
+print(json.dumps({{"seconds": elapsed, "heavy_modules": heavy, "error": error}}))
+"""
+
+
+def run_scenario(code: str) -> dict:
+    script = _RUNNER.format(code=code, heavy=HEAVY_MODULES)
+    out = subprocess.run([sys.executable, "-c", script], cwd=ROOT, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="AI File Butler hidegindítási benchmark")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--output", type=Path, help="eredmény JSON fájl")
+    args = parser.parse_args(argv)
+
+    results = {}
+    for name, code in SCENARIOS.items():
+        samples = [run_scenario(code) for _ in range(args.runs)]
+        times = [s["seconds"] for s in samples]
+        results[name] = {
+            "median_ms": round(statistics.median(times) * 1000, 2),
+            "min_ms": round(min(times) * 1000, 2),
+            "heavy_modules": samples[-1]["heavy_modules"],
+            "error": samples[-1]["error"],
+        }
+        status = f" (hiba: {results[name]['error']})" if results[name]["error"] else ""
+        print(f"{name:<20} medián {results[name]['median_ms']:8.2f} ms  "
+              f"nehéz modulok: {', '.join(results[name]['heavy_modules']) or '-'}{status}")
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2, ensure_ascii=False), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,10 @@
 from pathlib import Path
+import os
 import platform
 
 BASE_DIR = Path(__file__).resolve().parent
+# A munkakönyvtár (input/output) környezeti változóval áthelyezhető, pl. benchmarkhoz
+WORK_DIR = Path(os.environ.get("BUTLER_WORK_DIR") or BASE_DIR / "WORK")
 
 DEBUG = {
     "pdf": False,
@@ -12,14 +15,13 @@ DEBUG = {
 
 cfg = {
     "base": BASE_DIR,    
-    "input": BASE_DIR / "WORK" / "input",
-    "output": BASE_DIR / "WORK" / "output",           
+    "input": WORK_DIR / "input",
+    "output": WORK_DIR / "output",           
     #"office_output": Path("WORK/OFFICE"),    
     "os": platform.system()
 }
 
 LOG_DIR = cfg["output"] / "logs"
-LOG_DIR.mkdir(exist_ok=True)
 LOG_PATH = LOG_DIR / "log.txt"
 
 cfg["log"] = LOG_PATH
@@ -29,5 +31,106 @@ cfg["exe_output"] = cfg["output"] / "EXE"
 cfg["img_output"] = cfg["output"] / "IMG"
 cfg["office_output"] = cfg["output"] / "OFFICE"
 cfg["failed_output"] = cfg["output"] / "_FAILED"
+cfg["index_db"] = cfg["output"] / "index.sqlite"
+cfg["scan_checkpoint"] = cfg["output"] / "scan_checkpoint.json"
+cfg["pdf_rules"] = BASE_DIR / "pdf_rules.json"
+# helynévtár (TSV vagy GeoNames cities*.txt) és a belőle épített, memóriába leképezett bináris index
+cfg["gazetteer"] = BASE_DIR / "gazetteer.tsv"
+cfg["gazetteer_index"] = cfg["output"] / "gazetteer.bin"
+cfg["mp3_cache"] = cfg["output"] / "mp3_cache.sqlite"
+cfg["journal_dir"] = cfg["output"] / "journal"
+cfg["metrics_json"] = cfg["output"] / "metrics.json"
+# Prometheus textfile collector: a node exporter --collector.textfile.directory mappájába is irányítható
+cfg["metrics_prom"] = cfg["output"] / "butler.prom"
+cfg["profile_dir"] = cfg["output"] / "profiles"
+cfg["phash_db"] = cfg["output"] / "phash.sqlite"
+cfg["text_store"] = cfg["output"] / "texts.sqlite"
+cfg["img_review_output"] = cfg["img_output"] / "_ATNEZENDO"
+cfg["zip_output"] = cfg["output"] / "ZIP"
+# a ZIP tagok ideiglenes helye: a kimeneti mappán belül, hogy a végleges helyre átnevezés ne másoljon
+cfg["zip_staging"] = cfg["output"] / "_ZIP_TMP"
 
 MINIMUM_AGE = 2 * 3600  # 2 óra másodpercben
+
+# Watch mód: ennyi ideig kell stabilnak lennie a fájl méretének és mtime-jának
+WATCH_QUIET_SECONDS = 10
+WATCH_POLL_INTERVAL = 2.0  # eseményvárakozás / polling periódus másodpercben
+
+# Tartalom-hash index: bájtra azonos, már rendezett fájl másolatát törli (nem másolja újra)
+DEDUPLICATE = True
+HASH_CHUNK_SIZE = 1024 * 1024  # 1 MiB-os olvasási blokkok hasheléshez
+
+# Tartalom szerinti típusfelismerés: a fájl elejéből ennyit olvas be egyszer (magic bájtok, JPEG EXIF szegmens);
+# a fejléc a hash számításhoz és a kezelőkhöz is továbbmegy
+SNIFF_BYTES = 64 * 1024
+
+# ZIP archívumok tagjainak rendezése: zip-bomba elleni (és lemez- / memóriakímélő) korlátok
+ZIP_MAX_DEPTH = 3  # beágyazott archívumok mélysége (1 = csak a legkülső archívum tagjai)
+ZIP_MAX_MEMBERS = 10_000  # tagok száma összesen, a beágyazottakkal együtt
+ZIP_MAX_BYTES = 4 * 1024 ** 3  # kibontott méret összesen (4 GiB)
+ZIP_MAX_RATIO = 1000  # tagonkénti tömörítési arány felső határa
+
+# Áthelyezési terv végrehajtása (--plan): eszközök közötti másolásnál blokkméret és ellenőrzés
+MOVE_COPY_CHUNK = 16 * 1024 * 1024  # 16 MiB-os kernel oldali másolási blokkok
+MOVE_VERIFY = True  # a másolat visszaolvasása és összevetése a forrás checksumjával a forrás törlése előtt
+
+# Áthelyezési napló: True esetén minden bejegyzés után fsync (áramszünet ellen is véd, de lassabb);
+# False esetén a folyamat leállítása / OOM ellen véd
+JOURNAL_FSYNC = False
+
+# Naplózás: "text" vagy "jsonl" (strukturált, soronként egy JSON objektum)
+LOG_FORMAT = "text"
+LOG_FLUSH_INTERVAL = 1.0  # háttérírás gyakorisága másodpercben
+LOG_MAX_BYTES = 10 * 1024 * 1024  # rotáció ekkora méret fölött (0 = nincs)
+LOG_BACKUP_COUNT = 5
+
+# PDF osztályozás: ennyi oldalt / karaktert olvas legfeljebb, ha addig nem lett meg minden adat
+PDF_PAGE_BUDGET = 5
+PDF_BYTE_BUDGET = 200_000
+PDF_TOP_RATIO = None  # pl. 0.3: oldalanként csak a felső 30% szövegblokkjai
+
+# MP3 felismerés: párhuzamos kérések száma kötegelt módban, újrapróbálás rate limit esetén
+MP3_CONCURRENCY = 4
+MP3_RETRIES = 3
+MP3_BACKOFF = 2.0  # első várakozás másodpercben, utána duplázódik
+MP3_RATE = 0  # felismerési kérések másodpercenként legfeljebb (0 = nincs korlát)
+
+# Office szövegkinyerés kerete osztályozáshoz
+OFFICE_BYTE_BUDGET = 200_000
+OFFICE_ROW_BUDGET = 200
+
+# Kinyert szövegek tára (tartalom-hash szerint, zlib): újraosztályozás (--reclassify) fájlolvasás nélkül
+TEXT_STORE = True
+TEXT_STORE_LEVEL = 6
+# ennyi szöveg- / dokumentumírás megy ki egy tranzakcióban (a keresőindex frissítése is)
+TEXT_STORE_BATCH = 500
+
+# Közel-duplikátum képek (átméretezett / újratömörített másolatok): perceptuális hash (dHash, 64 bit)
+# Hamming-távolsága legfeljebb ennyi → a kép az átnézendők közé kerül
+NEAR_DUPLICATES = True
+PHASH_THRESHOLD = 6
+
+# Fordított geokódolás: a legközelebbi helynév legfeljebb ennyi km-re lehet, különben kerekített koordináta
+GEOCODE_MAX_KM = 25
+
+# Fényképek eseményekbe csoportosítása (idő és hely szerint, a teljes kötegen); --events kapcsolóval is
+PHOTO_EVENTS = False
+EVENT_GAP_HOURS = 16    # ennél nagyobb szünet két kép között új eseményt jelent (egy éjszaka még belefér)
+EVENT_RADIUS_KM = 3     # két egymást követő kép legfeljebb ilyen messze lehet egymástól
+EVENT_MIN_PHOTOS = 5    # ennyi közeli kép kell egy eseményhez; a ritkább képek a napi mappákba kerülnek
+
+# Ütemező: kezelőnként (sáv: a kezelő modulja, ill. függvénye) párhuzamossági keret és rate limit,
+# a sorrend a becsült költség szerint (legolcsóbb előre).
+# limit: legfeljebb ennyi egyszerre; negatív: a pool mérete mínusz ennyi (legalább 1); None = a teljes pool
+# rate: indítás / mp (0 = nincs korlát); cost: (alap ms, ms / MiB) a becsléshez
+SCHEDULER_LANES = {
+    "pdf": {"limit": -1, "cost": (60, 40)},  # egy worker (ha több van) a gyors fájloknak marad
+    "images": {"cost": (8, 15)},
+    "office": {"cost": (150, 60)},
+    "archives": {"cost": (50, 40)},
+    "exe": {"limit": 4, "cost": (5, 1)},
+    "move_to_known": {"cost": (1, 2)},
+    "move_to_failed": {"cost": (1, 2)},
+}
+# legfeljebb ennyi feladat várakozhat az ütemezőben; addig a bejáró nem olvas tovább (backpressure)
+SCHEDULER_WINDOW = 2000
@@ -0,0 +1,221 @@
+"""
+ZIP archívumok feldolgozása kibontás nélkül.
+A tagok egyenként, adatfolyamként jönnek ki az archívumból: a fejlécük alapján (sniff) választódik a kezelő,
+a nem támogatott tagok ki sem bontódnak. A támogatott tag a kimeneti mappán belüli ideiglenes mappába
+íródik (egyetlen írás, ugyanazon a fájlrendszeren), és a meglévő kezelő (PDF, kép, hang, Office) onnan
+nevezi át a végleges helyére – az archívum egésze sosem kerül kibontásra.
+Két fázisban dolgozik: előbb minden tag kiírása (a keretek ellenőrzésével), csak utána a rendezés,
+így egy korlát miatt elutasított archívumból egyetlen tag sem kerül a helyére.
+Zip-bomba ellen (és a memória / lemez kordában tartására) korlátozott a beágyazási mélység, a tagok száma
+és a kibontott méret összesen; a méretet a ténylegesen kiírt bájtok alapján is ellenőrzi (a fejléc hazudhat).
+Az archívum a végén a ZIP mappába kerül, így a nem rendezett tagok sem vesznek el.
+"""
+import os
+import shutil
+import time
+import zipfile
+from pathlib import Path
+
+from config import cfg, DEDUPLICATE, SNIFF_BYTES, ZIP_MAX_DEPTH, ZIP_MAX_MEMBERS, ZIP_MAX_BYTES, ZIP_MAX_RATIO
+from file_utils.common import log, move_unique, is_planning, clean_filename
+from file_utils.hashindex import get_index, is_same_content
+from file_utils.metrics import stage
+from file_utils.registry import get_handler, bind_header, FollowUp
+from file_utils.sniff import read_header, resolve_suffix
+
+out_dir = cfg["zip_output"]
+staging_root = cfg["zip_staging"]
+failed_dir = cfg["failed_output"]
+
+COPY_CHUNK = 1024 * 1024
+
+
+class ZipLimitError(Exception):
+    pass
+
+
+class _Budget:
+    """
+    Az egész (beágyazott archívumokkal együtt vett) feldolgozás kerete: tagok száma, kibontott bájtok
+    """
+
+    def __init__(self, members: int = ZIP_MAX_MEMBERS, max_bytes: int = ZIP_MAX_BYTES):
+        self.members = members
+        self.bytes = max_bytes
+
+    def take_member(self):
+        self.members -= 1
+        if self.members < 0:
+            raise ZipLimitError(f"túl sok tag (> {ZIP_MAX_MEMBERS})")
+
+    def take_bytes(self, n: int):
+        self.bytes -= n
+        if self.bytes < 0:
+            raise ZipLimitError(f"túl nagy kibontott méret (> {ZIP_MAX_BYTES // (1024 * 1024)} MiB)")
+
+
+def _check_declared(zf: zipfile.ZipFile, budget: _Budget):
+    """
+    Előzetes ellenőrzés a központi könyvtár alapján, még egyetlen tag kibontása előtt
+    """
+    infos = [info for info in zf.infolist() if not info.is_dir()]
+    if len(infos) > budget.members:
+        raise ZipLimitError(f"túl sok tag: {len(infos)}")
+    total = sum(info.file_size for info in infos)
+    if total > budget.bytes:
+        raise ZipLimitError(f"túl nagy kibontott méret: {total // (1024 * 1024)} MiB")
+    for info in infos:
+        if info.compress_size and info.file_size / info.compress_size > ZIP_MAX_RATIO:
+            raise ZipLimitError(f"gyanús tömörítési arány: {info.filename}")
+    return infos
+
+
+def _extract(info: zipfile.ZipInfo, header: bytes, stream, target: Path, budget: _Budget):
+    """
+    Tag kiírása adatfolyamként (a már beolvasott fejléc után a maradék, fix méretű blokkokban),
+    a ténylegesen kiírt bájtok keretre vételével
+    """
+    written = len(header)
+    budget.take_bytes(len(header))
+    with open(target, "wb") as out:
+        out.write(header)
+        while True:
+            chunk = stream.read(COPY_CHUNK)
+            if not chunk:
+                break
+            written += len(chunk)
+            if written > info.file_size:
+                raise ZipLimitError(f"a tag nagyobb a megadottnál: {info.filename}")
+            budget.take_bytes(len(chunk))
+            out.write(chunk)
+    # a tag dátuma (pl. EXIF nélküli képeknél a napi mappa ebből jön)
+    mtime = time.mktime(info.date_time + (0, 0, -1))
+    os.utime(target, (mtime, mtime))
+
+
+def _stage_members(zf: zipfile.ZipFile, staging: Path, source: Path, depth: int, budget: _Budget,
+                   staged: list, counts: dict):
+    """
+    Első fázis: a támogatott tagok kiírása az ideiglenes mappába (a beágyazott archívumoké is),
+    (ideiglenes útvonal, logikai forrás, kezelő, kind) tételekként. Még semmi sem kerül a helyére,
+    így a keret túllépése (ZipLimitError) után sincs félig rendezett archívum.
+    Egy hibás tag nem állítja meg a többit.
+    """
+    staging.mkdir(parents=True, exist_ok=True)
+    for n, info in enumerate(_check_declared(zf, budget)):
+        budget.take_member()
+        name = Path(info.filename).name
+        try:
+            if info.flag_bits & 0x1:  # titkosított tag
+                counts["skipped"] += 1
+                continue
+            with zf.open(info) as stream:
+                header = stream.read(SNIFF_BYTES)
+                suffix = resolve_suffix(Path(name), header)
+                if suffix == ".zip":
+                    job = (None, "archive") if depth < ZIP_MAX_DEPTH else None
+                else:
+                    job = get_handler(suffix)
+                if job is None:
+                    counts["skipped"] += 1
+                    continue
+                target = staging / f"{n:05d}" / clean_filename(name)
+                target.parent.mkdir(parents=True)
+                with stage("unzip"):
+                    _extract(info, header, stream, target, budget)
+
+            handler, kind = job
+            if kind == "archive":
+                with zipfile.ZipFile(target) as nested:
+                    _stage_members(nested, staging / f"{n:05d}_zip", source / info.filename, depth + 1,
+                                   budget, staged, counts)
+            else:
+                staged.append((target, source / info.filename, handler, kind))
+        except ZipLimitError:
+            raise
+        except Exception as e:
+            log(f"⚠️ ZIP tag hiba: {info.filename} – {e}", level="ERROR", module="zip", to_console=True)
+            counts["failed"] += 1
+
+
+def _sort_members(staged: list, counts: dict):
+    """
+    Második fázis: a kiírt tagok rendezése. A tagok is a tartalom-hash indexen mennek át
+    (logikai forrásuk: archívum/tag útvonal), így egy újra feldolgozott archívum ismert tagjai
+    duplikátumként törlődnek, illetve a korábbi célhelyükre kerülnek.
+    A kötegelt kezelők (MP3) tagjai a végén, egyben mennek a kezelőhöz.
+    """
+    index = get_index()
+    members = {}  # ideiglenes útvonal → (logikai forrás, stat, hash) a rögzítéshez
+    batches = {}
+
+    def settle(target, result):
+        if not isinstance(result, Path):
+            counts["failed"] += 1
+            return
+        counts["sorted"] += 1
+        source, st, digest = members[target]
+        if index is not None:
+            index.record(source, st, digest, result)
+
+    for target, source, handler, kind in staged:
+        try:
+            st = target.stat()
+            digest, known = index.lookup(source, st) if index is not None else (None, None)
+            members[target] = (source, st, digest)
+            if known is not None:
+                if DEDUPLICATE and is_same_content(known, st.st_size, digest):
+                    target.unlink()
+                    counts["duplicate"] += 1
+                    log(f"♻️ ZIP tag duplikátum: {source.name} (már rendezve: {known})", level="INFO", module="zip")
+                    continue
+                result = move_unique(target, known, "index: ismert tartalom")
+            elif kind == "batch":
+                batches.setdefault(handler, []).append(target)
+                continue
+            else:
+                result = bind_header(handler, read_header(target), digest)(target)
+            settle(target, result)
+        except Exception as e:
+            log(f"⚠️ ZIP tag hiba: {source} – {e}", level="ERROR", module="zip", to_console=True)
+            counts["failed"] += 1
+
+    for handler, paths in batches.items():
+        for path, result in handler(paths):
+            if isinstance(result, FollowUp):  # a folytatás itt helyben fut
+                result = result.handler(path)
+            settle(path, result)
+
+
+def process_zip(file_path: Path):
+    """
+    ZIP archívum tagjainak rendezése a meglévő kezelőkkel, majd az archívum áthelyezése a ZIP mappába.
+    Tervező módban kimarad (a tagok célhelye csak kibontással állapítható meg): a következő futás dolgozza fel.
+    """
+    if is_planning():
+        log(f"⏭️ ZIP tervező módban kihagyva: {file_path.name}", level="INFO", module="zip", to_console=True)
+        return None
+    staging = staging_root / f"{os.getpid()}_{time.monotonic_ns()}"
+    counts = {"sorted": 0, "duplicate": 0, "skipped": 0, "failed": 0}
+    try:
+        staged = []
+        with zipfile.ZipFile(file_path) as zf:
+            _stage_members(zf, staging, file_path, 1, _Budget(), staged, counts)
+        _sort_members(staged, counts)
+    except ZipLimitError as e:
+        log(f"💣 ZIP korlát: {file_path.name} – {e}", level="WARNING", module="zip", to_console=True)
+        return move_unique(file_path, failed_dir / file_path.name, f"ZIP korlát: {e}")
+    except zipfile.BadZipFile as e:
+        log(f"⚠️ Hibás ZIP: {file_path.name} – {e}", level="ERROR", module="zip", to_console=True)
+        return move_unique(file_path, failed_dir / file_path.name, "hibás ZIP")
+    finally:
+        # ami a kezelők után az ideiglenes mappában maradt (nem rendezhető tag), az archívumban megvan
+        shutil.rmtree(staging, ignore_errors=True)
+        try:
+            staging.parent.rmdir()  # csak ha üres (párhuzamos feldolgozásnál más is használhatja)
+        except OSError:
+            pass
+    log(f"📦 {file_path.name}: {counts['sorted']} tag rendezve, {counts['duplicate']} duplikátum, "
+        f"{counts['skipped']} kihagyva, {counts['failed']} sikertelen",
+        level="INFO", module="zip", to_console=True)
+    return move_unique(file_path, out_dir / file_path.name, f"ZIP: {counts['sorted']} tag rendezve")
@@ -0,0 +1,114 @@
+"""
+Perzisztens hangfelismerési cache.
+A kulcs a hangadat (payload) hash-e a tag bájtok nélkül: MP3-nál az ID3v2 fejléc/blokk és
+a záró ID3v1 (TAG) rész kimarad, WAV-nál csak a "data" chunk számít. Így egy átnevezett
+vagy újratagelt másolat is cache találat.
+"""
+import hashlib
+import json
+import sqlite3
+import struct
+import threading
+from pathlib import Path
+
+from config import cfg, HASH_CHUNK_SIZE
+from file_utils.common import log
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS recognitions (
+    payload_hash TEXT PRIMARY KEY,
+    metadata TEXT NOT NULL
+);
+"""
+
+
+def _payload_range(f, size: int) -> tuple[int, int]:
+    """
+    A hangadat kezdete és vége a fájlban (tagek nélkül)
+    """
+    head = f.read(12)
+    if head[:4] == b"RIFF" and head[8:12] == b"WAVE":
+        pos = 12
+        while pos + 8 <= size:
+            f.seek(pos)
+            chunk_id, chunk_size = struct.unpack("<4sI", f.read(8))
+            if chunk_id == b"data":
+                return pos + 8, min(pos + 8 + chunk_size, size)
+            pos += 8 + chunk_size + (chunk_size & 1)
+        return 0, size
+
+    start = 0
+    if head[:3] == b"ID3" and len(head) >= 10:
+        flags = head[5]
+        tag_size = (head[6] << 21) | (head[7] << 14) | (head[8] << 7) | head[9]  # synchsafe egész
+        start = 10 + tag_size + (10 if flags & 0x10 else 0)
+    end = size
+    if size >= 128:
+        f.seek(size - 128)
+        if f.read(3) == b"TAG":
+            end = size - 128
+    return min(start, end), end
+
+
+def audio_payload_hash(file_path: Path, chunk_size: int = HASH_CHUNK_SIZE) -> str:
+    """
+    A hangadat hash-e, a tag bájtok kihagyásával
+    """
+    h = hashlib.blake2b(digest_size=20)
+    with open(file_path, "rb") as f:
+        f.seek(0, 2)
+        size = f.tell()
+        f.seek(0)
+        start, end = _payload_range(f, size)
+        f.seek(start)
+        remaining = end - start
+        while remaining > 0:
+            data = f.read(min(chunk_size, remaining))
+            if not data:
+                break
+            h.update(data)
+            remaining -= len(data)
+    return h.hexdigest()
+
+
+class RecognitionCache:
+    """
+    payload hash → felismert metaadatok (cím, előadó, album)
+    """
+
+    def __init__(self, db_path: Path = None):
+        db_path = Path(db_path or cfg["mp3_cache"])
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(db_path), check_same_thread=False, timeout=30)
+        self.conn.executescript(_SCHEMA)
+        self.lock = threading.Lock()
+
+    def get(self, payload_hash: str) -> dict | None:
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT metadata FROM recognitions WHERE payload_hash = ?", (payload_hash,)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, payload_hash: str, metadata: dict):
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO recognitions (payload_hash, metadata) VALUES (?, ?)",
+                (payload_hash, json.dumps(metadata, ensure_ascii=False)),
+            )
+            self.conn.commit()
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+def open_cache() -> RecognitionCache | None:
+    """
+    Cache megnyitása; hiba esetén None (a felismerés cache nélkül is működik)
+    """
+    try:
+        return RecognitionCache()
+    except sqlite3.Error as e:
+        log(f"⚠️ Felismerési cache nem elérhető: {e}", level="WARNING", module="mp3")
+        return None
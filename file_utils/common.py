@@ -1,11 +1,16 @@
 import os
 import time
+import shutil
 import platform
+import threading
 import unicodedata
-from datetime import datetime
 from pathlib import Path
+from typing import NamedTuple
 from config import LOG_PATH
 from config import DEBUG
+from config import LOG_FORMAT, LOG_FLUSH_INTERVAL, LOG_MAX_BYTES, LOG_BACKUP_COUNT
+from file_utils.logwriter import LogWriter, make_record
+from file_utils.metrics import stage
 
 
 def clear_terminal():
@@ -61,30 +66,220 @@ def ensure_unique_filename(target_path: Path) -> Path:
 
     return target_path
 
+class DestinationIndex:
+    """
+    Futásonkénti gyorsítótár a célkönyvtárakhoz: a már létrehozott könyvtárak, a foglalt
+    nevek és tövenként a következő szabad (n) toldalék. Így egy ütközés nem jár
+    exists() hívások sorozatával, és fájlonként nincs mkdir.
+    Csak a _move_lock alatt használjuk; a más folyamatok által közben foglalt nevek miatt
+    a kiválasztott nevet egyetlen exists() hívással még ellenőrizzük.
+    """
+
+    def __init__(self):
+        self.created = set()
+        self.names = {}         # könyvtár → foglalt (normcase) nevek
+        self.next_suffix = {}   # (könyvtár, tő, kiterjesztés) → következő próbálandó sorszám
+
+    def ensure_dir(self, directory: Path):
+        if directory not in self.created:
+            directory.mkdir(parents=True, exist_ok=True)
+            self.created.add(directory)
+
+    def _load(self, directory: Path) -> set:
+        try:
+            with os.scandir(directory) as it:
+                names = {os.path.normcase(entry.name) for entry in it}
+        except FileNotFoundError:
+            names = set()   # tervezésnél a célkönyvtár még nem létezik
+        self.names[directory] = names
+        return names
+
+    def reserve(self, target_path: Path, create: bool = True) -> Path:
+        """
+        Egyedi célnév kiválasztása és lefoglalása (ugyanaz a névképzés, mint az ensure_unique_filename-nél).
+        create=False: a célkönyvtárat nem hozza létre (áthelyezési terv készítésekor)
+        """
+        directory = target_path.parent
+        if create:
+            self.ensure_dir(directory)
+        names = self.names.get(directory)
+        if names is None:
+            names = self._load(directory)
+        stem, ext = target_path.stem, target_path.suffix
+        key = (directory, stem, ext)
+        while True:
+            candidate = target_path
+            if os.path.normcase(candidate.name) in names:
+                counter = self.next_suffix.get(key, 1)
+                while True:
+                    candidate = directory / f"{stem}({counter}){ext}"
+                    counter += 1
+                    if os.path.normcase(candidate.name) not in names:
+                        break
+                self.next_suffix[key] = counter
+            if not candidate.exists():
+                names.add(os.path.normcase(candidate.name))
+                return candidate
+            # közben egy másik folyamat foglalta: a könyvtár újraolvasása
+            names = self._load(directory)
+
+    def release(self, target_path: Path):
+        """
+        Sikertelen áthelyezés után a lefoglalt név felszabadítása
+        """
+        names = self.names.get(target_path.parent)
+        if names is not None:
+            names.discard(os.path.normcase(target_path.name))
+
+
+_dest_index = DestinationIndex()
+
+# Az egyedi célnév kiválasztását és az áthelyezést sorosítja; újrahívható, így egy áthelyezés
+# a hozzá tartozó ellenőrzéssel együtt is a zár alá vehető (pl. a perceptuális index).
+# Párhuzamos futásnál a dispatch modul egy folyamatok között megosztott zárra cseréli.
+_move_lock = threading.RLock()
+
+def set_move_lock(lock):
+    """
+    Az áthelyezéseket sorosító zár beállítása (process pool initializer is használja)
+    """
+    global _move_lock
+    _move_lock = lock
+
+def get_move_lock():
+    """
+    A folyamatok között megosztott zár (más, sorosítandó lépésekhez is, pl. a perceptuális index)
+    """
+    return _move_lock
+
+# Az aktuális futás áthelyezési naplója (journal.Journal); None: nincs naplózás
+_journal = None
+
+def set_journal(journal):
+    """
+    Áthelyezési napló beállítása (process pool initializer is használja)
+    """
+    global _journal
+    _journal = journal
+
+def get_journal():
+    return _journal
+
+class PlannedMove(NamedTuple):
+    """
+    Az áthelyezési terv egy tétele; destination None: a forrás törlendő.
+    requested: a kezelő által kért célnév (a workerben lefoglalt (n) toldalék nélkül)
+    """
+    source: Path
+    destination: Path | None
+    reason: str = ""
+    requested: Path | None = None
+
+
+# Tervező módban (--plan / --dry-run) a move_unique nem mozgat, csak ide gyűjti a tételeket
+_plan = None
+
+def start_plan():
+    """
+    Tervező mód bekapcsolása az aktuális folyamatban (process pool initializer is használja)
+    """
+    global _plan
+    _plan = []
+
+def is_planning() -> bool:
+    return _plan is not None
+
+def plan_move(source: Path, destination: Path | None, reason: str = "", requested: Path | None = None):
+    """
+    Tétel felvétele a tervbe (pl. törlés: destination=None)
+    """
+    _plan.append(PlannedMove(Path(source), destination, reason, requested))
+
+def drain_plan() -> list:
+    """
+    Az eddig gyűjtött tételek kivétele (a worker folyamatok így adják vissza a tervet)
+    """
+    if _plan is None:
+        return []
+    entries = _plan[:]
+    del _plan[:len(entries)]
+    return entries
+
+def stop_plan() -> list:
+    """
+    Tervező mód kikapcsolása; visszatér a maradék tételekkel
+    """
+    global _plan
+    entries, _plan = _plan or [], None
+    return entries
+
+def move_unique(src: Path, target_path: Path, reason: str = "") -> Path:
+    """
+    Fájl áthelyezése a célhelyre, ütközés esetén (1), (2) stb. toldalékkal.
+    A célnév kiválasztása és az áthelyezés egy zár alatt történik, így párhuzamos
+    workerek sem választhatják ugyanazt a nevet. Visszatér a tényleges célhellyel.
+    Tervező módban nem mozgat: a lefoglalt célnevet (src, cél, reason) tételként a tervbe veszi.
+    Ha van napló, az áthelyezés előtt "intent", utána "done" / "failed" bejegyzés készül.
+    """
+    with _move_lock:
+        if _plan is not None:
+            with stage("resolve-destination"):
+                reserved = _dest_index.reserve(target_path, create=False)
+            plan_move(src, reserved, reason, target_path)
+            return reserved
+        with stage("resolve-destination"):
+            target_path = _dest_index.reserve(target_path)
+        entry_id = _journal.intent(src, target_path) if _journal else None
+        try:
+            with stage("move"):
+                shutil.move(str(src), str(target_path))
+        except Exception:
+            _dest_index.release(target_path)
+            if entry_id:
+                _journal.failed(entry_id)
+            raise
+        if entry_id:
+            _journal.done(entry_id)
+    log_rename(str(src), str(target_path))
+    return target_path
+
 LOG_LEVELS = ["DEBUG", "INFO", "WARNING", "ERROR"]
 
-def log(message: str, level: str = "INFO", module: str = "general", to_console=False):
+_log_writer = LogWriter(LOG_PATH, fmt=LOG_FORMAT, flush_interval=LOG_FLUSH_INTERVAL,
+                        max_bytes=LOG_MAX_BYTES, backup_count=LOG_BACKUP_COUNT)
+
+def log(message: str, level: str = "INFO", module: str = "general", to_console=False, **fields):
     """
     Általános logoló függvény. Modulonként szűrhető a DEBUG kapcsolóval.
+    A bejegyzést egy háttérszál írja ki kötegelve; a további mezők (pl. file, stage, duration)
+    strukturált formátumban külön kulcsként jelennek meg.
     """
     if level == "DEBUG" and not DEBUG.get(module, False):
         return
-    
-    timestamp = datetime.now().isoformat(sep=' ', timespec='seconds')
-    log_entry = f"{timestamp} | {level.upper():<5} | {module:<10} | {message}\n"
 
-    LOG_PATH.parent.mkdir(parents=True, exist_ok=True)
-    with open(LOG_PATH, "a", encoding="utf-8") as logf:
-        logf.write(log_entry)
+    _log_writer.write(make_record(message, level, module, fields))
     if to_console:
         print(message)
 
 
+def flush_log():
+    """
+    Függő naplóbejegyzések azonnali kiírása
+    """
+    _log_writer.flush()
+
+
 def log_rename(original_path: Path, new_path: Path):
     log(f"{original_path} → {new_path}", level="INFO", module="rename")
 
+def strip_accents(text):
+    """
+    ASCII-ra konvertálja és kiszedi az ékezetet (a kis- és nagybetűket megtartja)
+    """
+    return unicodedata.normalize('NFKD', text).encode('ASCII', 'ignore').decode()
+
 def normalize_text(text):
     """
     ASCII-ra konvertálja, kiszedi az ékezetet, kisbetűsre alakítja
     """
-    return unicodedata.normalize('NFKD', text).encode('ASCII', 'ignore').decode().lower()    
\ No newline at end of file
+    return strip_accents(text).lower()    
\ No newline at end of file
@@ -0,0 +1,215 @@
+"""
+Párhuzamos feldolgozás.
+A CPU-igényes kezelők (PDF szövegkinyerés, EXIF) process poolban, az I/O- és
+hálózatigényes kezelők (Shazam, áthelyezések) szálakon futnak. Az áthelyezéseket
+a common.move_unique egy folyamatok között megosztott zár alatt végzi.
+A workerekben gyűjtött mérőszámok, szövegtár-írások és (tervező módban) áthelyezési tételek
+az eredménnyel együtt visszakerülnek a fő folyamatba.
+"""
+import multiprocessing
+import queue
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+
+from file_utils.common import log, set_move_lock, set_journal, get_journal, start_plan, is_planning, drain_plan, plan_move
+from file_utils.metrics import measure_handler, get_metrics, reset_metrics, drain_metrics, merge_metrics
+from file_utils.textstore import defer_store_writes, drain_store, merge_store
+from file_utils.registry import FollowUp, is_whole_run_batch
+from file_utils.scheduler import Scheduler
+
+# I/O szálak száma workerenként (hálózati várakozásnál a CPU nem a szűk keresztmetszet)
+IO_THREADS_PER_WORKER = 4
+
+
+def run_handler(handler, file_path: Path):
+    """
+    Egy kezelő futtatása egy fájlra (futásidő-méréssel). A kivételt naplózza, hogy egy hibás fájl ne állítsa meg a pool-t.
+    """
+    try:
+        return measure_handler(handler, file_path)
+    except Exception as e:
+        log(f"⚠️ Hiba feldolgozásnál: {file_path.name} – {e}", level="ERROR", module="dispatch", to_console=True)
+        return None
+
+
+def run_in_worker(handler, file_path: Path):
+    """
+    Process pool feladat: a kezelő eredménye, a közben tervezett tételek, a mérőszámok
+    és a szövegtár pufferelt írásai
+    """
+    return run_handler(handler, file_path), drain_plan(), drain_metrics(), drain_store()
+
+
+def init_worker(lock, planning: bool, journal=None, profile_top: int = 0):
+    """
+    Process pool initializer: közös áthelyezési zár és napló, üres saját mérőszám-gyűjtő,
+    tervező módban üres saját terv (fork esetén a szülő adatai nem kerülhetnek vissza még egyszer)
+    """
+    set_move_lock(lock)
+    set_journal(journal)
+    reset_metrics(profile_top)
+    defer_store_writes()
+    if planning:
+        start_plan()
+
+
+def run_batch(handler, paths: list[Path]) -> list:
+    """
+    Kötegelt kezelő futtatása (pl. MP3 felismerés egy eseményhurkon); (file_path, eredmény) párokat ad.
+    """
+    try:
+        return handler(paths)
+    except Exception as e:
+        log(f"⚠️ Hiba kötegelt feldolgozásnál: {len(paths)} fájl – {e}", level="ERROR", module="dispatch", to_console=True)
+        return [(file_path, None) for file_path in paths]
+
+
+def run_jobs(jobs, workers: int = 1, on_result=None) -> list:
+    """
+    Feladatok futtatása a költségalapú ütemezőn keresztül (scheduler): az ablakon belül a legolcsóbb
+    indítható feladat indul, sávonkénti párhuzamossági kerettel és rate limittel.
+
+    :param jobs: (handler, kind, file_path) hármasok; kind: "cpu", "io", "serial" vagy "batch"
+                 ("serial": a fő szálon fut, pl. a COM alapú Office konverzió;
+                  "batch": a fájlokat összegyűjti, és a bejárás végén egyben adja át a handlernek
+                  (a részletekben is futtatható kötegeket ablaknyi méretenként már közben);
+                  a kötegelt kezelő eredmény helyett FollowUp feladatot is adhat, az az ütemezőbe kerül)
+    :param workers: párhuzamos workerek száma; 1 esetén minden sorban, a fő szálon fut
+    :param on_result: opcionális callback(file_path, eredmény), mindig a hívó szálon fut
+    :return: (file_path, eredmény) párok listája
+    """
+    results = []
+    jobs = iter(jobs)
+
+    def finish(file_path, result):
+        results.append((file_path, result))
+        if on_result:
+            on_result(file_path, result)
+
+    batches = {}
+
+    def add_batch(handler, file_path):
+        paths = batches.setdefault(handler, [])
+        paths.append(file_path)
+        # a részletekben is futtatható kötegek (MP3) ablaknyi méretben indulnak, nem gyűlnek a bejárás végéig
+        if len(paths) >= scheduler.window and not is_whole_run_batch(handler):
+            start_batch(handler, batches.pop(handler))
+
+    def start_remaining_batches():
+        for handler in list(batches):
+            start_batch(handler, batches.pop(handler))
+
+    def settle_batch(pairs):
+        for file_path, result in pairs:
+            if isinstance(result, FollowUp):
+                scheduler.push(result.handler, result.kind, file_path)
+            else:
+                finish(file_path, result)
+
+    if workers <= 1:
+        scheduler = Scheduler({"cpu": 1, "io": 1, "serial": 1})
+
+        def start_batch(handler, paths):
+            settle_batch(run_batch(handler, paths))  # a folytatások még az ütemezőn mennek végig
+
+        while True:
+            scheduler.fill(jobs, add_batch)
+            job = scheduler.pop()
+            if job is None:
+                if scheduler.done and batches:
+                    start_remaining_batches()
+                    continue
+                if scheduler.done:
+                    break
+                time.sleep(scheduler.wait_time() or 0)
+                continue
+            handler, kind, file_path, lane = job
+            finish(file_path, run_handler(handler, file_path))
+            scheduler.release(lane)
+        return results
+
+    ctx = multiprocessing.get_context()
+    lock = ctx.RLock()
+    set_move_lock(lock)
+    planning = is_planning()
+
+    io_threads = workers * IO_THREADS_PER_WORKER
+    scheduler = Scheduler({"cpu": workers, "io": io_threads, "serial": 1})
+    futures = {}
+    done = queue.Queue()
+
+    def drain(block=False, timeout=None):
+        while True:
+            try:
+                future = done.get(block=block, timeout=timeout)
+            except queue.Empty:
+                return
+            file_path, kind, lane = futures.pop(future)
+            if kind == "batch":
+                scheduler.occupy("io", -1)
+                settle_batch(future.result())  # a run_batch a hibát már eredménnyé alakította
+                if block:
+                    return
+                continue
+            scheduler.release(lane)
+            try:
+                result = future.result()
+                if kind == "cpu":
+                    result, entries, snapshot, writes = result
+                    for entry in entries:
+                        plan_move(*entry)
+                    merge_metrics(snapshot)
+                    merge_store(writes)
+            except Exception as e:
+                log(f"⚠️ Worker hiba: {file_path.name} – {e}", level="ERROR", module="dispatch", to_console=True)
+                result = None
+            finish(file_path, result)
+            if block:
+                return
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx,
+                             initializer=init_worker,
+                             initargs=(lock, planning, get_journal(), get_metrics().profile_top)) as cpu_pool, \
+         ThreadPoolExecutor(max_workers=io_threads) as io_pool:
+        # a workerek indítása (fork) még az I/O szálak előtt: az ütemező az olcsó I/O feladatokat előre veszi,
+        # és egy szál által épp fogott zár (pl. SQLite) a gyerekfolyamatban örökre foglalt maradna
+        cpu_pool.submit(int).result()
+
+        def start_batch(handler, paths):
+            # a köteg egy I/O szálon fut (saját eseményhurokkal), a pool-ok mellett; a szálat az ütemező is számolja
+            scheduler.occupy("io")
+            future = io_pool.submit(run_batch, handler, paths)
+            futures[future] = (paths, "batch", None)
+            future.add_done_callback(done.put)
+
+        while True:
+            scheduler.fill(jobs, add_batch)
+            if scheduler.exhausted and batches:
+                start_remaining_batches()
+            # a pool-ok csak annyi feladatot kapnak, amennyit azonnal futtatni tudnak (a sor az ütemezőben marad)
+            serial = None
+            while (job := scheduler.pop()) is not None:
+                handler, kind, file_path, lane = job
+                if kind == "cpu":
+                    future = cpu_pool.submit(run_in_worker, handler, file_path)
+                elif kind == "io":
+                    future = io_pool.submit(run_handler, handler, file_path)
+                else:
+                    serial = job
+                    continue
+                futures[future] = (file_path, kind, lane)
+                future.add_done_callback(done.put)
+            if serial is not None:
+                # a soros feladat a fő szálon fut, amíg a pool-ok dolgoznak
+                handler, kind, file_path, lane = serial
+                result = run_handler(handler, file_path)
+                scheduler.release(lane)
+                finish(file_path, result)
+                drain()
+                continue
+            if scheduler.done and not futures:
+                break
+            # várakozás egy befejeződésre (vagy a rate limit szerinti következő indításra)
+            drain(block=True, timeout=scheduler.wait_time())
+    return results
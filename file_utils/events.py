@@ -0,0 +1,220 @@
+"""
+Fényképek eseményekbe csoportosítása idő és hely szerint (rácsindexes DBSCAN, NumPy).
+Két kép szomszédos, ha legfeljebb gap másodperc és mindkét irányban legfeljebb radius_km
+választja el őket (négyzetes környezet). Ilyen metrikával a (gap × radius × radius) méretű
+rácscella minden pontja szomszédja a cella többi pontjának, így:
+- a legalább min_photos pontot tartalmazó cellák pontjai páronkénti vizsgálat nélkül magpontok,
+- pontpárokat csak szomszédos cellák között kell nézni, nem az egész köteg minden párját,
+- a klaszterek a magpontot tartalmazó cellák gráfjának összefüggő komponensei.
+A kevés képből álló (nem sűrű) pontok zajnak minősülnek: ezek maradnak a napi mappákban.
+"""
+import numpy as np
+
+EARTH_KM = 6371.0
+
+# a 26 szomszédos cella eltolása (t, y, x), és ezek "előre mutató" fele a cellapárok egyszeri vizsgálatához
+OFFSETS = np.array([(dt, dy, dx) for dt in (-1, 0, 1) for dy in (-1, 0, 1) for dx in (-1, 0, 1)
+                    if (dt, dy, dx) != (0, 0, 0)], dtype=np.int64)
+FORWARD = OFFSETS[[tuple(o) > (0, 0, 0) for o in OFFSETS.tolist()]]
+
+
+def _fill_gps(order: np.ndarray, lats: np.ndarray, lons: np.ndarray):
+    """
+    GPS nélküli képek helye: az időben előző (ha nincs, a következő) helyadatos kép helye.
+    Ha egyetlen képnek sincs helyadata, mindegyik (0, 0): csak az idő számít.
+    """
+    lat, lon = lats[order], lons[order]
+    known = ~np.isnan(lat)
+    if not known.any():
+        return np.zeros_like(lats), np.zeros_like(lons)
+    idx = np.where(known, np.arange(len(lat)), 0)
+    np.maximum.accumulate(idx, out=idx)
+    first = np.argmax(known)
+    idx[:first] = first  # az első helyadatos kép előttiek: visszafelé töltés
+    filled_lat, filled_lon = np.empty_like(lats), np.empty_like(lons)
+    filled_lat[order], filled_lon[order] = lat[idx], lon[idx]
+    return filled_lat, filled_lon
+
+
+def _pairs(starts: np.ndarray, sizes: np.ndarray, sources: np.ndarray):
+    """
+    Párok kiterítése: minden sources[k] elemhez a [starts[k], starts[k] + sizes[k]) tartomány indexei.
+
+    :return: (forrás, tartománybeli index) tömbpár
+    """
+    sizes = sizes.astype(np.int64)
+    left = np.repeat(sources, sizes)
+    base = np.repeat(starts - np.cumsum(sizes) + sizes, sizes)
+    return left, base + np.arange(int(sizes.sum()))
+
+
+def _components(n: int, edges: np.ndarray) -> np.ndarray:
+    """
+    Union-find a cellák szintjén; minden cellához a komponense legkisebb azonosítója
+    """
+    parent = list(range(n))
+
+    def find(c):
+        while parent[c] != c:
+            parent[c] = parent[parent[c]]
+            c = parent[c]
+        return c
+
+    for a, b in edges.tolist():
+        ra, rb = find(a), find(b)
+        if ra != rb:
+            parent[max(ra, rb)] = min(ra, rb)
+    return np.array([find(c) for c in range(n)], dtype=np.int64)
+
+
+def cluster_events(times, lats, lons, gap: float, radius_km: float, min_photos: int) -> np.ndarray:
+    """
+    :param times: készítési időpontok (Unix másodperc)
+    :param lats, lons: koordináták fokban, ismeretlen helynél NaN
+    :param gap: a szomszédos képek közti legnagyobb időköz (másodperc)
+    :param radius_km: a szomszédos képek közti legnagyobb távolság tengelyenként (km)
+    :param min_photos: ennyi szomszéddal (önmagát is beleértve) magpont egy kép
+    :return: eseménycímkék képenként (0, 1, …, a kezdési idő sorrendjében), zajnál -1
+    """
+    times = np.asarray(times, dtype=np.float64)
+    n = len(times)
+    labels = np.full(n, -1, dtype=np.int64)
+    if n == 0:
+        return labels
+    lats, lons = _fill_gps(np.argsort(times, kind="stable"),
+                           np.asarray(lats, dtype=np.float64), np.asarray(lons, dtype=np.float64))
+
+    # normalizált koordináták: egy egység = gap, illetve radius_km (helyi ekvidisztáns vetület)
+    coords = np.stack([
+        times / gap,
+        np.radians(lats) * EARTH_KM / radius_km,
+        np.radians(lons) * EARTH_KM * np.cos(np.radians(lats)) / radius_km,
+    ], axis=1)
+    cells = np.floor(coords).astype(np.int64)
+
+    # cellakulcs egyetlen int64-ben (a széleken egy cella ráhagyással, hogy a szomszéd ne forduljon át)
+    low = cells.min(axis=0) - 1
+    span = cells.max(axis=0) - low + 2
+    shifted = cells - low
+    keys = (shifted[:, 0] * span[1] + shifted[:, 1]) * span[2] + shifted[:, 2]
+
+    def key_shift(offsets):
+        return (offsets[:, 0] * span[1] + offsets[:, 1]) * span[2] + offsets[:, 2]
+
+    order = np.argsort(keys, kind="stable")
+    keys, coords = keys[order], coords[order]
+    cell_keys, starts, sizes = np.unique(keys, return_index=True, return_counts=True)
+    cell_of = np.repeat(np.arange(len(cell_keys)), sizes)
+
+    def neighbour(cell_ids, shift):
+        """
+        A cellák shift eltolású szomszédjának azonosítója, vagy -1, ha az a cella üres
+        """
+        target = cell_keys[cell_ids] + shift
+        pos = np.minimum(np.searchsorted(cell_keys, target), len(cell_keys) - 1)
+        return np.where(cell_keys[pos] == target, pos, -1)
+
+    def close(a, b):
+        return (np.abs(coords[a] - coords[b]) <= 1.0).all(axis=1)
+
+    # 1. magpontok: sűrű cellában mind; ritka cellában a szomszéd cellák közeli pontjai is számítanak
+    counts = sizes[cell_of].copy()
+    sparse = np.flatnonzero(counts < min_photos)
+    near = []
+    for shift in key_shift(OFFSETS):
+        other = neighbour(cell_of[sparse], shift)
+        has = other >= 0
+        left, right = _pairs(starts[other[has]], sizes[other[has]], sparse[has])
+        hit = close(left, right)
+        np.add.at(counts, left[hit], 1)
+        near.append((left[hit], right[hit]))
+    core = counts >= min_photos
+
+    # 2. cellagráf: két magcella összefügg, ha van köztük egymáshoz közeli magpont-pár
+    core_cells = np.zeros(len(cell_keys), dtype=bool)
+    core_cells[cell_of[core]] = True
+    core_cell_ids = np.flatnonzero(core_cells)
+    # cellánként a magpontok koordinátáinak minimuma / maximuma
+    core_min = np.minimum.reduceat(np.where(core[:, None], coords, np.inf), starts)
+    core_max = np.maximum.reduceat(np.where(core[:, None], coords, -np.inf), starts)
+    core_ids = np.flatnonzero(core)
+    frontiers = {}
+
+    def frontier(axes, signs):
+        """
+        Cellánként a magpontok Pareto-frontja a signs irányában (két tengelyen):
+        (frontpontok cellák szerint rendezve, cellánkénti kezdőpozíció, darabszám)
+        """
+        key = (tuple(axes), tuple(signs))
+        if key not in frontiers:
+            s1 = signs[0] * coords[core_ids, axes[0]]
+            second = coords[core_ids, axes[1]]
+            s2 = signs[1] * (second - np.floor(second))  # cellán belüli helyzet, egy egységnyi sávban
+            cell = cell_of[core_ids]
+            by = np.lexsort((-s1, cell))  # cellánként az első tengely szerint csökkenő sorrendben
+            # a cellák sorszáma kettesével eltolja az értékeket: a futó maximum így cellánként indul újra
+            value = s2[by] + 2 * cell[by]
+            best = np.maximum.accumulate(value)
+            on_front = np.ones(len(by), dtype=bool)
+            on_front[1:] = value[1:] > best[:-1]
+            sky, sky_cell = core_ids[by][on_front], cell[by][on_front]
+            cell_ids = np.arange(len(cell_keys))
+            start = np.searchsorted(sky_cell, cell_ids)
+            frontiers[key] = (sky, start, np.searchsorted(sky_cell, cell_ids, side="right") - start)
+        return frontiers[key]
+
+    edges = [np.empty((0, 2), dtype=np.int64)]
+    for offset, shift in zip(FORWARD, key_shift(FORWARD)):
+        other = neighbour(core_cell_ids, shift)
+        has = other >= 0
+        has[has] = core_cells[other[has]]
+        src_cells, dst_cells = core_cell_ids[has], other[has]
+        axes = np.flatnonzero(offset)
+        if len(axes) == 1:
+            # egy tengely mentén szomszédos cellák: a többi tengelyen minden pár közel van,
+            # elég a két cella egymáshoz legközelebbi magpontjait összevetni
+            d = axes[0]
+            linked = core_min[dst_cells, d] - core_max[src_cells, d] <= 1.0
+            edges.append(np.stack([src_cells[linked], dst_cells[linked]], axis=1))
+            continue
+        if len(axes) == 2:
+            # két tengely mentén: csak a cellák egymás felé néző Pareto-frontján lévő magpontok
+            # lehetnek a legközelebbi pár tagjai (a többi pontot egy frontpont dominálja)
+            left_sky, left_start, left_size = frontier(axes, offset[axes])
+            right_sky, right_start, right_size = frontier(axes, -offset[axes])
+            pair, pos = _pairs(left_start[src_cells], left_size[src_cells], np.arange(len(src_cells)))
+            left = left_sky[pos]
+            left, pos = _pairs(right_start[dst_cells[pair]], right_size[dst_cells[pair]], left)
+            right = right_sky[pos]
+        else:
+            # sarokszomszéd: a forrás cella magpontjai közül csak a cél cellához elég közeliek × a cél cella pontjai
+            pair, left = _pairs(starts[src_cells], sizes[src_cells], np.arange(len(src_cells)))
+            keep = core[left]
+            for d in axes:
+                if offset[d] > 0:
+                    keep &= core_min[dst_cells[pair], d] - coords[left, d] <= 1.0
+                else:
+                    keep &= coords[left, d] - core_max[dst_cells[pair], d] <= 1.0
+            pair, left = pair[keep], left[keep]
+            left, right = _pairs(starts[dst_cells[pair]], sizes[dst_cells[pair]], left)
+        hit = core[right] & close(left, right)
+        edges.append(np.stack([cell_of[left[hit]], cell_of[right[hit]]], axis=1))
+    roots = _components(len(cell_keys), np.unique(np.concatenate(edges), axis=0))
+
+    # 3. címkék: magcella pontjai → a cella komponense; ritka határpont → egy közeli magpont komponense
+    point_labels = np.where(core_cells[cell_of], roots[cell_of], -1)
+    for left, right in near:
+        border = (point_labels[left] < 0) & core[right]
+        point_labels[left[border]] = roots[cell_of[right[border]]]
+    labels[order] = point_labels
+
+    # sorszámozás az események kezdete szerint
+    clustered = labels >= 0
+    if clustered.any():
+        roots_used, inverse = np.unique(labels[clustered], return_inverse=True)
+        first = np.full(len(roots_used), np.inf)
+        np.minimum.at(first, inverse, times[clustered])
+        rank = np.empty(len(roots_used), dtype=np.int64)
+        rank[np.argsort(first, kind="stable")] = np.arange(len(roots_used))
+        labels[clustered] = rank[inverse]
+    return labels
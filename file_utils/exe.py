@@ -1,24 +1,24 @@
 import os
 from pathlib import Path
-import shutil
-import win32api
 try:
-    import win32com.client as win32
-except ImportError:
-    win32 = None
+    import win32api
+except ImportError:  # nem Windows, vagy nincs pywin32
+    win32api = None
 from config import DEBUG
 from config import cfg
 from file_utils.common import log
-from file_utils.common import log_rename
+from file_utils.common import move_unique, is_planning
+from file_utils.metrics import stage
 
 out_dir = cfg["exe_output"]
-out_dir.mkdir(parents=True, exist_ok=True)
 
 
 def get_exe_info(file_path):
     """
     Exe információit próbálja összeszedni azonosításhoz.
     """
+    if win32api is None:
+        return {}
     try:
         info = win32api.GetFileVersionInfo(file_path, '\\')
         if not info:
@@ -79,19 +79,19 @@ def categorize_exe(filename: str, info: Optional[dict[str, str]] = None) -> str:
         return 'ismeretlen'
 
 
-def move_exe_to_category(file_path: Path, category: str):
+def move_exe_to_category(file_path: Path, category: str) -> Path:
     """
-    EXE áthelyezése
+    EXE áthelyezése (foglalt név esetén egyedi toldalékkal)
     """
-    target_dir = out_dir / category
-    target_dir.mkdir(parents=True, exist_ok=True)
-    target_path = target_dir / file_path.name
-    shutil.move(str(file_path), str(target_path))
-    log_rename(str(file_path), str(target_path))
-    print(f"[EXE] Áthelyezve: {file_path.name} → {category}/")
+    target_path = move_unique(file_path, out_dir / category / file_path.name, f"EXE: {category}")
+    if not is_planning():
+        print(f"[EXE] Áthelyezve: {file_path.name} → {category}/")
+    return target_path
 
 
 def process_exe(file_path: Path):
-    info = get_exe_info(str(file_path))
-    category = categorize_exe(file_path.name, info if info else None)                  
-    move_exe_to_category(file_path, category)
\ No newline at end of file
+    with stage("extract"):
+        info = get_exe_info(str(file_path))
+    with stage("classify"):
+        category = categorize_exe(file_path.name, info if info else None)
+    return move_exe_to_category(file_path, category)
\ No newline at end of file
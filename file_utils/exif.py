@@ -0,0 +1,174 @@
+"""
+Könnyűsúlyú EXIF olvasó.
+Csak a JPEG APP1/Exif szegmensét vagy a PNG eXIf chunkját olvassa be (pixeladatot nem dekódol),
+és egyetlen menetben adja vissza a készítés dátumát és a GPS koordinátákat.
+"""
+import io
+import struct
+from datetime import datetime
+from pathlib import Path
+
+JPEG_SOI = b"\xff\xd8"
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# TIFF tag azonosítók
+TAG_DATETIME = 0x0132
+TAG_EXIF_IFD = 0x8769
+TAG_GPS_IFD = 0x8825
+TAG_DATETIME_ORIGINAL = 0x9003
+TAG_DATETIME_DIGITIZED = 0x9004
+GPS_LATITUDE_REF = 1
+GPS_LATITUDE = 2
+GPS_LONGITUDE_REF = 3
+GPS_LONGITUDE = 4
+
+# TIFF típus → (elemméret, struct formátum)
+_TYPES = {
+    1: (1, "B"), 2: (1, "s"), 3: (2, "H"), 4: (4, "L"),
+    5: (8, "LL"), 7: (1, "B"), 9: (4, "l"), 10: (8, "ll"),
+}
+
+
+def _read_jpeg_exif(f):
+    """
+    JPEG markerek végigjárása az APP1/Exif szegmensig; a többi szegmenst átugorja.
+    """
+    while True:
+        marker = f.read(2)
+        if len(marker) < 2 or marker[0] != 0xFF:
+            return None
+        code = marker[1]
+        if code == 0xFF:  # kitöltő bájt
+            f.seek(-1, 1)
+            continue
+        if code in (0xD9, 0xDA):  # EOI / SOS: innen már képadat jön
+            return None
+        if 0xD0 <= code <= 0xD7 or code == 0x01:  # hossz nélküli markerek
+            continue
+        length_bytes = f.read(2)
+        if len(length_bytes) < 2:
+            return None
+        length = struct.unpack(">H", length_bytes)[0] - 2
+        if code == 0xE1:
+            data = f.read(length)
+            if data.startswith(b"Exif\x00\x00"):
+                return data[6:]
+            continue
+        f.seek(length, 1)
+
+
+def _read_png_exif(f):
+    """
+    PNG chunkok végigjárása az eXIf chunkig; az IDAT és egyéb chunkokat seekkel ugorja át.
+    """
+    while True:
+        header = f.read(8)
+        if len(header) < 8:
+            return None
+        length, ctype = struct.unpack(">I4s", header)
+        if ctype == b"eXIf":
+            return f.read(length)
+        if ctype == b"IEND":
+            return None
+        f.seek(length + 4, 1)  # adat + CRC
+
+
+def read_exif_block(f) -> bytes | None:
+    """
+    A nyers TIFF/EXIF blokk kiolvasása egy megnyitott (bináris, seekelhető) fájlból.
+    """
+    head = f.read(8)
+    if head.startswith(JPEG_SOI):
+        f.seek(2)
+        return _read_jpeg_exif(f)
+    if head == PNG_SIGNATURE:
+        return _read_png_exif(f)
+    return None
+
+
+def _read_ifd(data: bytes, offset: int, endian: str) -> dict:
+    """
+    Egy IFD bejegyzéseinek kiolvasása: {tag: érték}
+    """
+    entries = {}
+    if offset + 2 > len(data):
+        return entries
+    count = struct.unpack_from(endian + "H", data, offset)[0]
+    pos = offset + 2
+    for _ in range(count):
+        if pos + 12 > len(data):
+            break
+        tag, typ, n = struct.unpack_from(endian + "HHL", data, pos)
+        if typ in _TYPES:
+            size, fmt = _TYPES[typ]
+            total = size * n
+            value_pos = pos + 8 if total <= 4 else struct.unpack_from(endian + "L", data, pos + 8)[0]
+            if value_pos + total <= len(data):
+                if fmt == "s":
+                    entries[tag] = data[value_pos:value_pos + total].split(b"\x00", 1)[0].decode("ascii", "ignore")
+                else:
+                    vals = struct.unpack_from(endian + fmt * n, data, value_pos)
+                    if typ in (5, 10):  # racionális számok: (számláló, nevező) párok
+                        vals = tuple(vals[i] / vals[i + 1] if vals[i + 1] else 0.0 for i in range(0, len(vals), 2))
+                    entries[tag] = vals[0] if n == 1 and typ not in (5, 10) else vals
+        pos += 12
+    return entries
+
+
+def _dms_to_decimal(dms, ref: str):
+    if not dms or len(dms) != 3:
+        return None
+    decimal = dms[0] + dms[1] / 60.0 + dms[2] / 3600.0
+    return -decimal if ref in ("S", "W") else decimal
+
+
+def parse_exif(data: bytes) -> dict:
+    """
+    TIFF formátumú EXIF blokkból a dátum és a GPS kinyerése.
+
+    :return: {"date": datetime | None, "gps": (lat, lon) | None}
+    """
+    result = {"date": None, "gps": None}
+    if not data or len(data) < 8:
+        return result
+    endian = "<" if data[:2] == b"II" else ">"
+    ifd0 = _read_ifd(data, struct.unpack_from(endian + "L", data, 4)[0], endian)
+
+    exif_ifd = _read_ifd(data, ifd0[TAG_EXIF_IFD], endian) if TAG_EXIF_IFD in ifd0 else {}
+    for source, tag in ((exif_ifd, TAG_DATETIME_ORIGINAL), (exif_ifd, TAG_DATETIME_DIGITIZED), (ifd0, TAG_DATETIME)):
+        value = source.get(tag)
+        if value:
+            try:
+                result["date"] = datetime.strptime(value.strip(), "%Y:%m:%d %H:%M:%S")
+                break
+            except ValueError:
+                continue
+
+    if TAG_GPS_IFD in ifd0:
+        gps = _read_ifd(data, ifd0[TAG_GPS_IFD], endian)
+        lat = _dms_to_decimal(gps.get(GPS_LATITUDE), gps.get(GPS_LATITUDE_REF, "N"))
+        lon = _dms_to_decimal(gps.get(GPS_LONGITUDE), gps.get(GPS_LONGITUDE_REF, "E"))
+        if lat is not None and lon is not None:
+            result["gps"] = (lat, lon)
+    return result
+
+
+def read_metadata(file_path: Path, header: bytes | None = None) -> dict | None:
+    """
+    Kép metaadatainak (dátum, GPS) kiolvasása egyetlen megnyitással.
+    None, ha a formátum nem JPEG/PNG (ilyenkor a hívó más módszerrel próbálkozhat).
+    Ha a már beolvasott fejlécben (header) teljesen benne van az EXIF szegmens, a fájlt meg sem nyitja.
+    """
+    if header is not None:
+        if not (header.startswith(JPEG_SOI) or header[:8] == PNG_SIGNATURE):
+            return None
+        f = io.BytesIO(header)  # másolás nélkül a fejléc pufferén
+        block = read_exif_block(f)
+        if f.tell() < len(header):  # a bejárás a fejlécen belül véget ért: nem csonka
+            return parse_exif(block)
+    with open(file_path, "rb") as f:
+        head = f.read(8)
+        if not (head.startswith(JPEG_SOI) or head == PNG_SIGNATURE):
+            return None
+        f.seek(0)
+        return parse_exif(read_exif_block(f))
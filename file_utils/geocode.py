@@ -0,0 +1,216 @@
+"""
+Offline fordított geokódolás: GPS koordináta → legközelebbi település neve egy helyi helynévtárból.
+A helynévtárból (gazetteer.tsv vagy GeoNames cities*.txt) egyszer épül egy tömör bináris index,
+amit a folyamatok memóriába leképezve (mmap) nyitnak meg, így nincs beolvasás és feldolgozás
+induláskor. Az index 1°×1°-os rácscellákba rendezi a pontokat (cellánkénti kezdő pozícióval),
+a keresés csak a szomszédos cellákat nézi, a távolságokat NumPy-jal egyszerre számolja.
+
+Bináris formátum (little-endian):
+    fejléc: "BGZ1", pontok száma (uint32), névblokk hossza (uint32)
+    cella kezdőpozíciók: int32[CELLS + 1]
+    szélesség, hosszúság: float32[n], float32[n] (cellák szerint rendezve)
+    név eltolások: uint32[n + 1], majd az UTF-8 névblokk
+"""
+import math
+import mmap
+import os
+import struct
+from pathlib import Path
+
+from config import cfg, GEOCODE_MAX_KM
+from file_utils.common import log
+
+MAGIC = b"BGZ1"
+HEADER = struct.Struct("<4sII")
+ROWS, COLS = 180, 360
+CELLS = ROWS * COLS
+EARTH_KM = 6371.0
+KM_PER_DEG = math.pi * EARTH_KM / 180
+
+
+def _read_source(source: Path) -> list[tuple[float, float, str]]:
+    """
+    (szélesség, hosszúság, név) listája; a 19 oszlopos sorokat GeoNames formátumnak veszi
+    """
+    places = []
+    with open(source, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip() or line.startswith("#"):
+                continue
+            cols = line.rstrip("\n").split("\t")
+            try:
+                if len(cols) >= 19:
+                    name, lat, lon = cols[1], cols[4], cols[5]
+                else:
+                    name, _region, _country, lat, lon = cols[:5]
+                places.append((float(lat), float(lon), name.strip()))
+            except ValueError:
+                continue
+    return places
+
+
+def _cells(np, lats, lons):
+    rows = np.clip(np.floor(lats + 90), 0, ROWS - 1).astype(np.int64)
+    cols = np.floor(lons + 180).astype(np.int64) % COLS
+    return rows * COLS + cols
+
+
+def build_index(source: Path, target: Path) -> int:
+    """
+    Bináris index építése a helynévtárból; atomikusan cseréli a célfájlt.
+
+    :return: a pontok száma
+    """
+    import numpy as np
+
+    places = _read_source(source)
+    lats = np.array([p[0] for p in places], dtype=np.float64)
+    lons = np.array([p[1] for p in places], dtype=np.float64)
+    keys = _cells(np, lats, lons)
+    order = np.argsort(keys, kind="stable")
+    cell_start = np.zeros(CELLS + 1, dtype=np.int32)
+    np.cumsum(np.bincount(keys, minlength=CELLS), out=cell_start[1:])
+
+    names = [places[i][2].encode("utf-8") for i in order]
+    offsets = np.zeros(len(names) + 1, dtype=np.uint32)
+    np.cumsum([len(n) for n in names], out=offsets[1:])
+    blob = b"".join(names)
+
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp = target.with_name(f".{target.name}.{os.getpid()}.tmp")
+    with open(tmp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, len(names), len(blob)))
+        f.write(cell_start.astype("<i4").tobytes())
+        f.write(lats[order].astype("<f4").tobytes())
+        f.write(lons[order].astype("<f4").tobytes())
+        f.write(offsets.astype("<u4").tobytes())
+        f.write(blob)
+    os.replace(tmp, target)
+    return len(names)
+
+
+class PlaceIndex:
+    """
+    Memóriába leképezett helyindex; a tömbök közvetlenül az mmap-ra mutatnak (nincs másolás)
+    """
+
+    def __init__(self, path: Path):
+        import numpy as np
+        self.np = np
+        with open(path, "rb") as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, n, blob_len = HEADER.unpack_from(self.mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"Ismeretlen helyindex formátum: {path}")
+        offset = HEADER.size
+
+        def array(dtype, count):
+            nonlocal offset
+            arr = np.frombuffer(self.mm, dtype=dtype, count=count, offset=offset)
+            offset += arr.nbytes
+            return arr
+
+        self.cell_start = array("<i4", CELLS + 1)
+        self.lats = array("<f4", n)
+        self.lons = array("<f4", n)
+        self.name_offsets = array("<u4", n + 1)
+        self.blob_offset = offset
+        self.size = n
+
+    def name(self, i: int) -> str:
+        start, end = int(self.name_offsets[i]), int(self.name_offsets[i + 1])
+        return self.mm[self.blob_offset + start:self.blob_offset + end].decode("utf-8")
+
+    def _candidates(self, lat: float, lon: float, max_km: float):
+        """
+        A max_km sugarú kört lefedő cellák pontjainak index-tartományai
+        """
+        dlat = max_km / KM_PER_DEG
+        dlon = min(180.0, max_km / (KM_PER_DEG * max(math.cos(math.radians(lat)), 1e-6)))
+        row_lo = max(0, math.floor(lat - dlat + 90))
+        row_hi = min(ROWS - 1, math.floor(lat + dlat + 90))
+        col_lo, col_hi = math.floor(lon - dlon + 180), math.floor(lon + dlon + 180)
+        cols = range(col_lo, col_hi + 1) if col_hi - col_lo < COLS else range(COLS)
+        for row in range(row_lo, row_hi + 1):
+            for col in cols:
+                cell = row * COLS + col % COLS
+                start, end = self.cell_start[cell], self.cell_start[cell + 1]
+                if end > start:
+                    yield start, end
+
+    def nearest(self, coords: list[tuple[float, float]], max_km: float = GEOCODE_MAX_KM) -> list[tuple[int, float] | None]:
+        """
+        Kötegelt keresés: minden (lat, lon) párhoz a legközelebbi pont (index, távolság km),
+        vagy None, ha max_km-en belül nincs. A jelölt párok távolsága egyetlen vektoros lépés.
+        """
+        np = self.np
+        query_ids, point_ids = [], []
+        for q, (lat, lon) in enumerate(coords):
+            for start, end in self._candidates(lat, lon, max_km):
+                point_ids.append(np.arange(start, end))
+                query_ids.append(np.full(end - start, q))
+        results = [None] * len(coords)
+        if not point_ids:
+            return results
+        q_idx = np.concatenate(query_ids)
+        p_idx = np.concatenate(point_ids)
+        q_lat = np.radians(np.array([c[0] for c in coords], dtype=np.float64))[q_idx]
+        q_lon = np.radians(np.array([c[1] for c in coords], dtype=np.float64))[q_idx]
+        p_lat = np.radians(self.lats[p_idx].astype(np.float64))
+        p_lon = np.radians(self.lons[p_idx].astype(np.float64))
+        # haversine
+        a = np.sin((p_lat - q_lat) / 2) ** 2 + np.cos(q_lat) * np.cos(p_lat) * np.sin((p_lon - q_lon) / 2) ** 2
+        dist = 2 * EARTH_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+        order = np.lexsort((dist, q_idx))
+        firsts = order[np.unique(q_idx[order], return_index=True)[1]]
+        for i in firsts:
+            if dist[i] <= max_km:
+                results[int(q_idx[i])] = (int(p_idx[i]), float(dist[i]))
+        return results
+
+
+_index = None
+_disabled = False
+_cache = {}  # (lat, lon) ~100 m-re kerekítve → helynév | None
+
+
+def get_index() -> PlaceIndex | None:
+    """
+    Folyamatonként egy index; hiányzó vagy a forrásnál régebbi bináris fájlnál előbb felépíti
+    """
+    global _index, _disabled
+    if _index is not None or _disabled:
+        return _index
+    source, target = Path(cfg["gazetteer"]), Path(cfg["gazetteer_index"])
+    try:
+        if source.exists() and (not target.exists() or target.stat().st_mtime < source.stat().st_mtime):
+            count = build_index(source, target)
+            log(f"🗺️ Helyindex felépítve: {count} hely → {target}", level="INFO", module="img")
+        _index = PlaceIndex(target)
+    except ImportError as e:
+        _disabled = True
+        log(f"⚠️ Helynév-keresés kikapcsolva (hiányzó modul: {e.name})", level="WARNING", module="img", to_console=True)
+    except (OSError, ValueError) as e:
+        _disabled = True
+        log(f"⚠️ Helynév-keresés kikapcsolva: {e}", level="WARNING", module="img", to_console=True)
+    return _index
+
+
+def reverse_geocode(coords: list[tuple[float, float]], max_km: float = GEOCODE_MAX_KM) -> list[str | None]:
+    """
+    Koordináták → helynevek (vagy None) kötegelten; a már keresett pontok a gyorsítótárból jönnek
+    """
+    keys = [(round(lat, 3), round(lon, 3)) for lat, lon in coords]
+    missing = list(dict.fromkeys(k for k in keys if k not in _cache))
+    if missing:
+        index = get_index()
+        if index is None:
+            return [None] * len(coords)
+        for key, found in zip(missing, index.nearest(missing, max_km)):
+            _cache[key] = index.name(found[0]) if found else None
+    return [_cache[k] for k in keys]
+
+
+def place_name(lat: float, lon: float) -> str | None:
+    return reverse_geocode([(lat, lon)])[0]
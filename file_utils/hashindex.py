@@ -0,0 +1,241 @@
+"""
+Perzisztens tartalom-hash index (SQLite).
+Fájlonként eltárolja a forrás méretét, mtime-ját, tartalom-hash-ét és a kiválasztott célhelyet.
+Teljes hash csak akkor készül, ha a fájl mérete ütközik egy már ismert mérettel.
+Egy forrásútvonalhoz több bejegyzés is tartozhat (ugyanott később megjelenő más tartalom),
+így a korábban onnan rendezett fájlok nyoma sem vész el.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+from pathlib import Path
+
+from config import cfg, HASH_CHUNK_SIZE
+from file_utils.common import log
+
+# ennyi rögzítés után commitol (egy tranzakció sok bejegyzéshez)
+COMMIT_EVERY = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    source TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    hash TEXT,
+    destination TEXT NOT NULL,
+    UNIQUE (source, size, mtime, destination)
+);
+CREATE INDEX IF NOT EXISTS files_source ON files(source);
+CREATE INDEX IF NOT EXISTS files_size ON files(size);
+CREATE INDEX IF NOT EXISTS files_hash ON files(hash);
+"""
+
+
+def file_hash(path: Path, chunk_size: int = HASH_CHUNK_SIZE, head: bytes | None = None) -> str:
+    """
+    Fájl tartalmának hash-e nagy blokkokban, egyetlen újrahasznosított pufferrel olvasva.
+    A már beolvasott fejlécet (head: a fájl első bájtjai) nem olvassa újra.
+    """
+    h = hashlib.blake2b(digest_size=20)
+    buf = bytearray(chunk_size)
+    view = memoryview(buf)
+    with open(path, "rb", buffering=0) as f:
+        if head:
+            h.update(head)
+            f.seek(len(head))
+        while True:
+            n = f.readinto(buf)
+            if not n:
+                break
+            h.update(view[:n])
+    return h.hexdigest()
+
+
+class HashIndex:
+    """
+    Egy futás alatt a fő folyamat használja; a méretek halmaza memóriában van,
+    így a méret szerinti ütközésvizsgálat nem igényel lekérdezést.
+    """
+
+    def __init__(self, db_path: Path = None):
+        db_path = Path(db_path or cfg["index_db"])
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self.conn.executescript(_SCHEMA)
+        self.lock = threading.Lock()
+        self.uncommitted = 0
+        self.sizes = {row[0] for row in self.conn.execute("SELECT DISTINCT size FROM files")}
+
+    def close(self):
+        with self.lock:
+            self.conn.commit()
+            self.conn.close()
+
+    def _hash_known(self, size: int):
+        """
+        Az azonos méretű, még hash nélküli bejegyzések célfájljainak hash-elése (lusta kitöltés)
+        """
+        rows = self.conn.execute(
+            "SELECT id, destination FROM files WHERE size = ? AND hash IS NULL", (size,)
+        ).fetchall()
+        for row_id, destination in rows:
+            dest = Path(destination)
+            if dest.is_file() and dest.stat().st_size == size:
+                self.conn.execute("UPDATE files SET hash = ? WHERE id = ?", (file_hash(dest), row_id))
+
+    def lookup(self, file_path: Path, st: os.stat_result, head: bytes | None = None):
+        """
+        Megnézi, ismert-e a fájl tartalma (head: a már beolvasott fejléc, a hash-eléshez).
+
+        :return: (hash, korábbi célhely) pár; hash None, ha a méret nem ütközött semmivel,
+                 célhely None, ha a tartalom még nem volt rendezve
+        """
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT hash, destination FROM files WHERE source = ? AND size = ? AND mtime = ? ORDER BY id DESC",
+                (str(file_path), st.st_size, st.st_mtime),
+            ).fetchone()
+            if row and row[0]:
+                digest = row[0]
+            elif st.st_size in self.sizes:
+                self._hash_known(st.st_size)
+                digest = file_hash(file_path, head=head)
+            else:
+                return None, None
+
+            match = self.conn.execute(
+                "SELECT destination FROM files WHERE hash = ? AND size = ? ORDER BY id DESC",
+                (digest, st.st_size),
+            ).fetchone()
+            return digest, (Path(match[0]) if match else None)
+
+    def record(self, file_path: Path, st: os.stat_result, digest: str, destination: Path):
+        """
+        Feldolgozott fájl rögzítése a kiválasztott célhellyel
+        """
+        with self.lock:
+            self.conn.execute(
+                "INSERT INTO files (source, size, mtime, hash, destination) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (source, size, mtime, destination) DO UPDATE SET hash = COALESCE(excluded.hash, hash)",
+                (str(file_path), st.st_size, st.st_mtime, digest, str(destination)),
+            )
+            self.sizes.add(st.st_size)
+            self.uncommitted += 1
+            if self.uncommitted >= COMMIT_EVERY:
+                self.conn.commit()
+                self.uncommitted = 0
+
+    def forget(self, file_path: Path, destination: Path = None):
+        """
+        Forrás bejegyzésének törlése (pl. visszafordított áthelyezés után); destination megadásával
+        csak az ide rendezett bejegyzésé
+        """
+        with self.lock:
+            if destination is None:
+                self.conn.execute("DELETE FROM files WHERE source = ?", (str(file_path),))
+            else:
+                self.conn.execute("DELETE FROM files WHERE source = ? AND destination = ?",
+                                  (str(file_path), str(destination)))
+            self.uncommitted += 1
+
+    def relocate(self, old_destination: Path, new_destination: Path):
+        """
+        Rendezett fájl célhelyének frissítése (pl. újraosztályozás utáni áthelyezéskor)
+        """
+        with self.lock:
+            self.conn.execute("UPDATE OR REPLACE files SET destination = ? WHERE destination = ?",
+                              (str(new_destination), str(old_destination)))
+            self.uncommitted += 1
+
+    def commit(self):
+        with self.lock:
+            self.conn.commit()
+            self.uncommitted = 0
+
+
+class RunCopies:
+    """
+    A futás közben még célhely nélküli (függő) fájlok tartalom szerint. Az index csak az eredmény után
+    rögzít, így egy ablaknyi, egyszerre előkészített feladat között az azonos tartalmú másolatok
+    nem látszanak: ezeket itt tartjuk vissza, amíg az első példány a helyére nem kerül.
+    Hash csak akkor készül, ha két függő fájl mérete egyezik. Csak a fő szál használja.
+    """
+
+    def __init__(self):
+        self.by_size = {}   # méret → függő fájlok
+        self.digests = {}   # függő fájl → hash (ha már kiszámolódott)
+        self.first = {}     # hash → az első függő példány
+        self.held = {}      # első példány → [(visszatartott másolat, stat, hash), ...]
+
+    def _digest(self, file_path: Path, head: bytes | None = None) -> str | None:
+        if file_path not in self.digests:
+            try:
+                self.digests[file_path] = file_hash(file_path, head=head)
+            except OSError:  # a kezelője közben áthelyezte
+                return None
+            self.first.setdefault(self.digests[file_path], file_path)
+        return self.digests[file_path]
+
+    def hold(self, file_path: Path, st: os.stat_result, digest: str | None, head: bytes | None = None):
+        """
+        Függő fájl felvétele. Ha egy még függő fájl azonos tartalmú másolata, visszatartja.
+
+        :return: (hash, visszatartva-e); a hash None, ha nem volt azonos méretű függő fájl
+        """
+        same_size = self.by_size.setdefault(st.st_size, [])
+        if digest is not None:
+            self.digests[file_path] = digest
+        if same_size:
+            for other in same_size:
+                self._digest(other)
+            digest = self._digest(file_path, head)
+        if digest is not None:
+            first = self.first.setdefault(digest, file_path)
+            if first != file_path:
+                del self.digests[file_path]
+                self.held.setdefault(first, []).append((file_path, st, digest))
+                return digest, True
+        same_size.append(file_path)
+        return digest, False
+
+    def settle(self, file_path: Path, st: os.stat_result) -> list:
+        """
+        A függő fájl eredménye után: kivétel a függők közül; visszatér a visszatartott másolataival
+        """
+        same_size = self.by_size.get(st.st_size, [])
+        if file_path in same_size:
+            same_size.remove(file_path)
+            if not same_size:
+                del self.by_size[st.st_size]
+        digest = self.digests.pop(file_path, None)
+        if digest is not None and self.first.get(digest) == file_path:
+            del self.first[digest]
+        return self.held.pop(file_path, [])
+
+
+# A futás indexe a fő folyamatban (main állítja be); a fő szálon futó kezelők is ezt használják
+# (pl. a ZIP tagok, amelyek nem a bejárón keresztül érkeznek). None: nincs index.
+_index = None
+
+def set_index(index: HashIndex | None):
+    global _index
+    _index = index
+
+def get_index() -> HashIndex | None:
+    return _index
+
+
+def is_same_content(destination: Path, size: int, digest: str | None) -> bool:
+    """
+    A korábbi célhelyen még ott van-e az azonos tartalom. A célfájl azóta módosulhatott vagy
+    lecserélődhetett (és az index sora is elavulhatott), ezért törlés előtt a hash-e is újraszámolódik.
+    """
+    if digest is None:
+        return False
+    try:
+        return destination.is_file() and destination.stat().st_size == size and file_hash(destination) == digest
+    except OSError as e:
+        log(f"⚠️ Célhely ellenőrzési hiba: {destination} – {e}", level="WARNING", module="index")
+        return False
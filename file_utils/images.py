@@ -1,25 +1,66 @@
-from PIL import Image
-from PIL.ExifTags import TAGS, GPSTAGS
+from collections import Counter
 from datetime import datetime
+from functools import partial
 import os
 from pathlib import Path
-import shutil
 import time
 
 from file_utils.common import log
-from file_utils.common import log_rename
 from file_utils.common import get_file_creation_date
-from file_utils.common import ensure_unique_filename
-from config import cfg
+from file_utils.common import move_unique, is_planning
+from file_utils.exif import read_metadata
+from file_utils.geocode import place_name, reverse_geocode
+from file_utils.metrics import stage
+from file_utils.registry import FollowUp, LazyHandler
+from config import cfg, NEAR_DUPLICATES, EVENT_GAP_HOURS, EVENT_RADIUS_KM, EVENT_MIN_PHOTOS
 
 out_dir = cfg["img_output"]
-out_dir.mkdir(parents=True, exist_ok=True)
+review_dir = cfg["img_review_output"]
+
+
+def read_image_metadata(file_path: Path, header: bytes | None = None) -> dict:
+    """
+    Kép metaadatai (dátum, GPS) egyetlen megnyitással.
+    JPEG/PNG esetén csak az EXIF szegmenst olvassa, pixeladatot nem dekódol;
+    más formátumnál a PIL-re esik vissza, determinisztikusan lezárt fájllal.
+
+    :return: {"date": datetime | None, "gps": (lat, lon) | None}
+    """
+    metadata = read_metadata(file_path, header)
+    if metadata is not None:
+        return metadata
+
+    from PIL import Image  # csak nem JPEG/PNG képekhez kell
+    from PIL.ExifTags import TAGS, GPSTAGS
+
+    metadata = {"date": None, "gps": None}
+    with Image.open(file_path) as img:
+        exif_data = img._getexif() if hasattr(img, "_getexif") else None
+    if not exif_data:
+        return metadata
+    for tag_name in ["DateTimeOriginal", "DateTimeDigitized", "DateTime"]:
+        for tag, value in exif_data.items():
+            if TAGS.get(tag) == tag_name:
+                metadata["date"] = datetime.strptime(value, "%Y:%m:%d %H:%M:%S")
+                break
+        if metadata["date"]:
+            break
+    gps_info = exif_data.get(34853)  # GPSInfo kulcs számkódja: 34853
+    if gps_info:
+        gps_data = {GPSTAGS.get(key, key): gps_info[key] for key in gps_info}
+        if 'GPSLatitude' in gps_data and 'GPSLongitude' in gps_data:
+            lat = get_decimal_from_dms(gps_data['GPSLatitude'], gps_data.get('GPSLatitudeRef'))
+            lon = get_decimal_from_dms(gps_data['GPSLongitude'], gps_data.get('GPSLongitudeRef'))
+            if lat is not None and lon is not None:
+                metadata["gps"] = (lat, lon)
+    return metadata
 
 
 def get_exif_date_info(
     file_path: Path,
     as_string: bool = False,
-    fallback_to_mtime: bool = True
+    fallback_to_mtime: bool = True,
+    metadata: dict | None = None
 ) -> str | dict | None:
     """
     EXIF dátum olvasása képfájlból. (A fénykép készítési időpontjának kiolvasása képfájl EXIF metainformációiból telefonnal készült képeknél.)
@@ -27,29 +68,22 @@ def get_exif_date_info(
     :param file_path: A képfájl elérési útja.
     :param as_string: Ha True, akkor "YYYY_MM_DD" formátumú stringet ad vissza. Egyébként dict.
     :param fallback_to_mtime: Ha nincs EXIF, visszatér-e fájl módosítási dátummal.
+    :param metadata: Már kiolvasott read_image_metadata eredmény (ne kelljen újra megnyitni a fájlt).
     :return: dict vagy string (vagy None, ha nem található dátum és nincs fallback)
     """
     try:
-        img = Image.open(file_path)
-        exif_data = img._getexif()
-        if not exif_data:
-            raise ValueError("Nincs EXIF adat a képen.")
-
-        # Keressük a DateTimeOriginal mezőt először
-        for tag, value in exif_data.items():
-            decoded = TAGS.get(tag)
-            if decoded in ["DateTimeOriginal", "DateTimeDigitized", "DateTime"]:
-                dt_str = value
-                date_taken = datetime.strptime(dt_str, "%Y:%m:%d %H:%M:%S")
-                if as_string:
-                    return date_taken.strftime("%Y_%m_%d")
-                return {
-                    "year": date_taken.year,
-                    "month": date_taken.month,
-                    "day": date_taken.day
-                }
-
-        raise ValueError("Nem található EXIF dátum mező.")
+        if metadata is None:
+            metadata = read_image_metadata(file_path)
+        date_taken = metadata["date"]
+        if not date_taken:
+            raise ValueError("Nem található EXIF dátum mező.")
+        if as_string:
+            return date_taken.strftime("%Y_%m_%d")
+        return {
+            "year": date_taken.year,
+            "month": date_taken.month,
+            "day": date_taken.day
+        }
 
     except Exception as e:
         log(f"⚠️ EXIF dátum olvasási hiba: {file_path.name} – {e}", level="WARNING", module="image")
@@ -89,33 +123,13 @@ def get_gps_info(exif_data):
     return None
 """
 
-def get_gps_info(image_path):
+def get_gps_info(image_path, metadata: dict | None = None):
     try:
-        img = Image.open(image_path)
-        exif_data = img._getexif()
-        if not exif_data:
-            raise ValueError("Nincs EXIF adat a képen.")            
-
-        gps_info = exif_data.get(34853)  # GPSInfo kulcs számkódja: 34853
-        if not gps_info:
+        if metadata is None:
+            metadata = read_image_metadata(image_path)
+        if not metadata["gps"]:
             raise ValueError("Nem található EXIF helyadat mező.")
-
-        gps_data = {}
-        for key in gps_info:
-            decode = GPSTAGS.get(key, key)
-            gps_data[decode] = gps_info[key]
-
-        # Koordináta konverzió
-        lat = lon = None
-        if 'GPSLatitude' in gps_data and 'GPSLatitudeRef' in gps_data:
-            lat = get_decimal_from_dms(gps_data['GPSLatitude'], gps_data['GPSLatitudeRef'])
-        if 'GPSLongitude' in gps_data and 'GPSLongitudeRef' in gps_data:
-            lon = get_decimal_from_dms(gps_data['GPSLongitude'], gps_data['GPSLongitudeRef'])
-
-        #return {"lat": lat, "lon": lon}
-        return (lat, lon)
-
-      
+        return metadata["gps"]
 
     except Exception as e:
         log(f"⚠️ EXIF helyadat (GPS) olvasási hiba: {image_path.name} – {e}", level="WARNING", module="image")        
@@ -140,49 +154,146 @@ def get_decimal_from_dms(dms, ref):
         return None
 
 
-def move_img_file(file_path: Path, target_path: Path):
+def move_img_file(file_path: Path, target_path: Path, reason: str = "KÉP") -> Path:
     """
-    Kép fájl áthelyezése
+    Kép fájl áthelyezése (foglalt név esetén egyedi toldalékkal)
     """
-    target_dir = target_path.parent
-    target_dir.mkdir(parents=True, exist_ok=True)    
-    shutil.move(str(file_path), str(target_path))
-    log_rename(str(file_path), str(target_path))
+    target_path = move_unique(file_path, target_path, reason)
     #print(f"[IMG] Áthelyezve: {file_path.name} → {target_dir}")
-    log(f"[KÉP] Áthelyezve: {target_path.relative_to(out_dir.parent)}", module="image", to_console=True)
+    if not is_planning():
+        log(f"[KÉP] Áthelyezve: {target_path.relative_to(out_dir.parent)}", module="image", to_console=True)
+    return target_path
 
 
-def process_image(file_path: Path):
+def process_image(file_path: Path, metadata: dict | None = None, event_dir: Path | None = None,
+                  header: bytes | None = None):
+    """
+    Kép áthelyezése a dátum (és hely) szerinti napi mappába, vagy ha a kötegelt csoportosítás
+    eseményhez rendelte, az esemény mappájába (event_dir, az IMG mappához képest).
+    A header a fájl már beolvasott eleje (benne az EXIF szegmens, ha elfér).
+    """
     try:
         # Dátum kinyerése
-        datum = get_exif_date_info(file_path, as_string=True) or get_file_creation_date(file_path)
-        ev = datum.split("_")[0]
-        subdir = f"{datum} -"
-        target_dir = out_dir / ev / subdir
-        target_dir.mkdir(parents=True, exist_ok=True)
-        
-        gps = get_gps_info(file_path)
-        if gps:
-            lat, lon = gps
+        if metadata is None:
             try:
-                lat_f = float(lat)
-                lon_f = float(lon)
-                subdir += f" {lat_f:.5f}_{lon_f:.5f}"
-                log(f"[GPS] Helyadat: {file_path.name}; {lat_f:.5f}, {lon_f:.5f} → https://maps.google.com/?q={lat_f:.5f},{lon_f:.5f}", module="img", to_console=True)
-            except (ValueError, TypeError) as e:
-                log(f"⚠️ Helyadat konverziós hiba: {file_path.name} – {e}", level="ERROR", module="img", to_console=True)
-            
-
-        # Duplikátumkezelés
-        new_path = ensure_unique_filename(target_dir / file_path.name)
-
-        move_img_file(file_path, new_path)
+                with stage("extract"):
+                    metadata = read_image_metadata(file_path, header)
+            except Exception as e:
+                log(f"⚠️ EXIF olvasási hiba: {file_path.name} – {e}", level="WARNING", module="image")
+                metadata = {"date": None, "gps": None}
+
+        if event_dir is not None:
+            target_dir = out_dir / event_dir
+            datum = event_dir.name
+        else:
+            with stage("resolve-destination"):
+                datum = get_exif_date_info(file_path, as_string=True, metadata=metadata) or get_file_creation_date(file_path)
+            ev = datum.split("_")[0]
+            subdir = f"{datum} -"
+
+            gps = get_gps_info(file_path, metadata=metadata)
+            if gps:
+                lat, lon = gps
+                try:
+                    lat_f = float(lat)
+                    lon_f = float(lon)
+                    log(f"[GPS] Helyadat: {file_path.name}; {lat_f:.5f}, {lon_f:.5f} → https://maps.google.com/?q={lat_f:.5f},{lon_f:.5f}", module="img", to_console=True)
+                    # helynév a helyi helynévtárból; ha nincs a közelben, ~10 km-re kerekített koordináta
+                    with stage("geocode"):
+                        place = place_name(lat_f, lon_f)
+                    subdir += f" {place.replace(os.sep, '-')}" if place else f" {lat_f:.1f}_{lon_f:.1f}"
+                except (ValueError, TypeError) as e:
+                    log(f"⚠️ Helyadat konverziós hiba: {file_path.name} – {e}", level="ERROR", module="img", to_console=True)
+            target_dir = out_dir / ev / subdir
+
+        # Duplikátumkezelés: a move_unique zár alatt választ egyedi nevet
+        def move(similar: str | None) -> Path:
+            if similar is not None:
+                # közel-duplikátum (átméretezett, újratömörített másolat): átnézendők közé
+                return move_img_file(file_path, review_dir / file_path.name, f"KÉP: közel-duplikátum ≈ {Path(similar).name}")
+            return move_img_file(file_path, target_dir / file_path.name, f"KÉP: {datum}")
+
+        if NEAR_DUPLICATES:
+            from file_utils.phash import move_unless_near_duplicate
+            return move_unless_near_duplicate(file_path, move)
+        return move(None)
 
     except Exception as e:
         log(f"⚠️ Hiba KÉP feldolgozásánál: {file_path.name} – {e}", level="ERROR", module = "img", to_console=True)
 
 
+def _event_dirs(times: list[float], coords: list[tuple[float, float] | None], labels) -> dict[int, Path]:
+    """
+    Eseménymappák: <kezdés éve>/<kezdőnap>–<zárónap> - <leggyakoribb helynév>.
+    Azonos nevű események (pl. egy napon két esemény ugyanott) sorszámot kapnak.
+    """
+    members = {}
+    for i, label in enumerate(labels.tolist()):
+        if label >= 0:
+            members.setdefault(label, []).append(i)
+
+    located = [i for i, c in enumerate(coords) if c is not None]
+    with stage("geocode"):
+        names = dict(zip(located, reverse_geocode([coords[i] for i in located])))
+
+    dirs, used = {}, {}
+    for label in sorted(members):
+        first = datetime.fromtimestamp(min(times[i] for i in members[label]))
+        last = datetime.fromtimestamp(max(times[i] for i in members[label]))
+        name = first.strftime("%Y_%m_%d")
+        if last.date() != first.date():
+            name += f"–{last.strftime('%Y_%m_%d')}"
+        places = Counter(names[i] for i in members[label] if names.get(i))
+        name += f" - {places.most_common(1)[0][0].replace(os.sep, '-')}" if places else " -"
+        used[name] = used.get(name, 0) + 1
+        if used[name] > 1:
+            name += f" ({used[name]})"
+        dirs[label] = Path(str(first.year)) / name
+    return dirs
+
+
+def process_image_batch(paths: list[Path]) -> list[tuple[Path, FollowUp]]:
+    """
+    A köteg összes képének eseményekbe csoportosítása idő és hely szerint (events.cluster_events).
+    Itt csak a (fejlécből olvasott) EXIF adatok és a csoportosítás fut; képenként a process_image
+    (perceptuális hash, áthelyezés az esemény mappájába) folytatásként a process poolba kerül.
+    Az eseményhez nem tartozó képek a napi mappákba kerülnek.
+    """
+    metadata = {}
+    with stage("extract"):
+        for file_path in paths:
+            try:
+                metadata[file_path] = read_image_metadata(file_path)
+            except Exception as e:
+                log(f"⚠️ EXIF olvasási hiba: {file_path.name} – {e}", level="WARNING", module="image")
+                metadata[file_path] = {"date": None, "gps": None}
 
-
-
-
+    event_of = {}
+    try:
+        from file_utils.events import cluster_events
+    except ImportError as e:
+        log(f"⚠️ Eseményekbe csoportosítás kihagyva (hiányzó modul: {e.name})", level="WARNING", module="img", to_console=True)
+    else:
+        times, coords = [], []
+        for file_path in paths:
+            date, gps = metadata[file_path]["date"], metadata[file_path]["gps"]
+            try:
+                times.append(date.timestamp() if date else file_path.stat().st_mtime)
+            except OSError:  # közben eltűnt: az áthelyezés úgyis hibát jelez
+                times.append(0.0)
+            coords.append((float(gps[0]), float(gps[1])) if gps else None)
+        with stage("cluster"):
+            labels = cluster_events(
+                times,
+                [c[0] if c else float("nan") for c in coords],
+                [c[1] if c else float("nan") for c in coords],
+                EVENT_GAP_HOURS * 3600, EVENT_RADIUS_KM, EVENT_MIN_PHOTOS,
+            )
+        dirs = _event_dirs(times, coords, labels)
+        event_of = {file_path: dirs[label] for file_path, label in zip(paths, labels.tolist()) if label >= 0}
+        log(f"📅 {len(paths)} kép → {len(dirs)} esemény, {len(paths) - len(event_of)} kép napi mappába",
+            level="INFO", module="img", to_console=True)
+
+    handler = LazyHandler("file_utils.images:process_image")
+    return [(file_path, FollowUp(partial(handler, metadata=metadata[file_path], event_dir=event_of.get(file_path)), "cpu"))
+            for file_path in paths]
@@ -0,0 +1,289 @@
+"""
+Írás előtti napló (write-ahead journal) az áthelyezésekhez.
+Futásonként egy csak hozzáfűzött JSONL fájl: minden áthelyezés előtt "intent", utána
+"done" / "failed" bejegyzés, a futás végén "end". Egy megszakadt futás (nincs "end")
+a következő indításkor a napló alapján befejezhető vagy visszagörgethető, az --undo
+pedig egy teljes futás áthelyezéseit fordítja vissza.
+A futó folyamat a naplója mellett egy zárfájlt tart kizárólagos zár alatt (az operációs rendszer
+a folyamat halálakor elengedi): amíg a zár foglalt, a futás él, azt sem helyreállítani, sem
+visszafordítani nem szabad (pl. egy --watch démon mellett indított második futásnál).
+"""
+import json
+import os
+import platform
+import shutil
+import time
+from pathlib import Path
+
+from config import cfg, JOURNAL_FSYNC
+from file_utils.common import log
+from file_utils.hashindex import file_hash
+
+if platform.system() == "Windows":
+    import msvcrt
+else:
+    import fcntl
+
+
+def _lock_path(path: Path) -> Path:
+    return Path(path).with_suffix(".lock")
+
+
+def try_lock(path: Path) -> int | None:
+    """
+    A napló zárfájljának kizárólagos zárolása várakozás nélkül
+
+    :return: a zárat tartó leíró, vagy None, ha egy másik (élő) folyamat tartja
+    """
+    fd = os.open(_lock_path(path), os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        if platform.system() == "Windows":
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+        else:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        os.close(fd)
+        return None
+    return fd
+
+
+def release_lock(path: Path, fd: int):
+    """
+    A zár elengedése a napló lezárása ("end") után; a zárfájl törlődik (Windows alatt, ha épp nyitva van, marad)
+    """
+    try:
+        _lock_path(path).unlink()
+    except OSError:
+        pass
+    os.close(fd)
+
+
+class Journal:
+    """
+    Egy futás naplója. Több folyamatból is írható: minden folyamat saját, O_APPEND módban
+    nyitott leírót használ, és egy bejegyzés egyetlen write() hívás (a move_unique zárja alatt).
+    Picklelhető, így a process pool workerek is megkapják.
+    """
+
+    def __init__(self, path: Path, fsync: bool = JOURNAL_FSYNC):
+        self.path = Path(path)
+        self.fsync = fsync
+        self.fd = None
+        self.pid = None
+        self.seq = 0
+        self.lock_fd = None
+
+    @classmethod
+    def create(cls, directory: Path = None) -> "Journal":
+        """
+        Új futás naplója időbélyeg alapú azonosítóval; a zár a begin bejegyzés előtt foglalódik,
+        így egy párhuzamos helyreállítás sosem látja élő futás naplóját gazdátlannak
+        """
+        directory = Path(directory or cfg["journal_dir"])
+        directory.mkdir(parents=True, exist_ok=True)
+        journal = cls(directory / f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}.jsonl")
+        journal.lock_fd = try_lock(journal.path)
+        journal.write({"op": "begin", "pid": os.getpid(), "host": platform.node()})
+        return journal
+
+    @property
+    def run_id(self) -> str:
+        return self.path.stem
+
+    def _open(self):
+        if self.pid != os.getpid():
+            # fork után a szülő leíróját nem használjuk tovább
+            self.fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            self.pid = os.getpid()
+            self.seq = 0
+
+    def write(self, record: dict):
+        self._open()
+        record["ts"] = round(time.time(), 3)
+        os.write(self.fd, (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8"))
+        if self.fsync:
+            os.fsync(self.fd)
+
+    def intent(self, source: Path, destination: Path) -> str:
+        self._open()
+        self.seq += 1
+        entry_id = f"{os.getpid()}-{self.seq}"
+        self.write({"op": "intent", "id": entry_id, "src": str(source), "dst": str(destination)})
+        return entry_id
+
+    def done(self, entry_id: str):
+        self.write({"op": "done", "id": entry_id})
+
+    def failed(self, entry_id: str):
+        self.write({"op": "failed", "id": entry_id})
+
+    def end(self, **extra):
+        self.write({"op": "end", **extra})
+        if self.fd is not None and self.pid == os.getpid():
+            os.close(self.fd)
+            self.fd = None
+            self.pid = None
+        if self.lock_fd is not None:
+            release_lock(self.path, self.lock_fd)
+            self.lock_fd = None
+
+    def __getstate__(self):
+        return {"path": self.path, "fsync": self.fsync}
+
+    def __setstate__(self, state):
+        self.__init__(state["path"], state["fsync"])
+
+
+def read_journal(path: Path) -> list[dict]:
+    """
+    Napló beolvasása; a félbe írt utolsó sort (összeomlás közben) kihagyja
+    """
+    records = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue
+    return records
+
+
+def _moves(records: list[dict]) -> dict:
+    """
+    id → [intent bejegyzés, állapot] (állapot: None, "done", "failed", "undone" ...), sorrendben
+    """
+    moves = {}
+    for record in records:
+        if record["op"] == "intent":
+            moves[record["id"]] = [record, None]
+        elif record.get("id") in moves:
+            moves[record["id"]][1] = record["op"]
+    return moves
+
+
+def _same_file(source: Path, destination: Path) -> bool:
+    try:
+        return source.stat().st_size == destination.stat().st_size and file_hash(source) == file_hash(destination)
+    except OSError:
+        return False
+
+
+def _settle(journal: Journal, entry_id: str, source: Path, destination: Path, index=None) -> str:
+    """
+    Egy befejezetlen áthelyezés lezárása a fájlrendszer állapota alapján:
+    - csak a cél létezik: az áthelyezés megtörtént → done
+    - csak a forrás létezik: el sem kezdődött → rolledback
+    - mindkettő: félbeszakadt másolás; teljes másolatnál a forrás törlődik (done),
+      csonka másolatnál a cél (rolledback)
+    """
+    src_exists, dst_exists = source.exists(), destination.exists()
+    if src_exists and dst_exists:
+        if _same_file(source, destination):
+            source.unlink()
+            src_exists = False
+        else:
+            destination.unlink()
+            dst_exists = False
+    if dst_exists and not src_exists:
+        op = "done"
+        if index is not None:
+            index.record(source, destination.stat(), None, destination)
+    elif src_exists:
+        op = "rolledback"
+    else:
+        op = "lost"
+        log(f"⚠️ Napló: sem a forrás, sem a cél nem található: {source} → {destination}",
+            level="WARNING", module="journal", to_console=True)
+    journal.write({"op": op, "id": entry_id})
+    return op
+
+
+def recover(directory: Path = None, index=None) -> dict:
+    """
+    Megszakadt futások (nincs "end" bejegyzés) befejezése vagy visszagörgetése a napló alapján,
+    a bemenet újrabejárása és a fájlok újraelemzése nélkül. A befejezett áthelyezések az indexbe
+    is bekerülnek, így azonos tartalom később sem elemződik újra.
+
+    :return: összesítés állapotonként
+    """
+    directory = Path(directory or cfg["journal_dir"])
+    counts = {}
+    if not directory.is_dir():
+        return counts
+    for path in sorted(directory.glob("*.jsonl")):
+        if any(r["op"] == "end" for r in read_journal(path)):
+            continue
+        lock_fd = try_lock(path)
+        if lock_fd is None:
+            log(f"⏭️ Napló kihagyva, a futás még tart: {path.stem}", level="INFO", module="journal")
+            continue
+        # a zár megszerzése előtt a futás még lezárhatta a naplót
+        records = read_journal(path)
+        if any(r["op"] == "end" for r in records):
+            os.close(lock_fd)
+            continue
+        journal = Journal(path)
+        journal.lock_fd = lock_fd
+        for entry_id, (intent, state) in _moves(records).items():
+            if state is None:
+                state = _settle(journal, entry_id, Path(intent["src"]), Path(intent["dst"]), index)
+                counts[state] = counts.get(state, 0) + 1
+            elif state == "done" and index is not None:
+                destination = Path(intent["dst"])
+                if destination.exists():
+                    index.record(Path(intent["src"]), destination.stat(), None, destination)
+        journal.end(recovered=True)
+        log(f"🩹 Megszakadt futás helyreállítva: {journal.run_id} – {counts}", level="INFO",
+            module="journal", to_console=True)
+    return counts
+
+
+def undo(run_id: str = None, directory: Path = None, index=None) -> int:
+    """
+    Egy futás áthelyezéseinek visszafordítása fordított sorrendben (alapértelmezés: a legutóbbi
+    futás). Ismételten futtatható: a már visszafordított tételeket kihagyja.
+    A futás közben törölt fájlok (ideiglenes fájlok, duplikátumok) nem állíthatók vissza.
+
+    :return: a visszahelyezett fájlok száma
+    """
+    directory = Path(directory or cfg["journal_dir"])
+    runs = sorted(directory.glob("*.jsonl"), reverse=True) if directory.is_dir() else []
+    moves = None
+    for path in runs:
+        if run_id and path.stem != run_id:
+            continue
+        lock_fd = try_lock(path)
+        if lock_fd is None:
+            log(f"⏭️ Futó folyamat naplója, nem fordítható vissza: {path.stem}", level="WARNING",
+                module="journal", to_console=True)
+            if run_id:
+                break
+            continue
+        moves = _moves(read_journal(path))
+        if run_id or any(state == "done" for _, state in moves.values()):
+            break
+        os.close(lock_fd)
+        moves = None
+    if moves is None:
+        log(f"❌ Nincs visszafordítható futás: {run_id or directory}", level="ERROR", module="journal", to_console=True)
+        return 0
+    journal = Journal(path)
+    journal.lock_fd = lock_fd
+    restored = 0
+    for entry_id, (intent, state) in reversed(list(moves.items())):
+        if state != "done":
+            continue
+        source, destination = Path(intent["src"]), Path(intent["dst"])
+        if source.exists() or not destination.exists():
+            log(f"⚠️ Nem fordítható vissza: {destination} → {source}", level="WARNING", module="journal", to_console=True)
+            continue
+        source.parent.mkdir(parents=True, exist_ok=True)
+        shutil.move(str(destination), str(source))
+        journal.write({"op": "undone", "id": entry_id})
+        if index is not None:
+            index.forget(source, destination)
+        restored += 1
+        log(f"↩️ Visszahelyezve: {destination} → {source}", level="INFO", module="journal")
+    journal.end(undo=True)
+    log(f"↩️ Futás visszafordítva: {journal.run_id} – {restored} fájl", level="INFO", module="journal", to_console=True)
+    return restored
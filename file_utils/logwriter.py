@@ -0,0 +1,117 @@
+"""
+Pufferelt, nem blokkoló naplóíró.
+A log() hívások csak egy sorba teszik a bejegyzést; a fájlba írást egy háttérszál végzi
+kötegekben (időközönként, hibánál és kilépéskor), méret alapú rotációval.
+"""
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from multiprocessing import util as mp_util
+from pathlib import Path
+
+
+class LogWriter:
+    def __init__(self, path: Path, fmt: str = "text", flush_interval: float = 1.0,
+                 max_bytes: int = 0, backup_count: int = 5):
+        """
+        :param fmt: "text" (olvasható sorok) vagy "jsonl" (soronként egy JSON objektum)
+        :param flush_interval: háttérírás gyakorisága másodpercben
+        :param max_bytes: ekkora méret fölött rotál (0 = nincs rotáció)
+        :param backup_count: megtartott régi naplófájlok száma (log.txt.1 ... log.txt.N)
+        """
+        self.path = Path(path)
+        self.fmt = fmt
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.queue = queue.SimpleQueue()
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.pid = None
+        atexit.register(self.flush)
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._reset_after_fork)
+
+    def _reset_after_fork(self):
+        """
+        Fork után a szülő sorát, zárát és szálát nem örököljük (a zár foglalt állapotban is maradhatott)
+        """
+        self.queue = queue.SimpleQueue()
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.pid = None
+
+    def _ensure_thread(self):
+        """
+        Háttérszál indítása (folyamatonként egyszer, fork után a gyerekben újra)
+        """
+        if self.pid == os.getpid():
+            return
+        with self.lock:
+            if self.pid == os.getpid():
+                return
+            self.pid = os.getpid()
+            threading.Thread(target=self._run, name="log-writer", daemon=True).start()
+            # a pool workerekben az atexit nem fut le, a multiprocessing finalizer viszont igen
+            mp_util.Finalize(self, self.flush, exitpriority=100)
+
+    def _run(self):
+        while True:
+            self.wakeup.wait(self.flush_interval)
+            self.wakeup.clear()
+            self.flush()
+
+    def write(self, record: dict):
+        self._ensure_thread()
+        self.queue.put(record)
+        if record["level"] == "ERROR":
+            self.flush()
+
+    def _format(self, record: dict) -> str:
+        timestamp = datetime.fromtimestamp(record["time"]).isoformat(sep=' ', timespec='seconds')
+        if self.fmt == "jsonl":
+            entry = dict(record, time=timestamp)
+            return json.dumps(entry, ensure_ascii=False, default=str) + "\n"
+        extra = "".join(f" | {key}={value}" for key, value in record.items()
+                        if key not in ("time", "level", "module", "message"))
+        return f"{timestamp} | {record['level']:<5} | {record['module']:<10} | {record['message']}{extra}\n"
+
+    def flush(self):
+        """
+        A sorban várakozó bejegyzések kiírása egyetlen megnyitással
+        """
+        with self.lock:
+            lines = []
+            while True:
+                try:
+                    lines.append(self._format(self.queue.get_nowait()))
+                except queue.Empty:
+                    break
+            if not lines:
+                return
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as logf:
+                logf.writelines(lines)
+                size = logf.tell()
+            if self.max_bytes and size >= self.max_bytes:
+                self._rotate()
+
+    def _rotate(self):
+        for i in range(self.backup_count - 1, 0, -1):
+            src = self.path.with_name(f"{self.path.name}.{i}")
+            if src.exists():
+                os.replace(src, self.path.with_name(f"{self.path.name}.{i + 1}"))
+        if self.backup_count > 0:
+            os.replace(self.path, self.path.with_name(f"{self.path.name}.1"))
+        else:
+            self.path.unlink()
+
+
+def make_record(message: str, level: str, module: str, fields: dict) -> dict:
+    record = {"time": time.time(), "level": level.upper(), "module": module, "message": message}
+    record.update(fields)
+    return record
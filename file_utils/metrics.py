@@ -0,0 +1,332 @@
+"""
+Futásidejű mérőszámok: szakaszonkénti időzítők (scan, sniff, extract, classify, recognize,
+resolve-destination, move), fájltípus és kimenet szerinti számlálók, valamint opcionálisan
+a leglassabb N fájl cProfile eredménye.
+A worker folyamatok a saját mérőszámaikat a feladat eredményével együtt adják vissza (drain),
+a fő folyamat összesít, és a futás végén JSON összefoglalót és Prometheus textfile-t ír.
+"""
+import cProfile
+import heapq
+import json
+import marshal
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+# hisztogram határok másodpercben: 0,5 ms … ~65 s, kettes szorzóval
+BUCKETS = tuple(0.0005 * 2 ** i for i in range(18))
+
+
+def _new_histogram() -> list:
+    # [darab, összeg, maximum, vödrönkénti darabszámok (+Inf-fel)]
+    return [0, 0.0, 0.0, [0] * (len(BUCKETS) + 1)]
+
+
+def _observe(hist: list, seconds: float):
+    hist[0] += 1
+    hist[1] += seconds
+    hist[2] = max(hist[2], seconds)
+    for i, bound in enumerate(BUCKETS):
+        if seconds <= bound:
+            hist[3][i] += 1
+            return
+    hist[3][-1] += 1
+
+
+def _merge_histogram(into: list, other: list):
+    into[0] += other[0]
+    into[1] += other[1]
+    into[2] = max(into[2], other[2])
+    into[3] = [a + b for a, b in zip(into[3], other[3])]
+
+
+def _quantile(hist: list, q: float) -> float | None:
+    """
+    Közelítő kvantilis: annak a vödörnek a felső határa, amelybe a q-adik megfigyelés esik
+    """
+    if not hist[0]:
+        return None
+    target = q * hist[0]
+    seen = 0
+    for i, n in enumerate(hist[3]):
+        seen += n
+        if seen >= target:
+            return min(BUCKETS[i], hist[2]) if i < len(BUCKETS) else hist[2]
+    return hist[2]
+
+
+class Metrics:
+    """
+    Szálbiztos gyűjtő: szakasz → hisztogram, fájltípus → hisztogram (kezelő futásideje),
+    (fájltípus, kimenet) → darab, és a leglassabb fájlok profiljai (min-kupac)
+    """
+
+    def __init__(self, profile_top: int = 0):
+        self.lock = threading.Lock()
+        self.profile_top = profile_top
+        self.started = time.time()
+        self.slowest = []  # a profilozott leglassabb futásidők (min-kupac); drain után is megmarad
+        self._reset()
+
+    def _reset(self):
+        self.stages = {}
+        self.file_times = {}
+        self.outcomes = {}
+        self.profiles = []  # (másodperc, fájl, cProfile statisztika)
+
+    def observe(self, stage: str, seconds: float):
+        with self.lock:
+            _observe(self.stages.setdefault(stage, _new_histogram()), seconds)
+
+    def observe_file(self, kind: str, seconds: float):
+        with self.lock:
+            _observe(self.file_times.setdefault(kind, _new_histogram()), seconds)
+
+    def count(self, kind: str, outcome: str, n: int = 1):
+        with self.lock:
+            key = (kind, outcome)
+            self.outcomes[key] = self.outcomes.get(key, 0) + n
+
+    def wants_profile(self, seconds: float) -> bool:
+        """
+        Bekerülne-e a leglassabb N közé (workerben a saját eddigi N leglassabbja a mérce,
+        így nem kell minden fájl profilját visszaküldeni)
+        """
+        return bool(self.profile_top) and (len(self.slowest) < self.profile_top or seconds > self.slowest[0])
+
+    def offer_profile(self, seconds: float, file_path: str, stats: dict):
+        with self.lock:
+            if not self.wants_profile(seconds):
+                return
+            if len(self.slowest) < self.profile_top:
+                heapq.heappush(self.slowest, seconds)
+            else:
+                heapq.heapreplace(self.slowest, seconds)
+            item = (seconds, file_path, stats)
+            if len(self.profiles) < self.profile_top:
+                heapq.heappush(self.profiles, item)
+            else:
+                heapq.heappushpop(self.profiles, item)
+
+    def drain(self) -> dict:
+        """
+        Az eddigi mérések kivétele (picklelhető), a gyűjtő ürül
+        """
+        with self.lock:
+            snapshot = {"stages": self.stages, "file_times": self.file_times,
+                        "outcomes": self.outcomes, "profiles": self.profiles}
+            self._reset()
+        return snapshot
+
+    def merge(self, snapshot: dict):
+        for stage, hist in snapshot["stages"].items():
+            with self.lock:
+                _merge_histogram(self.stages.setdefault(stage, _new_histogram()), hist)
+        for kind, hist in snapshot["file_times"].items():
+            with self.lock:
+                _merge_histogram(self.file_times.setdefault(kind, _new_histogram()), hist)
+        for (kind, outcome), n in snapshot["outcomes"].items():
+            self.count(kind, outcome, n)
+        for seconds, file_path, stats in snapshot["profiles"]:
+            self.offer_profile(seconds, file_path, stats)
+
+    def summary(self) -> dict:
+        """
+        JSON összefoglaló: szakaszonként darab, összidő, átlag, p50/p90/p99, maximum
+        """
+        def describe(hist):
+            return {
+                "count": hist[0],
+                "total_s": round(hist[1], 4),
+                "mean_ms": round(hist[1] / hist[0] * 1000, 3) if hist[0] else None,
+                "p50_ms": _ms(_quantile(hist, 0.5)),
+                "p90_ms": _ms(_quantile(hist, 0.9)),
+                "p99_ms": _ms(_quantile(hist, 0.99)),
+                "max_ms": _ms(hist[2]),
+            }
+
+        with self.lock:
+            files = {}
+            for (kind, outcome), n in sorted(self.outcomes.items()):
+                files.setdefault(kind, {})[outcome] = n
+            total = sum(self.outcomes.values())
+            elapsed = time.time() - self.started
+            return {
+                "started": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started)),
+                "duration_s": round(elapsed, 3),
+                "files_total": total,
+                "files_per_sec": round(total / elapsed, 2) if elapsed else None,
+                "files": files,
+                "stages": {stage: describe(hist) for stage, hist in sorted(self.stages.items())},
+                "handlers": {kind: describe(hist) for kind, hist in sorted(self.file_times.items())},
+                "slowest": [{"file": f, "seconds": round(s, 4)} for s, f, _ in sorted(self.profiles, reverse=True)],
+            }
+
+    def prometheus(self) -> str:
+        """
+        Prometheus textfile collector formátum
+        """
+        lines = []
+
+        def histogram(name, help_text, label, items):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            for key, hist in sorted(items):
+                cumulative = 0
+                for bound, n in zip(BUCKETS, hist[3]):
+                    cumulative += n
+                    lines.append(f'{name}_bucket{{{label}="{key}",le="{bound:g}"}} {cumulative}')
+                lines.append(f'{name}_bucket{{{label}="{key}",le="+Inf"}} {hist[0]}')
+                lines.append(f'{name}_sum{{{label}="{key}"}} {hist[1]:.6f}')
+                lines.append(f'{name}_count{{{label}="{key}"}} {hist[0]}')
+
+        with self.lock:
+            histogram("butler_stage_seconds", "Feldolgozási szakaszok időtartama", "stage", self.stages.items())
+            histogram("butler_handler_seconds", "Kezelő futásideje fájlonként, típus szerint", "type",
+                      self.file_times.items())
+            lines.append("# HELP butler_files_total Feldolgozott fájlok típus és kimenet szerint")
+            lines.append("# TYPE butler_files_total counter")
+            for (kind, outcome), n in sorted(self.outcomes.items()):
+                lines.append(f'butler_files_total{{type="{kind}",outcome="{outcome}"}} {n}')
+            lines.append("# HELP butler_run_start_timestamp_seconds A futás kezdete")
+            lines.append("# TYPE butler_run_start_timestamp_seconds gauge")
+            lines.append(f"butler_run_start_timestamp_seconds {self.started:.3f}")
+            lines.append("# HELP butler_last_report_timestamp_seconds Az utolsó jelentés ideje")
+            lines.append("# TYPE butler_last_report_timestamp_seconds gauge")
+            lines.append(f"butler_last_report_timestamp_seconds {time.time():.3f}")
+        return "\n".join(lines) + "\n"
+
+
+def _ms(seconds: float | None) -> float | None:
+    return None if seconds is None else round(seconds * 1000, 3)
+
+
+_metrics = Metrics()
+
+# cProfile egyszerre csak egy profilozót enged egy folyamatban (a szálak ne ütközzenek)
+_profile_lock = threading.Lock()
+
+
+def get_metrics() -> Metrics:
+    return _metrics
+
+
+def reset_metrics(profile_top: int = 0):
+    """
+    Üres gyűjtő; profile_top > 0 esetén a leglassabb profile_top fájl profilozásával.
+    A process pool initializer is hívja, hogy fork után a szülő méréseit ne küldje vissza még egyszer.
+    """
+    global _metrics
+    _metrics = Metrics(profile_top)
+
+
+def observe(stage: str, seconds: float):
+    _metrics.observe(stage, seconds)
+
+
+@contextmanager
+def stage(name: str):
+    """
+    Szakasz időzítése: with stage("extract"): ...
+    """
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        _metrics.observe(name, time.perf_counter() - t0)
+
+
+def timed_iter(name: str, iterable):
+    """
+    Generátor időzítése: a következő elem előállításával töltött idő a name szakaszhoz adódik
+    """
+    iterator = iter(iterable)
+    while True:
+        t0 = time.perf_counter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            _metrics.observe(name, time.perf_counter() - t0)
+            return
+        _metrics.observe(name, time.perf_counter() - t0)
+        yield item
+
+
+def file_kind(file_path: Path) -> str:
+    return file_path.suffix.lower().lstrip(".") or "-"
+
+
+def count_file(file_path: Path, outcome: str):
+    """
+    Fájl kimenetének számlálása típus szerint (moved, failed, unsupported, deleted, duplicate)
+    """
+    _metrics.count(file_kind(file_path), outcome)
+
+
+def measure_handler(handler, file_path: Path):
+    """
+    Kezelő futtatása futásidő-méréssel; bekapcsolt profilozásnál cProfile alatt, és a profil
+    megmarad, ha a fájl a (folyamaton belüli) leglassabb N közé kerül
+    """
+    kind = file_kind(file_path)
+    profiler = None
+    if _metrics.profile_top and _profile_lock.acquire(blocking=False):
+        profiler = cProfile.Profile()
+    t0 = time.perf_counter()
+    try:
+        if profiler is None:
+            return handler(file_path)
+        profiler.enable()
+        try:
+            return handler(file_path)
+        finally:
+            profiler.disable()
+    finally:
+        seconds = time.perf_counter() - t0
+        _metrics.observe_file(kind, seconds)
+        if profiler is not None:
+            _profile_lock.release()
+            if _metrics.wants_profile(seconds):
+                profiler.create_stats()
+                _metrics.offer_profile(seconds, str(file_path), profiler.stats)
+
+
+def drain_metrics() -> dict:
+    return _metrics.drain()
+
+
+def merge_metrics(snapshot: dict):
+    _metrics.merge(snapshot)
+
+
+def _atomic_write(path: Path, text: str):
+    """
+    Írás ideiglenes fájlba, majd csere (a node exporter sosem lát félkész fájlt)
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(text, encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def write_reports(json_path: Path, prom_path: Path | None = None, profile_dir: Path | None = None) -> dict:
+    """
+    JSON összefoglaló és Prometheus textfile kiírása; a profilok .prof fájlokba kerülnek
+    (pstats / snakeviz olvassa). Visszatér az összefoglalóval.
+    """
+    summary = _metrics.summary()
+    if profile_dir is not None and _metrics.profiles:
+        profile_dir.mkdir(parents=True, exist_ok=True)
+        files = []
+        for rank, (seconds, file_path, stats) in enumerate(sorted(_metrics.profiles, reverse=True), start=1):
+            target = profile_dir / f"{rank:02d}_{Path(file_path).name}.prof"
+            with open(target, "wb") as f:
+                marshal.dump(stats, f)
+            files.append(str(target))
+        summary["profiles"] = files
+    _atomic_write(Path(json_path), json.dumps(summary, indent=2, ensure_ascii=False))
+    if prom_path is not None:
+        _atomic_write(Path(prom_path), _metrics.prometheus())
+    return summary
@@ -0,0 +1,225 @@
+"""
+Kétfázisú áthelyezés: előbb teljes terv készül (forrás, cél, ok), ami száraz futásként
+kiírható, majd a terv egyben hajtódik végre.
+Azonos eszközön os.rename, eszközök között (pl. NAS-ra) kernel oldali másolás
+(copy_file_range / sendfile) nagy blokkokban, a másolással egy menetben számolt checksummal.
+Az fsync célkönyvtáranként kötegelve történik; a forrás csak a szinkronizált és
+ellenőrzött másolat után törlődik. Minden áthelyezés az aktuális futás naplójába kerül.
+"""
+import errno
+import hashlib
+import os
+from pathlib import Path
+
+from config import MOVE_COPY_CHUNK, MOVE_VERIFY
+from file_utils.common import log, log_rename, DestinationIndex, PlannedMove, get_journal
+from file_utils.hashindex import file_hash
+from file_utils.metrics import stage
+
+# copy_file_range régebbi kernelen / eltérő fájlrendszerek között nem mindig támogatott;
+# az első ilyen hiba után sendfile-ra váltunk
+_use_copy_file_range = hasattr(os, "copy_file_range")
+
+
+def resolve_plan(entries) -> list[PlannedMove]:
+    """
+    A workerektől összegyűjtött terv ütközésmentesítése. A workerek külön névfoglalással
+    terveznek, így azonos célnév esetén itt kap (n) toldalékot. A foglalás a kért célnévből
+    indul (nem a workerben már toldalékolt névből, ami name(1)(1) alakot adna). Könyvtárat nem hoz létre.
+    """
+    index = DestinationIndex()
+    resolved = []
+    for entry in entries:
+        if entry.destination is not None:
+            requested = entry.requested or entry.destination
+            entry = entry._replace(destination=index.reserve(requested, create=False))
+        resolved.append(entry)
+    return resolved
+
+
+def print_plan(entries):
+    """
+    Terv kiírása (száraz futás)
+    """
+    moves = 0
+    for entry in entries:
+        if entry.destination is None:
+            print(f"🗑️ {entry.source}  [{entry.reason}]")
+        else:
+            moves += 1
+            print(f"{entry.source} → {entry.destination}  [{entry.reason}]")
+    print(f"📋 Terv: {moves} áthelyezés, {len(entries) - moves} törlés")
+
+
+def _copy_chunk(src_fd: int, dst_fd: int, offset: int, count: int) -> int:
+    global _use_copy_file_range
+    if _use_copy_file_range:
+        try:
+            return os.copy_file_range(src_fd, dst_fd, count, offset, offset)
+        except OSError as e:
+            if e.errno not in (errno.EXDEV, errno.ENOSYS, errno.EOPNOTSUPP, errno.EINVAL):
+                raise
+            _use_copy_file_range = False
+    os.lseek(dst_fd, offset, os.SEEK_SET)
+    return os.sendfile(dst_fd, src_fd, offset, count)
+
+
+def copy_with_checksum(source: Path, destination: Path, chunk_size: int = MOVE_COPY_CHUNK) -> str:
+    """
+    Forrás másolása egy új (még nem létező) célfájlba, fsync nélkül. Visszatér a tartalom
+    hash-ével (ugyanaz, mint a hashindex.file_hash). POSIX-on a bájtokat a kernel másolja,
+    a hash-hez a frissen másolt blokkot a lapgyorsítótárból olvassuk vissza;
+    máshol egyetlen újrahasznosított pufferrel, olvasás közben hash-elve másol.
+    """
+    h = hashlib.blake2b(digest_size=20)
+    flags = os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0)
+    src_fd = os.open(source, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+    try:
+        dst_fd = os.open(destination, flags, 0o666)
+        try:
+            if hasattr(os, "sendfile") and hasattr(os, "pread"):
+                size = os.fstat(src_fd).st_size
+                offset = 0
+                while offset < size:
+                    n = _copy_chunk(src_fd, dst_fd, offset, min(chunk_size, size - offset))
+                    if n == 0:
+                        raise OSError(errno.EIO, f"Váratlan fájlvég másolás közben: {source}")
+                    h.update(os.pread(src_fd, n, offset))
+                    offset += n
+            else:
+                buf = bytearray(chunk_size)
+                view = memoryview(buf)
+                while True:
+                    n = _read_into(src_fd, buf)
+                    if not n:
+                        break
+                    h.update(view[:n])
+                    written = 0
+                    while written < n:
+                        written += os.write(dst_fd, view[written:n])
+        except BaseException:
+            os.close(dst_fd)
+            Path(destination).unlink(missing_ok=True)
+            raise
+        os.close(dst_fd)
+    finally:
+        os.close(src_fd)
+    return h.hexdigest()
+
+
+def _read_into(fd: int, buf: bytearray) -> int:
+    data = os.read(fd, len(buf))
+    buf[:len(data)] = data
+    return len(data)
+
+
+def _fsync_path(path: Path, directory: bool = False):
+    """
+    fsync egy már lezárt fájlra vagy könyvtárra (könyvtárnál csak ahol támogatott)
+    """
+    if directory:
+        if not hasattr(os, "O_DIRECTORY"):
+            return
+        fd = os.open(path, os.O_RDONLY | os.O_DIRECTORY)
+    else:
+        fd = os.open(path, os.O_RDWR | getattr(os, "O_BINARY", 0))
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _commit_copies(directory: Path, copied: list, verify: bool, results: list):
+    """
+    Egy célkönyvtárba másolt fájlok kötegelt lezárása: fsync a fájlokra és egyszer a könyvtárra,
+    opcionális visszaolvasásos ellenőrzés, végül a források törlése.
+    Hiba esetén a másolat törlődik, a forrás a helyén marad.
+    """
+    journal = get_journal()
+    try:
+        for entry, target, digest, entry_id in copied:
+            _fsync_path(target)
+        _fsync_path(directory, directory=True)
+    except OSError as e:
+        log(f"⚠️ fsync hiba: {directory} – {e}", level="ERROR", module="mover", to_console=True)
+        for entry, target, digest, entry_id in copied:
+            target.unlink(missing_ok=True)
+            if entry_id:
+                journal.failed(entry_id)
+            results.append((entry, None))
+        return
+    for entry, target, digest, entry_id in copied:
+        try:
+            if verify and file_hash(target) != digest:
+                raise OSError(errno.EIO, "checksum eltérés másolás után")
+            entry.source.unlink()
+        except OSError as e:
+            log(f"❌ Másolási hiba: {entry.source} → {target} – {e}", level="ERROR",
+                module="mover", to_console=True)
+            target.unlink(missing_ok=True)
+            if entry_id:
+                journal.failed(entry_id)
+            results.append((entry, None))
+            continue
+        if entry_id:
+            journal.done(entry_id)
+        log_rename(str(entry.source), str(target))
+        results.append((entry, target))
+
+
+def execute_plan(entries, verify: bool = MOVE_VERIFY) -> list:
+    """
+    Terv végrehajtása célkönyvtáranként csoportosítva.
+
+    :return: (tétel, tényleges célhely vagy None) párok; törlésnél a célhely None
+    """
+    index = DestinationIndex()
+    journal = get_journal()
+    results = []
+    groups = {}
+    for entry in entries:
+        if entry.destination is None:
+            try:
+                entry.source.unlink()
+                log(f"🗑️ Törölve: {entry.source.name} ({entry.reason})", level="INFO", module="mover", to_console=True)
+            except OSError as e:
+                log(f"⚠️ Törlési hiba: {entry.source} – {e}", level="ERROR", module="mover", to_console=True)
+            results.append((entry, None))
+        else:
+            groups.setdefault(entry.destination.parent, []).append(entry)
+
+    for directory, group in groups.items():
+        index.ensure_dir(directory)
+        dir_dev = os.stat(directory).st_dev
+        copied = []
+        for entry in group:
+            with stage("resolve-destination"):
+                target = index.reserve(entry.destination)
+            entry_id = journal.intent(entry.source, target) if journal else None
+            try:
+                if os.stat(entry.source).st_dev == dir_dev:
+                    with stage("move"):
+                        os.rename(entry.source, target)
+                    if entry_id:
+                        journal.done(entry_id)
+                    log_rename(str(entry.source), str(target))
+                    results.append((entry, target))
+                else:
+                    with stage("move"):
+                        digest = copy_with_checksum(entry.source, target)
+                    copied.append((entry, target, digest, entry_id))
+            except OSError as e:
+                index.release(target)
+                if entry_id:
+                    journal.failed(entry_id)
+                log(f"⚠️ Áthelyezési hiba: {entry.source} → {target} – {e}", level="ERROR",
+                    module="mover", to_console=True)
+                results.append((entry, None))
+        if copied:
+            with stage("move"):
+                _commit_copies(directory, copied, verify, results)
+
+    moved = sum(1 for _, target in results if target is not None)
+    log(f"📦 Terv végrehajtva: {moved}/{sum(len(group) for group in groups.values())} áthelyezés",
+        level="INFO", module="mover", to_console=True)
+    return results
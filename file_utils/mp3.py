@@ -1,21 +1,23 @@
 from mutagen import File as AudioFile
 import os
 from pathlib import Path
-import shutil
 import asyncio
-from shazamio import Shazam
-import requests
 import re
 
 from config import DEBUG
 from config import cfg
-from file_utils.common import log, log_rename, clean_filename, ensure_unique_filename, normalize_text
+from config import MP3_CONCURRENCY, MP3_RETRIES, MP3_BACKOFF, MP3_RATE
+from file_utils.common import log, clean_filename, move_unique, normalize_text, is_planning
+from file_utils.audiocache import RecognitionCache, audio_payload_hash, open_cache
+from file_utils.metrics import stage
+from file_utils.scheduler import RateLimiter
 
 out_dir = cfg["mp3_output"]
-out_dir.mkdir(parents=True, exist_ok=True)
 
 
 def identify_song(filepath):
+    import requests
+
     api_token = "SAJÁT_API_KULCS_IDE"
     with open(filepath, 'rb') as f:
         response = requests.post(
@@ -26,59 +28,227 @@ def identify_song(filepath):
     result = response.json()
     return result.get('result')
 
-async def identify_mp3(file_path: str) -> dict:
+EMPTY_METADATA = {'title': '', 'artist': '', 'album': ''}
+
+
+class LocalStubRecognizer:
+    """
+    Hálózat nélküli felismerő tesztekhez és benchmarkhoz, a Shazam recognize() felületével.
+
+    :param responses: fájlnév → Shazam-szerű válasz (hiányzó név esetén üres válasz)
+    :param latency: szimulált hálózati késleltetés másodpercben
+    :param rate_limit_every: minden n-edik hívás "429 Too Many Requests" hibát dob (0 = soha)
+    """
+
+    def __init__(self, responses: dict | None = None, latency: float = 0.0, rate_limit_every: int = 0):
+        self.responses = responses or {}
+        self.latency = latency
+        self.rate_limit_every = rate_limit_every
+        self.calls = 0
+
+    async def recognize(self, file_path: str) -> dict:
+        self.calls += 1
+        call = self.calls
+        await asyncio.sleep(self.latency)
+        if self.rate_limit_every and call % self.rate_limit_every == 0:
+            raise RuntimeError("429 Too Many Requests")
+        return self.responses.get(os.path.basename(file_path), {})
+
+
+def is_rate_limited(error: Exception) -> bool:
+    """
+    Rate limit jellegű hiba-e (HTTP 429 vagy "rate limit" / "too many requests" szöveg)
+    """
+    if getattr(error, "status", None) == 429:
+        return True
+    text = str(error).lower()
+    return "429" in text or "too many requests" in text or "rate limit" in text
+
+
+async def recognize_with_retry(recognizer, file_path: str, retries: int = MP3_RETRIES,
+                               backoff: float = MP3_BACKOFF) -> dict:
+    """
+    Felismerés újrapróbálással: rate limit esetén exponenciálisan növekvő várakozás után újra
+    """
+    for attempt in range(retries + 1):
+        try:
+            return await recognizer.recognize(file_path)
+        except Exception as e:
+            if attempt == retries or not is_rate_limited(e):
+                raise
+            delay = backoff * (2 ** attempt)
+            log(f"⏳ Rate limit, újrapróbálás {delay:.1f} mp múlva: {os.path.basename(file_path)}", level="WARNING", module="mp3")
+            await asyncio.sleep(delay)
+
+
+def parse_shazam_track(result: dict) -> dict | None:
+    """
+    Shazam válaszból cím, előadó, album (None, ha nincs találat)
+    """
+    track = result.get('track', {})
+    if not track:
+        return None
+    album = ''
+    sections = track.get('sections', [])
+    if sections:
+        metadata = sections[0].get('metadata', [])
+        for item in metadata:
+            if item.get('title') == 'Album':
+                album = item.get('text', '')
+                break                
+
+    return {
+        'title': track.get('title', ''),
+        'artist': track.get('subtitle', ''),
+        'album': album
+    }
+
+
+def read_tags(file_path: str) -> dict | None:
+    """
+    Nyers tagek (előadó, albumelőadó, cím) kiolvasása; a mutagen csak a fejlécet/tag blokkot olvassa,
+    a hangadatot nem. None, ha nincsenek tagek.
+    """
+    audio = AudioFile(file_path)
+    if not (audio and audio.tags):
+        return None
+    artist = audio.tags.get('TPE1') or audio.tags.get('artist')
+    albumartist = audio.tags.get('TPE2') or audio.tags.get('albumartist')
+    title = audio.tags.get('TIT2') or audio.tags.get('title')
+    log(f"MP3 azonosítva. title='{title}', artist='{artist}', albumartist='{albumartist}'", module="mp3")
+
+    artist_text = str(artist).strip() if artist else ''
+    if normalize_text(artist_text)=="ismeretlen eloado": artist_text= ''
+    return {
+        'artist': artist_text,
+        'albumartist': str(albumartist).strip() if albumartist else '',
+        'title': str(title).strip() if title else '',
+    }
+
+def tags_are_reliable(tags: dict | None) -> bool:
+    """
+    Elfogadható-e a tag hálózati felismerés nélkül: van valódi cím és előadó
+    """
+    return bool(tags and tags['title'] and not is_placeholder_title(tags['title'])
+                and (tags['artist'] or tags['albumartist']))
+
+def tags_to_metadata(file_path: str, tags: dict) -> dict:
+    """
+    Tagekből metaadat; placeholder cím helyett ~fájlnév~, hiányzó előadó helyett "Ismeretlen előadó"
+    """
+    title_text = tags['title']
+    if not title_text or is_placeholder_title(title_text):
+        title_text = f"~{os.path.splitext(os.path.basename(file_path))[0]}~"                
+    final_artist = tags['artist'] or tags['albumartist'] or "Ismeretlen előadó"
+    return {
+        'title': title_text,
+        'artist': final_artist,
+        'album': ''
+    }
+
+def read_tag_metadata(file_path: str) -> dict | None:
+    """
+    Cím, előadó kiolvasása a fájl tagjeiből (mutagen); None, ha nincsenek tagek
+    """
+    tags = read_tags(file_path)
+    return tags_to_metadata(file_path, tags) if tags else None
+
+
+def create_recognizer():
     """
-    MP3 fájl azonosítása Shazammal.
+    Shazam kliens; a shazamio csak akkor töltődik be, ha tényleg hálózati felismerés kell
+    """
+    from shazamio import Shazam
+    return Shazam()
+
+
+class LazyRecognizer:
+    """
+    Közös Shazam kliens, amely csak az első tényleges hálózati kérésnél jön létre
+    """
+
+    def __init__(self):
+        self.client = None
+
+    async def recognize(self, file_path: str) -> dict:
+        if self.client is None:
+            self.client = create_recognizer()
+        return await self.client.recognize(file_path)
+
+
+async def identify_mp3(file_path: str, recognizer=None, cache: RecognitionCache | None = None,
+                       limiter: RateLimiter | None = None) -> dict:
+    """
+    Többlépcsős azonosítás:
+    1. megbízható (nem placeholder) tagek → nincs hálózati kérés
+    2. felismerési cache a hangadat hash-e alapján
+    3. Shazam (vagy a megadott felismerő); a találat a cache-be kerül
+    4. tartalék: a (hiányos) tagek
     """
-    shazam = Shazam()
     try:
-        result = await shazam.recognize(file_path)
+        with stage("extract"):
+            tags = read_tags(file_path)
+    except Exception as e:
+        log(f"⚠️ Tag olvasási hiba: {os.path.basename(file_path)} – {e}", level="WARNING", module="mp3")
+        tags = None
+    if tags_are_reliable(tags):
+        return tags_to_metadata(file_path, tags)
+
+    try:
+        with stage("extract"):
+            # a teljes hangadat hash-elése szálon: az eseményhurok közben a többi kérést viszi tovább
+            payload_hash = await asyncio.to_thread(audio_payload_hash, file_path) if cache else None
+        if payload_hash:
+            cached = cache.get(payload_hash)
+            if cached:
+                log(f"MP3 cache találat: {os.path.basename(file_path)}", level="DEBUG", module="mp3")
+                return cached
+
+        recognizer = recognizer or create_recognizer()
+        if limiter:
+            await asyncio.sleep(limiter.reserve())
+        with stage("recognize"):
+            result = await recognize_with_retry(recognizer, file_path)
         #print(f"[DEBUG] Shazam nyers válasz: {result}")
 
-        track = result.get('track', {})
+        track = parse_shazam_track(result)
         if track:
-            album = ''
-            sections = track.get('sections', [])
-            if sections:
-                metadata = sections[0].get('metadata', [])
-                for item in metadata:
-                    if item.get('title') == 'Album':
-                        album = item.get('text', '')
-                        break                
-
-            return {
-                'title': track.get('title', ''),
-                'artist': track.get('subtitle', ''),
-                'album': album
-            }
+            if payload_hash:
+                cache.put(payload_hash, track)
+            return track
 
         # fallback: mutagen
-        audio = AudioFile(file_path)
-        if audio and audio.tags:            
-            artist = audio.tags.get('TPE1') or audio.tags.get('artist')
-            albumartist = audio.tags.get('TPE2') or audio.tags.get('albumartist')
-            title = audio.tags.get('TIT2') or audio.tags.get('title')
-            log(f"MP3 azonosítva. title='{title}', artist='{artist}', albumartist='{albumartist}'", module="mp3", to_console=True)
-
-            artist_text = str(artist) if artist else ''
-            if normalize_text(artist_text.strip())=="ismeretlen eloado": artist_text= ''
-            albumartist_text = str(albumartist) if albumartist else ''
-            title_text = str(title).strip() if title else ''
-            if not title_text or is_placeholder_title(title_text):
-                title_text = f"~{os.path.splitext(os.path.basename(file_path))[0]}~"                
-            final_artist = artist_text or albumartist_text or "Ismeretlen előadó"
-
-            return {
-                'title': title_text,
-                'artist': final_artist,
-                'album': ''
-            }
-        log(f"MP3 azonosítás eredménytelen: {file_path.name}", module="mp3", to_console=True)
-        return {'title': '', 'artist': '', 'album': ''}
+        if tags:
+            return tags_to_metadata(file_path, tags)
+        log(f"MP3 azonosítás eredménytelen: {os.path.basename(file_path)}", module="mp3", to_console=True)
+        return dict(EMPTY_METADATA)
 
     except Exception as e:
         log(f"[ERROR] Azonosítás sikertelen: {e}", level="ERROR", module="mp3", to_console=True)
-        return {'title': '', 'artist': '', 'album': ''}
+        return dict(EMPTY_METADATA)
+
+
+async def identify_batch(paths: list[Path], recognizer=None, concurrency: int = MP3_CONCURRENCY) -> list[dict]:
+    """
+    Több fájl azonosítása egyetlen eseményhurkon, egy közös felismerő klienssel,
+    legfeljebb concurrency párhuzamos kéréssel (és MP3_RATE kérés / mp sebességgel).
+    Az eredmények a paths sorrendjében jönnek.
+    """
+    recognizer = recognizer or LazyRecognizer()
+    semaphore = asyncio.Semaphore(concurrency)
+    limiter = RateLimiter(MP3_RATE) if MP3_RATE else None
+    cache = open_cache()
+
+    async def one(path: Path) -> dict:
+        async with semaphore:
+            return await identify_mp3(str(path), recognizer, cache, limiter)
+
+    try:
+        return await asyncio.gather(*(one(p) for p in paths))
+    finally:
+        if cache:
+            cache.close()
+
 
 def is_placeholder_title(title: str) -> bool:
     """
@@ -87,9 +257,9 @@ def is_placeholder_title(title: str) -> bool:
     norm_title = title.strip().lower()
     return bool(re.fullmatch(r"(szám|track|audio)[ _-]*\d+", norm_title))
 
-def move_mp3_to_output(mp3_path: Path, artist: str, song_title: str):
+def move_mp3_to_output(mp3_path: Path, artist: str, song_title: str) -> Path:
     """
-    MP3 áthelyezése
+    MP3 áthelyezése (foglalt név esetén egyedi toldalékkal)
     """
     if artist == "Ismeretlen előadó":
         new_name =  mp3_path.name
@@ -97,18 +267,17 @@ def move_mp3_to_output(mp3_path: Path, artist: str, song_title: str):
     else:
         new_name = f"{artist} - {song_title}.mp3"
         artist_dir = out_dir / artist
-    artist_dir.mkdir(parents=True, exist_ok=True)    
-    target_path = artist_dir / new_name
-    target_path = ensure_unique_filename(target_path)
-    shutil.move(str(mp3_path), str(target_path))
-    log_rename(str(mp3_path), str(target_path))
-    if DEBUG["mp3"]:
+    target_path = move_unique(mp3_path, artist_dir / new_name, f"MP3: {artist}")
+    if DEBUG["mp3"] and not is_planning():
         print(f"[MP3] Áthelyezve: {target_path}")
+    return target_path
 
 
-def process_mp3(file_path: Path):
+def move_identified(file_path: Path, metadata: dict) -> Path | None:
+    """
+    Azonosított fájl áthelyezése az előadó mappájába
+    """
     try:
-        metadata = asyncio.run(identify_mp3(str(file_path)))
         if DEBUG["mp3"]:
             print(f"[DEBUG] Metadata: {metadata}")
 
@@ -116,9 +285,35 @@ def process_mp3(file_path: Path):
         title = clean_filename(metadata.get("title", "ISMERETLEN"))
 
         if artist and title:
-            move_mp3_to_output(file_path, artist, title)
+            return move_mp3_to_output(file_path, artist, title)
         else:
             log(f"⚠️ Hiányzik az előadó vagy a cím: {file_path.name}", module="mp3", to_console=True)
 
     except Exception as e:
         log(f"⚠️ Hiba MP3-nál: {file_path.name} – {e}", level="ERROR", module="mp3", to_console=True)
+
+
+def process_mp3(file_path: Path):
+    cache = open_cache()
+    try:
+        metadata = asyncio.run(identify_mp3(str(file_path), cache=cache))
+    finally:
+        if cache:
+            cache.close()
+    return move_identified(file_path, metadata)
+
+
+def process_mp3_batch(paths: list[Path], recognizer=None) -> list:
+    """
+    Kötegelt feldolgozás: az összes fájl azonosítása egy eseményhurkon, majd áthelyezés.
+
+    :return: (file_path, célhely) párok
+    """
+    if not paths:
+        return []
+    try:
+        metadatas = asyncio.run(identify_batch(paths, recognizer))
+    except Exception as e:
+        log(f"⚠️ Kötegelt MP3 azonosítási hiba: {e}", level="ERROR", module="mp3", to_console=True)
+        metadatas = [dict(EMPTY_METADATA) for _ in paths]
+    return [(path, move_identified(path, metadata)) for path, metadata in zip(paths, metadatas)]
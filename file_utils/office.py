@@ -1,24 +1,25 @@
-from docx import Document
-from openpyxl import load_workbook
 import os
+import tempfile
 from pathlib import Path
-import shutil
-import win32api
 try:
     import win32com.client as win32
 except ImportError:
     win32 = None
 
-from file_utils.common import log, log_rename, is_file_locked  
-from config import DEBUG, cfg
+from file_utils.common import log, is_file_locked, move_unique, is_planning
+from file_utils.ooxml import read_docx_text, read_xlsx_text
+from file_utils.rules import RuleEngine, ScanResult, get_engine
+from file_utils.metrics import stage
+from file_utils.sniff import resolve_suffix
+from file_utils.textstore import get_store, source_key
+from config import DEBUG, cfg, OFFICE_BYTE_BUDGET, OFFICE_ROW_BUDGET, TEXT_STORE
 
 out_dir = cfg["office_output"]
-out_dir.mkdir(parents=True, exist_ok=True)
 
 
-def convert_doc_to_docx(input_path):
+def convert_doc_to_docx(input_path, output_dir: Path | None = None):
     """
-    .doc => .docx konverzió
+    .doc => .docx konverzió (a forrás mellé, vagy output_dir megadásakor oda)
     """
     if is_file_locked(input_path):
         log(f"⚠️ A Word fájl zárolva:{input_path}", level="ERROR", module="office", to_console=True)
@@ -29,6 +30,8 @@ def convert_doc_to_docx(input_path):
 
     input_path = Path(input_path).resolve()
     output_path = input_path.with_suffix('.docx')
+    if output_dir is not None:
+        output_path = Path(output_dir) / output_path.name
 
     word = None
     doc = None
@@ -55,9 +58,9 @@ def convert_doc_to_docx(input_path):
         if word:
             word.Quit()
 
-def convert_xls_to_xlsx(input_path):
+def convert_xls_to_xlsx(input_path, output_dir: Path | None = None):
     """
-    .xls => .xlsx konverzió
+    .xls => .xlsx konverzió (a forrás mellé, vagy output_dir megadásakor oda)
     """
     if is_file_locked(input_path):
         log(f"⚠️ A Excel fájl zárolva:{input_path}", level="ERROR", module="office", to_console=True)
@@ -68,6 +71,8 @@ def convert_xls_to_xlsx(input_path):
 
     input_path = Path(input_path).resolve()
     output_path = input_path.with_suffix('.xlsx')
+    if output_dir is not None:
+        output_path = Path(output_dir) / output_path.name
 
     excel = None
     wb = None
@@ -97,59 +102,111 @@ def convert_xls_to_xlsx(input_path):
 
 
 
-def read_docx(file_path):
+def read_docx(file_path, max_bytes: int = OFFICE_BYTE_BUDGET):
     """
-    DOCX fájl tartalmának szöveges kiolvasása.
+    DOCX fájl tartalmának szöveges kiolvasása (streamelve, legfeljebb max_bytes karakterig).
     """
     try:
-        doc = Document(file_path)
-        full_text = "\n".join([para.text for para in doc.paragraphs])
+        full_text = read_docx_text(file_path, max_bytes)
         if DEBUG["office"]:
             log(f"[DOCX] Tartalom kivonat:\n{full_text[:500]}\n", level="DEBUG", module="office", to_console=True)
         return full_text
     except Exception as e:
-        log(f"⚠️ Hiba DOCX fájlnál: {file_path.name} – {e}", level="ERROR", module="office", to_console=True)
+        log(f"⚠️ Hiba DOCX fájlnál: {Path(file_path).name} – {e}", level="ERROR", module="office", to_console=True)
         return ""
 
-def read_xlsx(file_path):
+def read_xlsx(file_path, max_rows: int = OFFICE_ROW_BUDGET, max_bytes: int = OFFICE_BYTE_BUDGET):
     """
-    XLSX fájl tartalmának szöveges kiolvasása.
+    XLSX fájl tartalmának szöveges kiolvasása (az első munkalap, streamelve, sor- és karakterkerettel).
     """
     try:
-        wb = load_workbook(file_path, read_only=True)
-        sheet = wb.active
-        values = []
-        for row in sheet.iter_rows(min_row=1, max_row=10, values_only=True):
-            row_text = [str(cell) if cell is not None else "" for cell in row]
-            values.append("\t".join(row_text))
-        text = "\n".join(values)
+        text = read_xlsx_text(file_path, max_rows, max_bytes)
         if DEBUG["office"]:
             log(f"[XLSX] Tartalom kivonat:\n{text[:500]}\n", module="office", level="DEBUG", to_console=True)
         return text
     except Exception as e:
-        log(f"⚠️ Hiba XLSX fájlnál: {file_path.name} – {e}", level="ERROR", module="office", to_console=True)
+        log(f"⚠️ Hiba XLSX fájlnál: {Path(file_path).name} – {e}", level="ERROR", module="office", to_console=True)
         return ""
 
-def move_file(file_path: Path):
+def get_office_engine() -> RuleEngine:
     """
-    Office fájlok áthelyezése
+    A PDF-ekkel közös szabályfájl
+    """
+    return get_engine(cfg["pdf_rules"])
+
+def classify_office_text(text: str) -> str | None:
+    """
+    Dokumentumtípus (számla, szerződés stb.) a PDF-ekkel közös szabályok alapján
+    """
+    if not text:
+        return None
+    engine = get_office_engine()
+    return engine.best_type(engine.scan(text).scores)
+
+def office_destination(file_path: Path, tipus: str | None) -> Path:
+    """
+    Célhely: felismert típusnál típus szerinti almappa (a feldolgozás és az újraosztályozás közös szabálya)
+    """
+    target_dir = out_dir / tipus if tipus else out_dir
+    return target_dir / file_path.name
+
+def move_file(file_path: Path, tipus: str | None = None) -> Path:
+    """
+    Office fájlok áthelyezése (foglalt név esetén egyedi toldalékkal); felismert típusnál típus szerinti almappába
     """    
-    target_path = out_dir / file_path.name
-    shutil.move(str(file_path), str(target_path))
-    log_rename(str(file_path), str(target_path))
-    print(f"[OFFICE] Áthelyezve: {file_path.name} → {out_dir}/")
+    target_path = move_unique(file_path, office_destination(file_path, tipus), f"OFFICE: {tipus or '-'}")
+    if not is_planning():
+        print(f"[OFFICE] Áthelyezve: {file_path.name} → {target_path.parent}/")
+    return target_path
 
-def process_office(file_path: Path):
-    ext = file_path.suffix.lower()
+def read_office_text(file_path: Path, ext: str | None = None) -> str:
+    """
+    Szöveg kinyerése a formátum (ext: tartalom szerint megállapított kiterjesztés) szerinti olvasóval.
+    Tervező módban a régi formátumok konvertált példánya ideiglenes mappába kerül, a bemenet nem változik.
+    """
+    ext = ext or file_path.suffix.lower()
+    if ext in (".doc", ".xls") and is_planning():
+        with tempfile.TemporaryDirectory(prefix="office_plan_") as tmp:
+            return _read_legacy_text(file_path, ext, Path(tmp))
+    if ext in (".doc", ".xls"):
+        return _read_legacy_text(file_path, ext)
+    if ext == ".docx":
+        return read_docx(str(file_path))
+    if ext == ".xlsx":
+        return read_xlsx(str(file_path))
+    return ""
+
+def _read_legacy_text(file_path: Path, ext: str, output_dir: Path | None = None) -> str:
+    """
+    .doc / .xls szövege a konvertált .docx / .xlsx példányból (sikertelen konverziónál üres)
+    """
     if ext == ".doc":
-        converted = convert_doc_to_docx(str(file_path))
-        read_docx(converted)
-    elif ext == ".docx":
-        read_docx(str(file_path))
-    elif ext == ".xls":
-        converted = convert_xls_to_xlsx(str(file_path))
-        read_xlsx(converted)
-    elif ext == ".xlsx":
-        read_xlsx(str(file_path))
-        
-    move_file(file_path)
\ No newline at end of file
+        converted = convert_doc_to_docx(str(file_path), output_dir)
+        return read_docx(converted) if str(converted).lower().endswith(".docx") else ""
+    converted = convert_xls_to_xlsx(str(file_path), output_dir)
+    return read_xlsx(converted) if str(converted).lower().endswith(".xlsx") else ""
+
+def process_office(file_path: Path, header: bytes | None = None, digest: str | None = None):
+    """
+    Office dokumentum osztályozása és áthelyezése. digest: a hash-index által már kiszámolt tartalom-hash;
+    ha nincs, a tartalom a szövegtárban sem lehet (a mentés kulcsa ekkor source_key)
+    """
+    # ismert tartalomnál a tárolt szöveg (nincs konverzió, nincs kibontás)
+    text = None
+    with stage("extract"):
+        if TEXT_STORE and digest:
+            text = get_store().get_text(digest)
+        if text is None:
+            text = read_office_text(file_path, resolve_suffix(file_path, header) if header is not None else None)
+            if TEXT_STORE:
+                digest = digest or source_key(file_path)
+                get_store().put_text(digest, text)
+
+    with stage("classify"):
+        engine = get_office_engine()
+        result = engine.scan(text) if text else ScanResult()
+        tipus = engine.best_type(result.scores)
+    target_path = move_file(file_path, tipus)
+    if digest and not is_planning():
+        get_store().record(target_path, digest, "office", file_path.name, result.to_dict(), engine)
+    return target_path
@@ -0,0 +1,163 @@
+"""
+Könnyűsúlyú DOCX/XLSX szövegkinyerés.
+A zip konténerből közvetlenül, inkrementális XML feldolgozással (iterparse) olvassa a
+word/document.xml, illetve az xl/sharedStrings.xml és a munkalap XML-ek tartalmát,
+teljes dokumentum-objektummodell nélkül. A memóriahasználat bájt-/sorkerettel korlátos:
+a feldolgozott elemek a szülőjükből is kikerülnek, így üres elemek sem gyűlnek a fában.
+"""
+import posixpath
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+
+W_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+S_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+R_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+REL_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+
+def iter_docx_paragraphs(source, max_bytes: int = 0):
+    """
+    DOCX bekezdések szövege sorban (source: fájlútvonal vagy fájlszerű objektum).
+    max_bytes: ennyi karakter után abbahagyja (0 = nincs korlát)
+    """
+    read = 0
+    with zipfile.ZipFile(source) as zf, zf.open("word/document.xml") as xml:
+        parts = []
+        outer = []  # a beágyazott bekezdést (pl. szövegdobozban) tartalmazó bekezdések eddigi szövegrészei
+        stack = []  # a nyitott elemek: a bekezdés szülője változó (body, táblázatcella, tartalomvezérlő)
+        for event, elem in ET.iterparse(xml, events=("start", "end")):
+            if event == "start":
+                stack.append(elem)
+                if elem.tag == W_NS + "p":
+                    outer.append(parts)
+                    parts = []
+                continue
+            stack.pop()
+            if elem.tag == W_NS + "t":
+                parts.append(elem.text or "")
+            elif elem.tag == W_NS + "tab":
+                parts.append("\t")
+            elif elem.tag == W_NS + "p":
+                text = "".join(parts)
+                parts = outer.pop()
+                if stack:
+                    stack[-1].remove(elem)
+                yield text
+                read += len(text) + 1
+                if max_bytes and read >= max_bytes:
+                    return
+            elif elem.tag == W_NS + "tbl" and stack:
+                stack[-1].remove(elem)
+
+
+def read_docx_text(source, max_bytes: int = 0) -> str:
+    return "\n".join(iter_docx_paragraphs(source, max_bytes))
+
+
+def _shared_strings(zf: zipfile.ZipFile, max_bytes: int) -> list[str]:
+    """
+    Megosztott szövegek (sharedStrings.xml), amíg az összhosszuk belefér a max_bytes karakterbe
+    (a darabszám nem korlát: néhány nagyon hosszú szöveg is sok memóriát foglalhat)
+    """
+    strings = []
+    if "xl/sharedStrings.xml" not in zf.namelist():
+        return strings
+    with zf.open("xl/sharedStrings.xml") as xml:
+        parts = []
+        root = None
+        read = 0
+        for event, elem in ET.iterparse(xml, events=("start", "end")):
+            if event == "start":
+                if root is None:
+                    root = elem
+                continue
+            if elem.tag == S_NS + "t":
+                parts.append(elem.text or "")
+            elif elem.tag == S_NS + "si":
+                text = "".join(parts)
+                parts = []
+                root.remove(elem)
+                read += len(text)
+                if read > max_bytes:
+                    break
+                strings.append(text)
+    return strings
+
+
+def _first_sheet(zf: zipfile.ZipFile) -> str | None:
+    """
+    Az első munkalap (a munkafüzet lapsorrendje szerint) XML-je: xl/workbook.xml első <sheet> eleme,
+    a kapcsolatfájlon (xl/_rels/workbook.xml.rels) át feloldva. Ha ezek hiányoznak, a legkisebb sorszámú sheetN.xml.
+    """
+    names = set(zf.namelist())
+    try:
+        workbook = ET.fromstring(zf.read("xl/workbook.xml"))
+        rels = ET.fromstring(zf.read("xl/_rels/workbook.xml.rels"))
+        first = workbook.find(f"{S_NS}sheets/{S_NS}sheet")
+        targets = {rel.get("Id"): rel.get("Target") for rel in rels.iter(REL_NS + "Relationship")}
+        target = targets.get(first.get(R_NS + "id")) if first is not None else None
+        if target:
+            # a cél a munkafüzethez (xl/) képest relatív, vagy "/"-rel kezdődően a csomag gyökeréhez
+            sheet = target.lstrip("/") if target.startswith("/") else posixpath.normpath(posixpath.join("xl", target))
+            if sheet in names:
+                return sheet
+    except (KeyError, ET.ParseError):
+        pass
+    sheets = [n for n in names if re.fullmatch(r"xl/worksheets/sheet\d+\.xml", n)]
+    if not sheets:
+        return None
+    return min(sheets, key=lambda n: int(re.search(r"(\d+)\.xml$", n).group(1)))
+
+
+def iter_xlsx_rows(source, max_rows: int = 0, max_bytes: int = 0, max_string_bytes: int = 8 * 1024 * 1024):
+    """
+    Az első munkalap sorai tabulátorral elválasztott szövegként.
+    max_rows / max_bytes: sor- és karakterkeret (0 = nincs korlát);
+    max_string_bytes: a beolvasott megosztott szövegek összhossza (a kereten túliak üres cellaként jelennek meg)
+    """
+    read = 0
+    rows = 0
+    with zipfile.ZipFile(source) as zf:
+        sheet = _first_sheet(zf)
+        if sheet is None:
+            return
+        strings = _shared_strings(zf, max_string_bytes)
+        with zf.open(sheet) as xml:
+            cells = []
+            cell_type = None
+            value = None
+            sheet_data = None
+            for event, elem in ET.iterparse(xml, events=("start", "end")):
+                tag = elem.tag
+                if event == "start":
+                    if tag == S_NS + "c":
+                        cell_type = elem.get("t")
+                        value = None
+                    elif tag == S_NS + "sheetData":
+                        sheet_data = elem
+                    continue
+                if tag == S_NS + "v":
+                    value = elem.text
+                elif tag == S_NS + "t" and cell_type == "inlineStr":
+                    value = elem.text
+                elif tag == S_NS + "c":
+                    if cell_type == "s" and value is not None:
+                        index = int(value)
+                        value = strings[index] if index < len(strings) else ""
+                    cells.append(value or "")
+                    elem.clear()
+                elif tag == S_NS + "row":
+                    text = "\t".join(cells)
+                    cells = []
+                    if sheet_data is not None:
+                        sheet_data.remove(elem)
+                    yield text
+                    rows += 1
+                    read += len(text) + 1
+                    if (max_rows and rows >= max_rows) or (max_bytes and read >= max_bytes):
+                        return
+
+
+def read_xlsx_text(source, max_rows: int = 0, max_bytes: int = 0) -> str:
+    return "\n".join(iter_xlsx_rows(source, max_rows, max_bytes))
@@ -1,16 +1,17 @@
-import re
-import shutil
 from pathlib import Path
 from datetime import datetime
 import fitz  # PyMuPDF
-from file_utils.common import log, log_rename, clean_filename, ensure_unique_filename
-from config import DEBUG, cfg
+from file_utils.common import log, clean_filename, move_unique, is_planning
+from file_utils.rules import RuleEngine, ScanResult, get_engine
+from file_utils.metrics import stage
+from file_utils.sniff import sniff
+from file_utils.textstore import get_store, source_key
+from config import DEBUG, cfg, PDF_PAGE_BUDGET, PDF_BYTE_BUDGET, PDF_TOP_RATIO, TEXT_STORE
 
 
 out_dir = cfg["pdf_output"]
-out_dir.mkdir(parents=True, exist_ok=True)
 
-# PDF típusok kulcsszavai
+# PDF típusok kulcsszavai (alapértelmezés, ha nincs pdf_rules.json)
 TÍPUS_KULCSSZAVAK = {
     "SZAMLA": ["számla", "invoice", "díjbekérő"],
     "BANKKIVONAT": ["bankkivonat", "tranzakció", "jóváírás"],
@@ -25,72 +26,126 @@ DATE_REGEX = r"(20\d{2}[-\.](0[1-9]|1[0-2])[-\.](0[1-9]|[12]\d|3[01]))"
 # Regex számlaszámra (pl. #123456 vagy 2023/456 vagy hasonlók)
 SZAMLA_REGEX = r"(?i)(?:számlasorszám|sorszám)\s*[:\-]?\s*(\S+)"
 
-def is_pdf(file_path: Path) -> bool:
+# Alapértelmezett szabályok a RuleEngine számára: a sorrend adja a prioritást
+DEFAULT_RULES = {
+    "types": [
+        {"type": tipus, "priority": len(TÍPUS_KULCSSZAVAK) - i, "keywords": kulcsszavak}
+        for i, (tipus, kulcsszavak) in enumerate(TÍPUS_KULCSSZAVAK.items())
+    ],
+    "date": DATE_REGEX,
+    "invoice": SZAMLA_REGEX,
+}
+
+def get_rule_engine() -> RuleEngine:
+    """
+    A szabálymotor folyamatonként egyszer fordul le
+    """
+    return get_engine(cfg["pdf_rules"], DEFAULT_RULES)
+
+def is_pdf(file_path: Path, header: bytes | None = None) -> bool:
+    """
+    PDF-e a fájl: a fejléc ismeretében a tartalom, különben a kiterjesztés alapján
+    """
+    if header is not None:
+        return sniff(header) == "pdf"
     return file_path.suffix.lower() == ".pdf"
 
-def extract_pdf_text(pdf_path: Path, pages: int=-1) -> str:
+def page_text(page, top_ratio: float | None = None) -> str:
+    """
+    Egy oldal szövege; top_ratio megadásakor csak az oldal felső részébe eső szövegblokkok
+    (pl. 0.3 = felső 30%, ahol a fejléc, dátum, számlaszám szokott lenni)
     """
-    PDF fájl szöveges tartalmát kinyeri a megadott oldalszám erejéig (pages=-1 esetén a teljes dokumentumot)
+    if top_ratio is None:
+        return page.get_text()
+    limit = page.rect.height * top_ratio
+    # blokk: (x0, y0, x1, y1, szöveg, blokk_sorszám, típus); típus 0 = szöveg, 1 = kép
+    return "\n".join(b[4] for b in page.get_text("blocks") if b[6] == 0 and b[1] < limit)
+
+def iter_pdf_text(pdf_path: Path, pages: int = -1, top_ratio: float | None = None):
     """
-    text = ""
-    try:         
-        doc = fitz.open(str(pdf_path))
-        
-        pagecount = 0        
+    PDF oldalainak szövege oldalanként, lustán (a hívó bármikor abbahagyhatja az olvasást)
+    """
+    with fitz.open(str(pdf_path)) as doc:
         for pagecount, page in enumerate(doc):
             if 0 <= pages <= pagecount:
                 break
-            text += page.get_text()                    
-        text = text.strip()
-
-        if DEBUG["pdf"]:  
-            if text:
-                page_info = f"{pages} oldal" if pages >= 0 else "minden oldal"
-                msg = f"[PDF] {pdf_path.name} → szövege ({page_info}):\n{text[:500]}\n"                
-                log(msg, level="DEBUG", module="pdf", to_console=True)
-            else:
-                msg = f"[PDF] Nincs szöveg a fájlban: {pdf_path.name}"                
-                log(msg, level="DEBUG", module="pdf", to_console=True)
-    except Exception as e:
-        msg = f"⚠️ Hiba PDF olvasásánál: {pdf_path.name} – {e}"        
-        log(msg, level="ERROR", module="pdf", to_console=True)
-        return ""
-    finally:
-        doc.close()
-    return text
+            yield page_text(page, top_ratio)
 
 def extract_pdf_info(text: str):
     """
     pdf tartalmi szövegéből beazonosítja a dokumentum típusát
     """
-    lower = text.lower()
-    for tipus, kulcsszavak in TÍPUS_KULCSSZAVAK.items():
-        if any(kw in lower for kw in kulcsszavak):
-            if DEBUG["pdf"]: 
-                log(f"tipus='{tipus}'", level="DEBUG", module="pdf")
-            return tipus
+    engine = get_rule_engine()
+    tipus = engine.best_type(engine.scan(text).scores)
     if DEBUG["pdf"]: 
-        log(f"tipus azonositasa sikertelen", level="DEBUG", module="pdf")
-    return None
+        log(f"tipus='{tipus}'" if tipus else "tipus azonositasa sikertelen", level="DEBUG", module="pdf")
+    return tipus
 
-def extract_date(text: str):
+class PdfClassifier:
     """
-    szövegből dátum maszknak megfelelő stringek közül az elsőt adja vissza
+    Inkrementális osztályozó: oldalanként kapja a szöveget, amelyen a szabálymotor
+    egyetlen menetben keres típus-kulcsszavakat, dátumot és számlaszámot.
+    A pontszámok oldalakon át összeadódnak. done == True, ha a típus és a dátum megvan, és számlánál
+    a számlaszám is (más típusnál a számlaszám nem kerül a fájlnévbe, nem érdemes tovább olvasni).
     """
-    match = re.search(DATE_REGEX, text)
-    if DEBUG["pdf"]: 
-        msg = f"datum='{match.group(1).replace('.', '-')}'" if match else "datum azonosítasa sikertelen"
-        log(msg , level="DEBUG", module="pdf")
-    return match.group(1).replace(".", "-") if match else None
 
-def extract_szamlaszam(text: str):
+    def __init__(self):
+        self.engine = get_rule_engine()
+        self.result = ScanResult()
+        self.parts = []
+
+    @property
+    def tipus(self) -> str | None:
+        return self.engine.best_type(self.result.scores)
+
+    @property
+    def datum(self) -> str | None:
+        return self.result.datum
+
+    @property
+    def szamla(self) -> str | None:
+        return self.result.szamla
+
+    @property
+    def done(self) -> bool:
+        tipus = self.tipus
+        return bool(tipus and self.datum and (self.szamla or tipus != "SZAMLA"))
+
+    def feed(self, text: str):
+        self.parts.append(text)
+        self.result.merge(self.engine.scan(text))
+
+    @property
+    def text(self) -> str:
+        return "".join(self.parts).strip()
+
+def classify_pdf(pdf_path: Path, max_pages: int = PDF_PAGE_BUDGET, max_bytes: int = PDF_BYTE_BUDGET,
+                 top_ratio: float | None = PDF_TOP_RATIO) -> PdfClassifier:
     """
-    szövegből számlasorszámnak megfeleltethető stringek közül az elsőt adja vissza
+    PDF oldalainak olvasása addig, amíg a típus, a dátum és a számlaszám is meg nem lett,
+    vagy el nem fogyott az oldal-/bájtkeret (max_pages=-1: nincs oldalkorlát, max_bytes=0: nincs bájtkorlát)
     """
-    match = re.search(SZAMLA_REGEX, text, re.IGNORECASE)
-    if DEBUG["pdf"]: 
-        log(f"szamlaszam='{match.group(1)}'" if match else "szamlaszam azonositasa sikertelen", level="DEBUG", module="pdf")
-    return match.group(1) if match else None
+    classifier = PdfClassifier()
+    read_bytes = 0
+    pages = iter_pdf_text(pdf_path, max_pages, top_ratio)
+    try:
+        while True:
+            with stage("extract"):
+                text = next(pages, None)
+            if text is None:
+                break
+            with stage("classify"):
+                classifier.feed(text)
+            read_bytes += len(text)
+            if classifier.done or (max_bytes and read_bytes >= max_bytes):
+                break
+    except Exception as e:
+        log(f"⚠️ Hiba PDF olvasásánál: {pdf_path.name} – {e}", level="ERROR", module="pdf", to_console=True)
+    finally:
+        pages.close()  # a dokumentum azonnal bezárul, nem a szemétgyűjtéskor
+    if DEBUG["pdf"]:
+        log(f"[PDF] {pdf_path.name}: {len(classifier.parts)} oldal olvasva, {read_bytes} karakter", level="DEBUG", module="pdf")
+    return classifier
 
 def gen_new_name(file_path: Path, tipus: str, datum: str, szamla: str) -> str:
     """
@@ -121,37 +176,54 @@ def gen_new_name(file_path: Path, tipus: str, datum: str, szamla: str) -> str:
 
     return new_name
 
-def move_pdf_to_output(pdf_path: Path, target_path: Path):
+def move_pdf_to_output(pdf_path: Path, target_path: Path, reason: str = "PDF") -> Path:
     """
-    PDF áthelyezése
+    PDF áthelyezése (foglalt név esetén egyedi toldalékkal)
     """
-    t_dir = target_path.parent
-    t_dir.mkdir(parents=True, exist_ok=True)
-    shutil.move(str(pdf_path), str(target_path))
-    log_rename(str(pdf_path), str(target_path))
-    if DEBUG["pdf"]:
+    target_path = move_unique(pdf_path, target_path, reason)
+    if DEBUG["pdf"] and not is_planning():
         print(f"[PDF] Áthelyezve: {target_path}")
+    return target_path
+
+def pdf_destination(file_path: Path, result: ScanResult, engine: RuleEngine) -> tuple[Path, str]:
+    """
+    Célhely az osztályozás eredménye alapján (a feldolgozás és az újraosztályozás közös szabálya)
+
+    :return: (célútvonal, típus)
+    """
+    tipus = engine.best_type(result.scores) or "ISMERETLEN"
+    datum = result.datum or "0000-00-00"
+    new_name = gen_new_name(file_path, tipus, datum, result.szamla)
+    return out_dir / tipus / new_name, tipus
 
-def process_pdf(file_path: Path):
+def process_pdf(file_path: Path, header: bytes | None = None, digest: str | None = None):
+    """
+    PDF osztályozása és áthelyezése. digest: a hash-index által már kiszámolt tartalom-hash; ha nincs,
+    a fájl mérete új volt az indexben, így a szövegtárban sem lehet (a mentés kulcsa ekkor source_key).
+    """
     try:
-        if not is_pdf(file_path):
+        if not is_pdf(file_path, header):
             return
-        text = extract_pdf_text(file_path, 1)        
-        tipus = extract_pdf_info(text) or "ISMERETLEN"
-        datum = extract_date(text) or "0000-00-00"
-        szamla = extract_szamlaszam(text)
-        new_name = gen_new_name(file_path, tipus, datum, szamla)
-        target_dir = out_dir / tipus
-        new_path = ensure_unique_filename(target_dir / new_name)       
-        move_pdf_to_output(file_path, new_path)
+        # ismert tartalomnál a tárolt szöveg, különben kinyerés (és mentés a szövegtárba)
+        stored = None
+        if TEXT_STORE and digest:
+            with stage("extract"):
+                stored = get_store().get_text(digest)
+        if stored is not None:
+            result = PdfClassifier()
+            with stage("classify"):
+                result.feed(stored)
+        else:
+            result = classify_pdf(file_path)
+            if TEXT_STORE:
+                digest = digest or source_key(file_path)
+                get_store().put_text(digest, result.text)
+        with stage("resolve-destination"):
+            target_path, tipus = pdf_destination(file_path, result.result, result.engine)
+        target_path = move_pdf_to_output(file_path, target_path, f"PDF: {tipus}")
+        if digest and not is_planning():
+            get_store().record(target_path, digest, "pdf", file_path.name, result.result.to_dict(), result.engine)
+        return target_path
 
     except Exception as e:
-        log(f"⚠️ Hiba PDF-nél: {file_path.name} – {e}", level="ERROR", module="pdf", to_console=True)        
-
-
-
-
-
-
-
-
+        log(f"⚠️ Hiba PDF-nél: {file_path.name} – {e}", level="ERROR", module="pdf", to_console=True)
@@ -0,0 +1,191 @@
+"""
+Közel-duplikátum képek felismerése perceptuális hash-sel.
+A dHash a kép lekicsinyített (JPEG-nél draft módban, csökkentett felbontással dekódolt)
+szürkeárnyalatos változatából készül: a szomszédos pixelek összehasonlítása NumPy-jal,
+64 bitbe csomagolva. Az átméretezett vagy újratömörített másolatok hash-e csak néhány
+bitben tér el. A hash-ek SQLite-ban tárolódnak; a keresés egy memóriabeli BK-fán
+Hamming-távolság szerint történik, így nem kell minden ismert képpel összevetni.
+"""
+import sqlite3
+from pathlib import Path
+
+from config import cfg, PHASH_THRESHOLD
+from file_utils.common import log, get_move_lock, is_planning
+from file_utils.metrics import stage
+
+HASH_SIZE = 8  # 8×8 = 64 bit
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS phashes (
+    id INTEGER PRIMARY KEY,
+    hash INTEGER NOT NULL,
+    path TEXT
+);
+"""
+
+
+def dhash(file_path: Path, size: int = HASH_SIZE) -> int:
+    """
+    Különbség-hash (dHash): (size+1)×size szürkeárnyalatos kicsinyítés, soronként a szomszédos
+    pixelek összehasonlítása. JPEG-nél a draft() a DCT-skálázással eleve kicsiben dekódol.
+    """
+    import numpy as np
+    from PIL import Image
+
+    with Image.open(file_path) as img:
+        img.draft("L", ((size + 1) * 4, size * 4))
+        small = img.convert("L").resize((size + 1, size), Image.BILINEAR)
+        pixels = np.asarray(small, dtype=np.int16)
+    bits = np.packbits(pixels[:, 1:] > pixels[:, :-1])
+    return int.from_bytes(bits.tobytes(), "big")
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+def _to_db(value: int) -> int:
+    # az SQLite INTEGER előjeles 64 bites
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def _from_db(value: int) -> int:
+    return value + (1 << 64) if value < 0 else value
+
+
+class BKTree:
+    """
+    Burkhard–Keller fa Hamming-távolságra. Csomópont: [hash, elemek, {távolság: gyermek}].
+    A keresés a háromszög-egyenlőtlenség miatt csak a |d - r| … d + r távolságú ágakba lép le.
+    """
+
+    def __init__(self):
+        self.root = None
+        self.size = 0
+
+    def add(self, value: int, item):
+        self.size += 1
+        if self.root is None:
+            self.root = [value, [item], {}]
+            return
+        node = self.root
+        while True:
+            distance = hamming(node[0], value)
+            if distance == 0:
+                node[1].append(item)
+                return
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = [value, [item], {}]
+                return
+            node = child
+
+    def search(self, value: int, radius: int) -> list[tuple[int, object]]:
+        """
+        (távolság, elem) párok a radius sugarú környezetben, távolság szerint rendezve
+        """
+        found = []
+        stack = [self.root] if self.root is not None else []
+        while stack:
+            node = stack.pop()
+            distance = hamming(node[0], value)
+            if distance <= radius:
+                found.extend((distance, item) for item in node[1])
+            for edge, child in node[2].items():
+                if distance - radius <= edge <= distance + radius:
+                    stack.append(child)
+        found.sort(key=lambda pair: pair[0])
+        return found
+
+
+class PerceptualIndex:
+    """
+    Perzisztens hash-index. Minden folyamat saját BK-fát tart, amit a keresés előtt az
+    adatbázis új soraival (id > utolsó betöltött) frissít; így a párhuzamos workerek
+    egymás képeit is látják.
+    """
+
+    def __init__(self, db_path: Path = None):
+        db_path = Path(db_path or cfg["phash_db"])
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(db_path), timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+        self.tree = BKTree()
+        self.last_id = 0
+
+    def refresh(self):
+        rows = self.conn.execute("SELECT id, hash FROM phashes WHERE id > ? ORDER BY id", (self.last_id,))
+        for row_id, value in rows:
+            self.tree.add(_from_db(value), row_id)
+            self.last_id = row_id
+
+    def nearest(self, value: int, radius: int) -> tuple[int, str] | None:
+        """
+        A legközelebbi ismert kép (távolság, útvonal), ha van radius távolságon belül
+        (a közben törölt vagy visszahelyezett (--undo) képek nem számítanak)
+        """
+        self.refresh()
+        for distance, row_id in self.tree.search(value, radius):
+            row = self.conn.execute("SELECT path FROM phashes WHERE id = ?", (row_id,)).fetchone()
+            if row and row[0] and Path(row[0]).exists():
+                return distance, row[0]
+        return None
+
+    def add(self, value: int, path: Path) -> int:
+        cursor = self.conn.execute("INSERT INTO phashes (hash, path) VALUES (?, ?)",
+                                   (_to_db(value), str(path)))
+        self.conn.commit()
+        return cursor.lastrowid
+
+
+
+_index = None
+_disabled = False
+
+def get_index() -> PerceptualIndex:
+    """
+    Folyamatonként egy index, az első képnél megnyitva
+    """
+    global _index
+    if _index is None:
+        _index = PerceptualIndex()
+    return _index
+
+
+def move_unless_near_duplicate(file_path: Path, move, threshold: int = PHASH_THRESHOLD) -> Path | None:
+    """
+    A kép áthelyezése a perceptuális index ellenőrzésével: move(hasonló kép útvonala vagy None) végzi
+    a tényleges áthelyezést (közel-duplikátumnál az átnézendők közé), és a célhellyel tér vissza.
+    A keresés, az áthelyezés és a hash beszúrása a (folyamatok között megosztott, újrahívható)
+    áthelyezési zár alatt, egy lépésben történik: két párhuzamosan feldolgozott hasonló kép közül
+    a második már látja az elsőt. Tervezésnél (--dry-run, --plan) csak keres, az indexbe nem ír.
+    """
+    global _disabled
+    if _disabled:
+        return move(None)
+    try:
+        with stage("phash"):
+            value = dhash(file_path)
+    except ImportError as e:
+        _disabled = True
+        log(f"⚠️ Közel-duplikátum keresés kikapcsolva (hiányzó modul: {e.name})", level="WARNING",
+            module="img", to_console=True)
+        return move(None)
+    except Exception as e:
+        log(f"⚠️ Perceptuális hash hiba: {file_path.name} – {e}", level="WARNING", module="img")
+        return move(None)
+
+    with get_move_lock():
+        index = get_index()
+        match = index.nearest(value, threshold)
+        if match is not None:
+            distance, similar = match
+            log(f"🖼️ Közel-duplikátum: {file_path.name} ≈ {similar} (távolság: {distance})",
+                level="INFO", module="img", to_console=True)
+            return move(similar)
+        target_path = move(None)
+        if target_path is not None and not is_planning():
+            index.add(value, target_path)
+        return target_path
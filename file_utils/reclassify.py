@@ -0,0 +1,139 @@
+"""
+A rendezett archívum újraosztályozása a szövegtár alapján (--reclassify).
+A fájlok nem nyílnak meg: a tárolt szövegen fut újra az osztályozás és a névképzés, és csak
+azok a dokumentumok mozdulnak, amelyeknek a célhelye megváltozott.
+Újraolvasni sem kell minden szöveget: a tárolt eredmény a szabályok ujjlenyomatához kötött, és
+ha csak kulcsszavak változtak, csak azokat a dokumentumokat kell újra végigolvasni, amelyek
+tartalmaznak megváltozott kulcsszót; a többinél a tárolt pontszámokból számolódik újra a típus.
+"""
+import os
+import re
+from pathlib import Path
+
+from file_utils.common import log, move_unique, is_planning, strip_accents
+from file_utils.rules import ScanResult
+from file_utils.metrics import stage
+from file_utils.textstore import TextStore, get_store
+
+
+class _RuleDiff:
+    """
+    Egy korábbi szabálykészlet eltérése a jelenlegitől: változtak-e a minták (dátum, számlaszám),
+    és mely (ékezetmentes, kisbetűs) kulcsszavak kerültek be, ki, vagy kaptak más típust / súlyt
+    """
+
+    def __init__(self, old_rules: dict | None, engine):
+        if old_rules is None:
+            self.patterns_changed, self.keywords = True, ()
+            return
+        new_rules = engine.rules
+        self.patterns_changed = (old_rules.get("date"), old_rules.get("invoice")) != (new_rules.get("date"), new_rules.get("invoice"))
+        old_map = type(engine)(old_rules).keyword_map()
+        new_map = engine.keyword_map()
+        self.keywords = tuple(k for k in old_map.keys() | new_map.keys() if old_map.get(k) != new_map.get(k))
+
+    def needs_scan(self, text: str) -> bool:
+        if self.patterns_changed:
+            return True
+        if not self.keywords:
+            return False
+        folded = strip_accents(text).lower()
+        return any(keyword in folded for keyword in self.keywords)
+
+
+def _same_destination(current: Path, target: Path) -> bool:
+    """
+    A jelenlegi hely megfelel-e a célnak (a foglalt név miatti "(n)" toldalékkal együtt)
+    """
+    if os.path.normcase(str(current.parent)) != os.path.normcase(str(target.parent)):
+        return False
+    pattern = re.escape(target.stem) + r"(\(\d+\))?" + re.escape(target.suffix)
+    return re.fullmatch(pattern, current.name, re.IGNORECASE if os.name == "nt" else 0) is not None
+
+
+def _handlers():
+    """
+    dokumentumfajta → (szabálymotor, célhely függvény (eredeti név, eredmény) → (cél, típus))
+    """
+    from file_utils.pdf import get_rule_engine, pdf_destination
+    from file_utils.office import get_office_engine, office_destination
+
+    pdf_engine, office_engine = get_rule_engine(), get_office_engine()
+
+    def office(name: Path, result: ScanResult):
+        tipus = office_engine.best_type(result.scores)
+        return office_destination(name, tipus), tipus or "-"
+
+    return {
+        "pdf": (pdf_engine, lambda name, result: pdf_destination(name, result, pdf_engine)),
+        "office": (office_engine, office),
+    }
+
+
+def reclassify(store: TextStore = None, index=None) -> dict:
+    """
+    A szövegtárban nyilvántartott dokumentumok újraosztályozása és (szükség esetén) áthelyezése.
+    Tervező módban (--dry-run) csak a terv készül el, a tár nem változik.
+
+    :param index: opcionális HashIndex, amelyben az áthelyezett fájlok célhelye frissül
+    :return: összesítés (moved, unchanged, rescanned, missing, failed)
+    """
+    store = store or get_store()
+    handlers = _handlers()
+    diffs = {}
+    counts = {"moved": 0, "unchanged": 0, "rescanned": 0, "missing": 0, "failed": 0}
+    planning = is_planning()
+
+    for path, digest, kind, name, stored, fingerprint in store.documents():
+        if kind not in handlers:
+            continue
+        engine, destination = handlers[kind]
+        current = Path(path)
+        if not current.exists():
+            counts["missing"] += 1
+            continue
+
+        # a tárolt eredmény újrahasznosítható, ha a szabályok azóta nem érintik ezt a szöveget
+        result = ScanResult.from_dict(stored) if stored and fingerprint else None
+        if result is not None and fingerprint != engine.fingerprint:
+            key = (kind, fingerprint)
+            if key not in diffs:
+                diffs[key] = _RuleDiff(store.get_rules(fingerprint), engine)
+            diff = diffs[key]
+            if diff.patterns_changed or diff.keywords:
+                text = store.get_text(digest)
+                if text is None or diff.needs_scan(text):
+                    result = None
+        if result is None:
+            text = store.get_text(digest)
+            if text is None:
+                counts["failed"] += 1
+                continue
+            with stage("classify"):
+                result = engine.scan(text)
+            counts["rescanned"] += 1
+
+        target, tipus = destination(Path(name), result)
+        if _same_destination(current, target):
+            counts["unchanged"] += 1
+            new_path = current
+        else:
+            try:
+                new_path = move_unique(current, target, f"újraosztályozás: {tipus}")
+            except Exception as e:
+                log(f"⚠️ Újraosztályozási hiba: {current.name} – {e}", level="ERROR", module="reclassify", to_console=True)
+                counts["failed"] += 1
+                continue
+            counts["moved"] += 1
+            if not planning:
+                log(f"🔁 Újraosztályozva: {current} → {new_path}", level="INFO", module="reclassify")
+                if index is not None:
+                    index.relocate(current, new_path)
+        if not planning:
+            if new_path != current:
+                store.forget(current)
+            store.record(new_path, digest, kind, name, result.to_dict(), engine)
+
+    store.flush()
+    log(f"🔁 Újraosztályozás: {counts}", level="INFO", module="reclassify", to_console=True)
+    return counts
@@ -0,0 +1,147 @@
+"""
+Kezelő-regiszter: kiterjesztés → kezelő.
+A kezelő modulja (és vele a nehéz függőségek: fitz, PIL, mutagen, shazamio, pywin32)
+csak az első megfelelő fájl feldolgozásakor töltődik be.
+"""
+import importlib
+from functools import partial
+from typing import NamedTuple
+
+from config import PHOTO_EVENTS
+from file_utils.sniff import read_header
+
+
+class LazyHandler:
+    """
+    "modul:függvény" hivatkozás, amely az első hívásnál importál.
+    Picklelhető (process poolba küldhető) és hash-elhető (kötegelésnél kulcs).
+    """
+
+    def __init__(self, target: str):
+        self.target = target
+        self._func = None
+
+    def load(self):
+        if self._func is None:
+            module_name, func_name = self.target.split(":")
+            self._func = getattr(importlib.import_module(module_name), func_name)
+        return self._func
+
+    def __call__(self, *args, **kwargs):
+        return self.load()(*args, **kwargs)
+
+    def __getstate__(self):
+        return {"target": self.target}
+
+    def __setstate__(self, state):
+        self.target = state["target"]
+        self._func = None
+
+    def __eq__(self, other):
+        return isinstance(other, LazyHandler) and other.target == self.target
+
+    def __hash__(self):
+        return hash(self.target)
+
+    def __repr__(self):
+        return f"LazyHandler({self.target!r})"
+
+
+class FollowUp(NamedTuple):
+    """
+    Kötegelt kezelő eredménye helyett: a fájl feldolgozása külön feladatként folytatódik
+    (handler, kind), pl. az eseményekbe csoportosítás után a képek áthelyezése a process poolban
+    """
+    handler: object
+    kind: str
+
+
+# kiterjesztés → (kezelő, futtatás módja); "cpu": process pool, "io": szálak, "serial": fő szál,
+# "batch": a fájlok összegyűjtve, egyben kerülnek a kezelőhöz (MP3: egy eseményhurok, közös kliens)
+_pdf = LazyHandler("file_utils.pdf:process_pdf")
+_mp3 = LazyHandler("file_utils.mp3:process_mp3_batch")
+_img = LazyHandler("file_utils.images:process_image")
+_img_events = LazyHandler("file_utils.images:process_image_batch")
+_office = LazyHandler("file_utils.office:process_office")
+_exe = LazyHandler("file_utils.exe:process_exe")
+_zip = LazyHandler("file_utils.archives:process_zip")
+
+HANDLERS = {
+    ".pdf": (_pdf, "cpu"),
+    ".mp3": (_mp3, "batch"),
+    ".wav": (_mp3, "batch"),
+    ".jpg": (_img, "cpu"),
+    ".jpeg": (_img, "cpu"),
+    ".png": (_img, "cpu"),
+    ".doc": (_office, "serial"),
+    ".docx": (_office, "serial"),
+    ".xls": (_office, "serial"),
+    ".xlsx": (_office, "serial"),
+    ".exe": (_exe, "io"),
+    ".zip": (_zip, "serial"),  # a tagok kezelői a fő szálon futnak (pl. Office COM, szövegtár)
+}
+
+
+# a fájl fejlécét (sniff.read_header) is megkapó kezelők: header kulcsszavas paraméter
+_HEADER_AWARE = (_pdf, _img, _office)
+
+# a hash-index által már kiszámolt tartalom-hash-t is megkapó kezelők (szövegtár): digest kulcsszavas paraméter
+_DIGEST_AWARE = (_pdf, _office)
+
+# a futás összes fájlját egyben igénylő kötegelt kezelők (az eseményekbe csoportosításhoz minden kép kell);
+# a többi köteg (MP3) részletekben is indulhat
+_WHOLE_RUN = (_img_events,)
+
+
+def enable_photo_events():
+    """
+    A képek kötegelt feldolgozása: a futás összes képe együtt kerül eseményekbe csoportosításra
+    """
+    for ext, (handler, _kind) in HANDLERS.items():
+        if handler == _img:
+            HANDLERS[ext] = (_img_events, "batch")
+
+
+if PHOTO_EVENTS:
+    enable_photo_events()
+
+
+def get_handler(ext: str, default=None):
+    """
+    (kezelő, kind) pár a kiterjesztéshez; ismeretlen kiterjesztésnél a default
+    """
+    return HANDLERS.get(ext.lower(), default)
+
+
+def bind_header(handler, header: bytes, digest: str | None = None):
+    """
+    A már beolvasott fejléc (és a hash-index által kiszámolt tartalom-hash) átadása a kezelőnek,
+    ha tudja használni (a kötegelt kezelők nem kapják meg)
+    """
+    keywords = {}
+    if handler in _HEADER_AWARE:
+        keywords["header"] = header
+    if digest and handler in _DIGEST_AWARE:
+        keywords["digest"] = digest
+    return partial(handler, **keywords) if keywords else handler
+
+
+def unbind_header(handler):
+    """
+    A bind_header párja a várakozó feladatokhoz: a kötött fejléc helyett a kezelő indításkor
+    (a workerben) olvassa be újra, így a sorban álló feladatok nem tartják a memóriában
+
+    :return: (kezelő, volt-e kötött fejléce)
+    """
+    if not (isinstance(handler, partial) and "header" in handler.keywords):
+        return handler, False
+    keywords = {key: value for key, value in handler.keywords.items() if key != "header"}
+    return partial(_with_header, partial(handler.func, *handler.args, **keywords)), True
+
+
+def _with_header(handler, file_path):
+    return handler(file_path, header=read_header(file_path))
+
+
+def is_whole_run_batch(handler) -> bool:
+    return handler in _WHOLE_RUN
@@ -0,0 +1,235 @@
+"""
+Egymenetes szabálymotor dokumentum-osztályozáshoz.
+Az összes kulcsszót, a dátum- és a számlaszám-mintát egyetlen, ékezetfüggetlen regexbe fordítja,
+így egy szöveget csak egyszer kell végigolvasni. A dátum és a számlaszám nulla szélességű
+előretekintésként szerepel: nem nyelik el sem egymást, sem a bennük lévő kulcsszavakat.
+A szabályok (súly, prioritás) JSON fájlból tölthetők.
+"""
+import hashlib
+import json
+import re
+from pathlib import Path
+
+from file_utils.common import log, strip_accents
+
+
+class ScanResult:
+    def __init__(self):
+        self.scores = {}
+        self.datum = None
+        self.szamla = None
+
+    def merge(self, other: "ScanResult"):
+        for tipus, score in other.scores.items():
+            self.scores[tipus] = self.scores.get(tipus, 0) + score
+        self.datum = self.datum or other.datum
+        self.szamla = self.szamla or other.szamla
+
+    def to_dict(self) -> dict:
+        return {"scores": self.scores, "datum": self.datum, "szamla": self.szamla}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ScanResult":
+        result = cls()
+        result.scores, result.datum, result.szamla = dict(data["scores"]), data["datum"], data["szamla"]
+        return result
+
+
+class RuleEngine:
+    """
+    Szabályok formátuma:
+    {
+      "types": [{"type": "SZAMLA", "priority": 50, "min_score": 1,
+                 "keywords": ["számla", ["invoice", 2], ...]}, ...],
+      "date": "<regex, az első csoport a dátum>",
+      "invoice": "<regex, az első csoport a számlaszám>"
+    }
+    A kulcsszó lehet szöveg (súly 1) vagy [szöveg, súly] pár.
+    """
+
+    def __init__(self, rules: dict):
+        self.rules = rules
+        self.types = {}
+        self.keywords = []  # csoportsorszám → (típus, súly)
+        alternatives = []
+        keyword_alternatives = []
+
+        # a számlaszám és a dátum átfedhet (pl. "Sorszám: 2023-05-04-0017"): előretekintésként nem fogyasztanak
+        if rules.get("invoice"):
+            alternatives.append(f"(?=(?P<szamla>{_fold_pattern(rules['invoice'], 'szamla')}))")
+        if rules.get("date"):
+            alternatives.append(f"(?=(?P<datum>{_fold_pattern(rules['date'], 'datum')}))")
+
+        entries = []
+        for rule in rules.get("types", []):
+            self.types[rule["type"]] = (rule.get("priority", 0), rule.get("min_score", 1))
+            for kw in rule.get("keywords", []):
+                text, weight = (kw, 1) if isinstance(kw, str) else (kw[0], kw[1])
+                entries.append((fold(text), rule["type"], weight))
+        # hosszabb kulcsszó előbb, hogy az alternáció ne a rövidebbet válassza
+        entries.sort(key=lambda e: -len(e[0]))
+        for i, (text, tipus, weight) in enumerate(entries):
+            self.keywords.append((tipus, weight))
+            keyword_alternatives.append(f"(?P<k{i}>{re.escape(text)})")
+
+        alternatives.extend(keyword_alternatives)
+        self.pattern = re.compile("|".join(alternatives) or "(?!)", re.IGNORECASE)
+        # ha a dátum és a számlaszám is megvan, a menet a szöveg hátralévő részén csak kulcsszavakkal folytatódik
+        self.keyword_pattern = re.compile("|".join(keyword_alternatives) or "(?!)", re.IGNORECASE)
+        self.wants = {"szamla": bool(rules.get("invoice")), "datum": bool(rules.get("date"))}
+
+    @classmethod
+    def from_file(cls, path: Path, default: dict) -> "RuleEngine":
+        """
+        Szabályok betöltése JSON fájlból; hiányzó vagy hibás fájl esetén a default szabályok
+        """
+        try:
+            with open(path, encoding="utf-8") as f:
+                return cls(json.load(f))
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError, re.error) as e:
+            log(f"⚠️ Szabályfájl hiba: {path} – {e}", level="ERROR", module="rules", to_console=True)
+        return cls(default)
+
+    @property
+    def fingerprint(self) -> str:
+        """
+        A szabályok ujjlenyomata (a tárolt osztályozási eredmények ehhez kötődnek)
+        """
+        return hashlib.blake2b(json.dumps(self.rules, sort_keys=True).encode("utf-8"), digest_size=10).hexdigest()
+
+    def keyword_map(self) -> dict:
+        """
+        Ékezetmentes, kisbetűs kulcsszó → ((típus, súly), ...) a szabályok összevetéséhez
+        """
+        keywords = {}
+        for rule in self.rules.get("types", []):
+            for kw in rule.get("keywords", []):
+                text, weight = (kw, 1) if isinstance(kw, str) else (kw[0], kw[1])
+                keywords.setdefault(strip_accents(text).lower(), []).append((rule["type"], weight))
+        return {text: tuple(entries) for text, entries in keywords.items()}
+
+    def scan(self, text: str) -> ScanResult:
+        """
+        Egyetlen menet a szövegen: kulcsszó-pontszámok típusonként, az első dátum és számlaszám.
+        A keresés a hosszt megtartó ékezetmentes változaton fut, a találat az eredeti szövegből
+        (ékezetekkel) kerül az eredménybe.
+        """
+        result = ScanResult()
+        folded = fold(text)
+        missing = sum(self.wants.values())
+        rest = None
+        for m in self.pattern.finditer(folded):
+            group = m.lastgroup
+            if group == "szamla":
+                if result.szamla is None:
+                    result.szamla = text[slice(*m.span("szamla_1"))]
+                    missing -= 1
+            elif group == "datum":
+                if result.datum is None:
+                    result.datum = text[slice(*m.span("datum_1"))].replace(".", "-")
+                    missing -= 1
+            else:
+                self._add_keyword(result, m)
+            if missing <= 0 and group in ("szamla", "datum"):
+                rest = m.end()  # üres egyezés: az itt kezdődő kulcsszó még nem számolódott
+                break
+        if rest is not None:
+            # ugyanaz a menet folytatódik, a hátralévő szövegen már előretekintések nélkül
+            for m in self.keyword_pattern.finditer(folded, rest):
+                self._add_keyword(result, m)
+        return result
+
+    def _add_keyword(self, result: ScanResult, m: re.Match):
+        tipus, weight = self.keywords[int(m.lastgroup[1:])]
+        result.scores[tipus] = result.scores.get(tipus, 0) + weight
+
+    def best_type(self, scores: dict) -> str | None:
+        """
+        A legnagyobb pontszámú típus (egyenlőségnél a nagyobb prioritású), ha eléri a min_score-t
+        """
+        best = None
+        for tipus, score in scores.items():
+            priority, min_score = self.types.get(tipus, (0, 1))
+            if score < min_score:
+                continue
+            key = (score, priority)
+            if best is None or key > best[0]:
+                best = (key, tipus)
+        return best[1] if best else None
+
+
+_engines = {}
+
+def get_engine(path: Path, default: dict | None = None) -> RuleEngine:
+    """
+    Szabálymotor fájlonként (és alapértelmezésenként) egyszer fordítva, folyamatonként gyorsítótárazva.
+    Az alapértelmezés is a kulcs része: hiányzó / hibás szabályfájlnál a hívók eltérő alapértelmezése
+    nem függhet attól, melyikük kérte először a motort.
+    """
+    key = (str(path), json.dumps(default, sort_keys=True, ensure_ascii=False) if default else None)
+    if key not in _engines:
+        _engines[key] = RuleEngine.from_file(path, default or {})
+    return _engines[key]
+
+
+class _FoldTable(dict):
+    """
+    str.translate tábla: ékezetes betű → alapbetű, karakterenként (a pozíciók megmaradnak).
+    Ami nem egyetlen karakterre bomlik (pl. ligatúra, €), változatlan marad.
+    """
+
+    def __missing__(self, codepoint: int) -> str:
+        char = chr(codepoint)
+        folded = strip_accents(char)
+        self[codepoint] = folded if len(folded) == 1 else char
+        return self[codepoint]
+
+
+_FOLD = _FoldTable()
+
+
+def fold(text: str) -> str:
+    """
+    Ékezetmentesítés a hossz megtartásával (a találatok helye így az eredeti szövegben is érvényes)
+    """
+    return text if text.isascii() else text.translate(_FOLD)
+
+
+def _first_group(pattern: str) -> int | None:
+    """
+    Az első rögzítő (nem (?...) alakú) csoport nyitó zárójelének helye; a \\-vel escape-elt
+    karaktereket és a karakterosztályokat ([...], pl. [(]) átlépi
+    """
+    i, in_class = 0, False
+    while i < len(pattern):
+        char = pattern[i]
+        if char == "\\":
+            i += 2
+            continue
+        if in_class:
+            in_class = char != "]"
+        elif char == "[":
+            in_class = True
+            # a nyitás utáni ] (vagy ^]) még az osztály része
+            if pattern.startswith("^", i + 1):
+                i += 1
+            if pattern.startswith("]", i + 1):
+                i += 1
+        elif char == "(" and not pattern.startswith("?", i + 1):
+            return i
+        i += 1
+    return None
+
+
+def _fold_pattern(pattern: str, name: str) -> str:
+    """
+    Minta ékezetmentesítése, a globális inline flagek (pl. (?i)) eltávolítása,
+    és az első rögzítő csoport elnevezése (name_1), hogy a kombinált regexben is elérhető legyen.
+    """
+    pattern = fold(re.sub(r"^\(\?[aiLmsux]+\)", "", pattern))
+    start = _first_group(pattern)
+    if start is None:
+        raise re.error(f"a mintában nincs rögzítő csoport: {pattern}")
+    return f"{pattern[:start]}(?P<{name}_1>{pattern[start + 1:]}"
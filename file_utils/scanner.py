@@ -0,0 +1,105 @@
+"""
+os.scandir alapú, inkrementális bejáró.
+A DirEntry stat eredményét adja tovább (nem kell külön is_file/getmtime hívás), a fájlokat
+lustán, generátorként adja vissza, és a könyvtárak mtime-ját checkpointba menti, hogy a
+következő futáskor a változatlan könyvtárakat ne kelljen újra listázni.
+"""
+import json
+import os
+from pathlib import Path
+
+from file_utils.common import log
+
+
+class ScanCheckpoint:
+    """
+    Könyvtáranként: {"mtime": ..., "subdirs": [...]}.
+    Csak olyan könyvtár kerül bele, amelyben a futás végén nem maradt feldolgozatlan fájl.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.dirs = {}
+        self.visited = {}  # könyvtár → (mtime a listázás előtt, alkönyvtárak, volt-e benne fájl)
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                self.dirs = json.load(f)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            log(f"⚠️ Scan checkpoint olvasási hiba: {self.path} – {e}", level="WARNING", module="scanner")
+
+    def unchanged(self, directory: str, mtime: float):
+        """
+        Ha a könyvtár a legutóbbi checkpoint óta nem változott, visszaadja az alkönyvtárait.
+        """
+        entry = self.dirs.get(directory)
+        if entry and entry["mtime"] == mtime:
+            return entry["subdirs"]
+        return None
+
+    def save(self):
+        """
+        A bejárt könyvtárak állapotának rögzítése a feldolgozás után.
+        Ahol fájl volt, ott újra megnézzük, maradt-e benne valami (pl. túl friss vagy hibás fájl).
+        """
+        for directory, (mtime, subdirs, had_files) in self.visited.items():
+            if had_files:
+                try:
+                    # előbb az mtime, utána a listázás: a közben érkező fájl így a következő futásnál látszik
+                    mtime = os.stat(directory).st_mtime
+                    with os.scandir(directory) as it:
+                        clean = not any(entry.is_file(follow_symlinks=False) for entry in it)
+                except OSError:
+                    clean = False
+                if not clean:
+                    self.dirs.pop(directory, None)
+                    continue
+            self.dirs[directory] = {"mtime": mtime, "subdirs": subdirs}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.dirs, f)
+        os.replace(tmp, self.path)
+
+
+def scan(root: Path, checkpoint: ScanCheckpoint = None):
+    """
+    Fájlok bejárása: (Path, os.stat_result) párokat ad vissza lustán.
+    A checkpoint szerint változatlan könyvtárakat nem listázza, csak az alkönyvtáraikba lép tovább.
+    """
+    stack = [str(root)]
+    while stack:
+        directory = stack.pop()
+        try:
+            mtime = os.stat(directory).st_mtime
+        except OSError:
+            continue
+
+        if checkpoint is not None:
+            subdirs = checkpoint.unchanged(directory, mtime)
+            if subdirs is not None:
+                stack.extend(subdirs)
+                continue
+
+        subdirs = []
+        had_files = False
+        try:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        had_files = True
+                        try:
+                            st = entry.stat(follow_symlinks=False)
+                        except OSError:
+                            continue
+                        yield Path(entry.path), st
+        except OSError as e:
+            log(f"⚠️ Könyvtár olvasási hiba: {directory} – {e}", level="WARNING", module="scanner")
+            continue
+
+        if checkpoint is not None:
+            checkpoint.visited[directory] = (mtime, subdirs, had_files)
+        stack.extend(subdirs)
@@ -0,0 +1,192 @@
+"""
+Költségalapú ütemező a kezelők előtt.
+A feladatok kezelőnként (sáv: pdf, images, office, …) külön prioritási sorba kerülnek; mindig a becsült
+költség (típus és méret alapján) szerint legolcsóbb indítható feladat indul, így egy több száz oldalas PDF
+nem tartja fel a gyors képáthelyezéseket. Sávonként külön párhuzamossági keret és rate limit (token bucket) van,
+a pool-ok pedig sosem kapnak több feladatot, mint amennyit azonnal futtatni tudnak.
+A bejárót csak addig olvassa, amíg a várakozó feladatok száma az ablak alatt van (backpressure): a memória
+nem telik meg a teljes bemenet feladataival, a rendezés pedig az ablakon belül érvényesül. A kezelőhöz kötött
+fejlécet (SNIFF_BYTES) csak néhány várakozó feladat tartja meg; a többi indításkor olvassa be újra.
+"""
+import heapq
+import os
+import time
+from functools import partial
+from pathlib import Path
+
+from config import SCHEDULER_LANES, SCHEDULER_WINDOW
+from file_utils.registry import unbind_header
+
+DEFAULT_LANE = {"limit": None, "rate": 0, "cost": (10, 10)}
+
+
+class RateLimiter:
+    """
+    Token bucket: átlagosan rate indítás másodpercenként, legfeljebb burst egyszerre
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def ready_in(self, now: float = None) -> float:
+        """
+        Ennyi másodperc múlva lesz indítható token (0: most)
+        """
+        self._refill(time.monotonic() if now is None else now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def reserve(self, now: float = None) -> float:
+        """
+        Egy token lefoglalása; a visszatérési érték a szükséges várakozás (a token előre is lefoglalható)
+        """
+        wait = self.ready_in(now)
+        self.tokens -= 1
+        return wait
+
+
+def lane_of(handler) -> str:
+    """
+    A sáv neve a kezelőből: LazyHandler esetén a modul neve (pdf, images, …), különben a függvényé
+    """
+    func = handler.func if isinstance(handler, partial) else handler
+    target = getattr(func, "target", None)
+    if target:
+        return target.split(":")[0].rsplit(".", 1)[-1]
+    return getattr(func, "__name__", "other")
+
+
+class _Lane:
+    def __init__(self, name: str, kind: str, capacity: int):
+        spec = {**DEFAULT_LANE, **SCHEDULER_LANES.get(name, {})}
+        limit = spec["limit"]
+        if limit is None:
+            limit = capacity
+        elif limit < 0:  # a pool mérete mínusz ennyi
+            limit = capacity + limit
+        self.name = name
+        self.kind = kind
+        self.limit = max(1, min(limit, capacity))
+        self.base, self.per_mb = spec["cost"]
+        self.limiter = RateLimiter(spec["rate"], spec.get("burst", 1)) if spec["rate"] else None
+        self.heap = []
+        self.running = 0
+
+    def cost(self, size: int) -> float:
+        """
+        Becsült futásidő (ms) a fájlméretből
+        """
+        return self.base + self.per_mb * size / (1024 * 1024)
+
+
+class Scheduler:
+    """
+    :param capacity: futtatási módonként ("cpu", "io", "serial") az egyszerre futtatható feladatok száma
+    :param window: legfeljebb ennyi feladat várakozhat (a bejáró addig nem olvasódik tovább)
+    """
+
+    def __init__(self, capacity: dict, window: int = SCHEDULER_WINDOW):
+        self.capacity = capacity
+        self.window = window
+        self.lanes = {}
+        self.running = dict.fromkeys(capacity, 0)
+        self.queued = 0
+        self.seq = 0
+        self.exhausted = False
+        # ennyi várakozó feladat tarthatja meg a fejlécét (nagyjából ennyi indul a következő körben)
+        self.header_slots = sum(capacity.values())
+        self.headers = 0
+
+    def __len__(self):
+        return self.queued
+
+    def push(self, handler, kind: str, file_path: Path, size: int = None):
+        name = lane_of(handler)
+        lane = self.lanes.get((name, kind))
+        if lane is None:
+            lane = self.lanes[(name, kind)] = _Lane(name, kind, self.capacity[kind])
+        if size is None:
+            try:
+                size = os.stat(file_path).st_size
+            except OSError:
+                size = 0
+        unbound, has_header = unbind_header(handler)
+        keep_header = has_header and self.headers < self.header_slots
+        if keep_header:
+            self.headers += 1
+        else:
+            handler = unbound
+        self.seq += 1  # azonos költségnél a bejárás sorrendje marad
+        heapq.heappush(lane.heap, (lane.cost(size), self.seq, handler, file_path, keep_header))
+        self.queued += 1
+
+    def fill(self, jobs, on_batch):
+        """
+        Feladatok beolvasása a bejáróból, amíg az ablak meg nem telik; a kötegelt feladatok az on_batch-hez mennek
+        """
+        while not self.exhausted and self.queued < self.window:
+            job = next(jobs, None)
+            if job is None:
+                self.exhausted = True
+                break
+            handler, kind, file_path = job
+            if kind == "batch":
+                on_batch(handler, file_path)
+            else:
+                self.push(handler, kind, file_path)
+
+    def pop(self, now: float = None):
+        """
+        A legolcsóbb indítható feladat: van szabad hely a sávban és a futtatási módban, és a rate limit engedi.
+
+        :return: (handler, kind, file_path, sáv) vagy None
+        """
+        now = time.monotonic() if now is None else now
+        best = None
+        for lane in self.lanes.values():
+            if not lane.heap or lane.running >= lane.limit or self.running[lane.kind] >= self.capacity[lane.kind]:
+                continue
+            if lane.limiter and lane.limiter.ready_in(now) > 0:
+                continue
+            if best is None or lane.heap[0] < best.heap[0]:
+                best = lane
+        if best is None:
+            return None
+        _cost, _seq, handler, file_path, keep_header = heapq.heappop(best.heap)
+        self.headers -= keep_header
+        if best.limiter:
+            best.limiter.reserve(now)
+        best.running += 1
+        self.running[best.kind] += 1
+        self.queued -= 1
+        return handler, best.kind, file_path, best
+
+    def release(self, lane: _Lane):
+        lane.running -= 1
+        self.running[lane.kind] -= 1
+
+    def occupy(self, kind: str, n: int = 1):
+        """
+        Sávon kívül futó feladat (pl. egy köteg az I/O szálon) helyfoglalása a futtatási módban; n=-1: elengedés
+        """
+        self.running[kind] += n
+
+    def wait_time(self, now: float = None) -> float | None:
+        """
+        Ennyi idő múlva válik indíthatóvá egy csak a rate limit miatt várakozó sáv (None: nincs ilyen)
+        """
+        now = time.monotonic() if now is None else now
+        waits = [lane.limiter.ready_in(now) for lane in self.lanes.values()
+                 if lane.heap and lane.limiter and lane.running < lane.limit
+                 and self.running[lane.kind] < self.capacity[lane.kind]]
+        return min(waits) if waits else None
+
+    @property
+    def done(self) -> bool:
+        return self.exhausted and not self.queued
@@ -0,0 +1,135 @@
+"""
+Fájltípus felismerése a tartalom alapján (magic bájtok).
+A fájl elejét (SNIFF_BYTES) egyetlen olvasással a feldolgozás elején egyszer olvassa be; ugyanez a fejléc
+megy tovább a tartalom-hash számításhoz és a kezelőkhöz, így a kis metaadat-olvasóknak (EXIF)
+nem kell újra megnyitniuk a fájlt.
+A hibás vagy hiányzó kiterjesztésű fájlok (átnevezett PDF, kiterjesztés nélküli letöltés) így a tényleges
+formátumuk kezelőjéhez kerülnek a _FAILED mappa helyett.
+"""
+import struct
+from pathlib import Path
+
+from config import SNIFF_BYTES
+
+# felismert formátum → elfogadott kiterjesztések (az első a kanonikus); ha a fájl kiterjesztése a
+# formátum családjába tartozik, az marad érvényben (pl. .jpeg, vagy .xls egy általános OLE2 fejlécnél)
+FAMILIES = {
+    "pdf": (".pdf",),
+    "jpeg": (".jpg", ".jpeg", ".jpe", ".jfif"),
+    "png": (".png",),
+    "docx": (".docx", ".docm", ".dotx"),
+    "xlsx": (".xlsx", ".xlsm", ".xltx"),
+    "zip": (".zip", ".docx", ".docm", ".dotx", ".xlsx", ".xlsm", ".xltx", ".pptx", ".odt", ".ods", ".epub", ".jar", ".apk"),
+    "doc": (".doc", ".dot"),
+    "xls": (".xls", ".xlt"),
+    "ole2": (".doc", ".dot", ".xls", ".xlt", ".ppt", ".msi", ".msg"),
+    "mp3": (".mp3",),
+    "wav": (".wav",),
+    "exe": (".exe", ".dll", ".sys", ".scr", ".com", ".cpl", ".ocx"),
+}
+
+OLE2_MAGIC = b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"
+ZIP_LOCAL_MAGIC = b"PK\x03\x04"
+
+
+def read_header(file_path: Path, size: int = SNIFF_BYTES) -> bytes:
+    """
+    A fájl első size bájtja egyetlen olvasással (rövidebb fájlnál a teljes tartalom)
+    """
+    with open(file_path, "rb", buffering=0) as f:
+        return f.read(size)
+
+
+def _is_mp3_frame(header: memoryview) -> bool:
+    """
+    MPEG audio keret fejléce: 11 bites szinkron, érvényes verzió / réteg / bitráta / mintavétel
+    """
+    if len(header) < 4 or header[0] != 0xFF or header[1] & 0xE0 != 0xE0:
+        return False
+    version, layer = (header[1] >> 3) & 3, (header[1] >> 1) & 3
+    bitrate, rate = header[2] >> 4, (header[2] >> 2) & 3
+    return version != 1 and layer != 0 and bitrate not in (0, 15) and rate != 3
+
+
+def _zip_member_names(header: bytes) -> set[str]:
+    """
+    A fejlécbe eső ZIP tagok nevei a helyi fájlfejlécek sorrendjében bejárva (a tagok adatán átlépve,
+    így egy tömörítés nélkül tárolt beágyazott archívum tagjai nem számítanak bele)
+    """
+    names = set()
+    pos = 0
+    while header.startswith(ZIP_LOCAL_MAGIC, pos) and pos + 30 <= len(header):
+        flags, method = struct.unpack_from("<HH", header, pos + 6)
+        size, = struct.unpack_from("<I", header, pos + 18)
+        name_len, extra_len = struct.unpack_from("<HH", header, pos + 26)
+        start = pos + 30
+        names.add(header[start:start + name_len].decode("utf-8", "replace"))
+        data = start + name_len + extra_len
+        if not flags & 0x8:
+            pos = data + size
+        elif method == 8:
+            # a méret csak a tag utáni leíróban van: a következő fejléc keresése a tömörített adatban
+            pos = header.find(ZIP_LOCAL_MAGIC, data)
+            if pos < 0:
+                break
+        else:
+            break
+    return names
+
+
+def sniff(header: bytes) -> str | None:
+    """
+    A formátum (FAMILIES kulcsa) a fejléc alapján; None, ha nem felismerhető (pl. szöveges fájl)
+    """
+    view = memoryview(header)
+    head = bytes(view[:16])
+    # először a rögzített helyű magic bájtok: egy tömörítés nélküli (stored) ZIP első tagja lehet PDF,
+    # attól az archívum még ZIP marad
+    if head.startswith(b"%PDF-"):
+        return "pdf"
+    if head.startswith(b"\xff\xd8\xff"):
+        return "jpeg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "png"
+    if head.startswith(ZIP_LOCAL_MAGIC):
+        # OOXML: [Content_Types].xml és a dokumentum saját részei (word/…, xl/…) a tagnevek között
+        names = _zip_member_names(header)
+        if "[Content_Types].xml" in names:
+            if any(name.startswith("word/") for name in names):
+                return "docx"
+            if any(name.startswith("xl/") for name in names):
+                return "xlsx"
+        return "zip"
+    if head.startswith(OLE2_MAGIC):
+        # a könyvtárbejegyzések (UTF-16 nevek) kis fájloknál a fejlécben vannak
+        if "WordDocument".encode("utf-16-le") in header:
+            return "doc"
+        if "Workbook".encode("utf-16-le") in header or "Book".encode("utf-16-le") in header:
+            return "xls"
+        return "ole2"
+    if head.startswith(b"ID3"):
+        return "mp3"
+    if head.startswith(b"RIFF") and head[8:12] == b"WAVE":
+        return "wav"
+    if head.startswith(b"MZ"):
+        return "exe"
+    if header.find(b"%PDF-", 0, 1024) >= 0:  # a specifikáció 1 KiB-nyi előtagot megenged
+        return "pdf"
+    if _is_mp3_frame(view):  # a keretszinkron a leggyengébb jel, a végére marad
+        return "mp3"
+    return None
+
+
+def resolve_suffix(file_path: Path, header: bytes) -> str:
+    """
+    A feldolgozáshoz használt kiterjesztés: a fájlé, ha illik a tartalomhoz (vagy a tartalom nem ismerhető fel),
+    különben a felismert formátum kanonikus kiterjesztése
+    """
+    suffix = file_path.suffix.lower()
+    kind = sniff(header)
+    if kind is None:
+        return suffix
+    family = FAMILIES[kind]
+    if suffix in family or kind == "ole2":  # általános OLE2 fejlécből nem dönthető el, melyik Office formátum
+        return suffix
+    return family[0]
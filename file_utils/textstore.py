@@ -0,0 +1,289 @@
+"""
+Kinyert szövegek perzisztens tára (SQLite, zlib tömörítéssel), tartalom-hash szerint.
+A PDF és Office kezelők ide mentik az osztályozáshoz kiolvasott szöveget (az oldal- / karakterkerettel
+levágott részt, nem a teljes dokumentumot), és a rendezett dokumentumok helyét az osztályozás
+eredményével (és a szabályok ujjlenyomatával) együtt.
+A kulcs a tartalom-hash, ha a hash-index kiszámolta (méretütközésnél); különben a forrás útvonala,
+mérete és mtime-ja (source_key), hogy a szövegtár miatt ne kelljen minden fájlt végigolvasni.
+Így egy szabálymódosítás után az archívum újrarendezhető (reclassify) a fájlok újraolvasása nélkül,
+és egy már látott tartalom ismételt feldolgozásakor sem kell újra szöveget kinyerni.
+
+A szövegekre teljes szöveges index (FTS5) épül: tartalmanként egyszer indexelődik (a szöveg tartalom-hash
+szerint változatlan, így bejegyzést törölni sosem kell), a típus / dátum / számlaszám szűrők pedig a
+dokumentumtábla indexelt oszlopai. Az FTS tábla contentless: a szöveg csak tömörítve, egyszer tárolódik.
+
+Az írások pufferelve, kötegelt tranzakciókban kerülnek az adatbázisba, mindig a fő folyamatból:
+a workerek pufferét a dispatch az eredménnyel együtt visszahozza (drain_store / merge_store),
+így a rendezés közben nincs folyamatok közti írászár-verseny.
+"""
+import json
+import os
+import re
+import sqlite3
+import threading
+import zlib
+from pathlib import Path
+
+from config import cfg, TEXT_STORE_LEVEL, TEXT_STORE_BATCH
+from file_utils.common import strip_accents
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS texts (
+    id INTEGER PRIMARY KEY,
+    hash TEXT NOT NULL UNIQUE,
+    text BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS documents (
+    path TEXT PRIMARY KEY,
+    hash TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    name TEXT NOT NULL,
+    result TEXT,
+    rules TEXT,
+    type TEXT,
+    date TEXT,
+    invoice TEXT
+);
+CREATE TABLE IF NOT EXISTS rules (
+    fingerprint TEXT PRIMARY KEY,
+    rules TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS documents_hash ON documents (hash);
+CREATE INDEX IF NOT EXISTS documents_type ON documents (type, date);
+CREATE INDEX IF NOT EXISTS documents_date ON documents (date);
+CREATE INDEX IF NOT EXISTS documents_invoice ON documents (invoice);
+-- a rowid a texts tábla (explicit, VACUUM után is stabil) id-ja; ékezet nélküli keresés is talál (remove_diacritics)
+CREATE VIRTUAL TABLE IF NOT EXISTS search USING fts5(text, content='', tokenize='unicode61 remove_diacritics 2');
+"""
+
+_DOCUMENT_COLUMNS = ("path", "hash", "kind", "name", "result", "rules", "type", "date", "invoice")
+
+
+class TextStore:
+    """
+    A fő folyamatban nyitott tár; a put_text / record hívások pufferelnek, a flush írja ki őket
+    egy tranzakcióban (automatikusan batch_size tételenként, ha nem a workerben fut)
+    """
+
+    def __init__(self, db_path: Path = None, level: int = TEXT_STORE_LEVEL, batch_size: int = TEXT_STORE_BATCH,
+                 readonly: bool = False):
+        """
+        readonly: csak olvasás (keresés); írózárat nem vesz, így futó rendezés mellett sem vár
+        """
+        db_path = Path(db_path or cfg["text_store"])
+        self.level = level
+        self.batch_size = batch_size
+        if readonly:
+            self.conn = sqlite3.connect(f"{db_path.as_uri()}?mode=ro", uri=True, timeout=30)
+        else:
+            db_path.parent.mkdir(parents=True, exist_ok=True)
+            self.conn = sqlite3.connect(str(db_path), timeout=30)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            self.conn.executescript(_SCHEMA)
+        self.known_rules = set()
+        self.pending = []  # (művelet, adatok): "text", "rules", "document", "relocate", "forget"
+        self.pending_texts = {}
+        self.lock = threading.Lock()
+
+    def close(self):
+        self.flush()
+        self.conn.close()
+
+    def get_text(self, digest: str) -> str | None:
+        blob = self.pending_texts.get(digest)
+        if blob is None:
+            row = self.conn.execute("SELECT text FROM texts WHERE hash = ?", (digest,)).fetchone()
+            blob = row[0] if row else None
+        return zlib.decompress(blob).decode("utf-8") if blob is not None else None
+
+    def put_text(self, digest: str, text: str):
+        """
+        Szöveg pufferelése (a tömörítés a hívó folyamatban, pl. a workerben történik)
+        """
+        blob = zlib.compress(text.encode("utf-8"), self.level)
+        self._queue("text", (digest, blob))
+        self.pending_texts[digest] = blob
+
+    def save_rules(self, fingerprint: str, rules: dict):
+        if fingerprint not in self.known_rules:
+            self._queue("rules", (fingerprint, json.dumps(rules, ensure_ascii=False)))
+            self.known_rules.add(fingerprint)
+
+    def get_rules(self, fingerprint: str) -> dict | None:
+        row = self.conn.execute("SELECT rules FROM rules WHERE fingerprint = ?", (fingerprint,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def record(self, path: Path, digest: str, kind: str, name: str, result: dict | None, engine=None):
+        """
+        Rendezett dokumentum rögzítése: hely, tartalom-hash, típus ("pdf" / "office"), eredeti fájlnév,
+        és az osztályozás eredménye a szabálymotor ujjlenyomatával, valamint a keresési szűrők
+        (dokumentumtípus, dátum, számlaszám)
+        """
+        fingerprint = tipus = None
+        if engine is not None:
+            fingerprint = engine.fingerprint
+            self.save_rules(fingerprint, engine.rules)
+            if result:
+                tipus = engine.best_type(result["scores"])
+        result = result or {}
+        self._queue("document", (str(path), digest, kind, name, json.dumps(result, ensure_ascii=False) if result else None,
+                                 fingerprint, tipus, result.get("datum"), result.get("szamla")))
+
+    def _queue(self, op: str, data: tuple):
+        with self.lock:
+            self.pending.append((op, data))
+            full = len(self.pending) >= self.batch_size
+        if full and not _deferred:
+            self.flush()
+
+    def drain(self) -> list:
+        with self.lock:
+            pending, self.pending = self.pending, []
+            self.pending_texts.clear()
+        return pending
+
+    def merge(self, pending: list):
+        for op, data in pending:
+            self._queue(op, data)
+
+    def flush(self):
+        """
+        A pufferelt írások kiírása egyetlen tranzakcióban (a szöveg a keresőindexbe is bekerül)
+        """
+        pending = self.drain()
+        with self.conn:
+            for op, data in pending:
+                if op == "text":
+                    cur = self.conn.execute("INSERT OR IGNORE INTO texts (hash, text) VALUES (?, ?)", data)
+                    if cur.rowcount:
+                        self.conn.execute("INSERT INTO search (rowid, text) VALUES (?, ?)",
+                                          (cur.lastrowid, zlib.decompress(data[1]).decode("utf-8")))
+                elif op == "rules":
+                    self.conn.execute("INSERT OR IGNORE INTO rules (fingerprint, rules) VALUES (?, ?)", data)
+                elif op == "relocate":
+                    self.conn.execute("UPDATE OR REPLACE documents SET path = ? WHERE path = ?", data)
+                elif op == "forget":
+                    self.conn.execute("DELETE FROM documents WHERE path = ?", data)
+                else:
+                    self.conn.execute(f"INSERT OR REPLACE INTO documents ({', '.join(_DOCUMENT_COLUMNS)}) "
+                                      f"VALUES ({', '.join('?' * len(_DOCUMENT_COLUMNS))})", data)
+
+    def documents(self) -> list[tuple]:
+        """
+        (path, hash, kind, name, eredmény dict | None, szabály-ujjlenyomat) sorok
+        """
+        return [(path, digest, kind, name, json.loads(result) if result else None, rules)
+                for path, digest, kind, name, result, rules in self.conn.execute(
+                    "SELECT path, hash, kind, name, result, rules FROM documents ORDER BY path")]
+
+    def relocate(self, old_path: Path, new_path: Path):
+        self._queue("relocate", (str(new_path), str(old_path)))
+
+    def forget(self, path: Path):
+        self._queue("forget", (str(path),))
+
+    def search(self, query: str = None, tipus: str = None, date: str = None, invoice: str = None,
+               limit: int = 20) -> list[tuple]:
+        """
+        Teljes szöveges keresés (FTS5 lekérdezésszintaxis), opcionális szűrőkkel.
+
+        :param tipus: dokumentumtípus (pl. SZAMLA)
+        :param date: dátum eleje (pl. "2023" vagy "2023-04")
+        :param invoice: számlaszám (pontos egyezés)
+        :return: (path, type, date, invoice, részlet) sorok; szöveges keresésnél relevancia, különben dátum szerint
+        """
+        self.flush()
+        where, args = [], []
+        if query:
+            sql = ("SELECT d.path, d.type, d.date, d.invoice, t.hash FROM search s "
+                   "JOIN texts t ON t.id = s.rowid JOIN documents d ON d.hash = t.hash")
+            where.append("search MATCH ?")
+            args.append(query)
+            order = "s.rank"
+        else:
+            sql = "SELECT d.path, d.type, d.date, d.invoice, d.hash FROM documents d"
+            order = "d.date DESC"
+        if tipus:
+            where.append("d.type = ?")
+            args.append(tipus.upper())
+        if date:
+            where.append("d.date LIKE ? ESCAPE '\\'")
+            args.append(re.sub(r"([\\%_])", r"\\\1", date) + "%")
+        if invoice:
+            where.append("d.invoice = ?")
+            args.append(invoice)
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        rows = self.conn.execute(f"{sql} ORDER BY {order} LIMIT ?", args + [limit]).fetchall()
+        return [(path, tipus, date, invoice, self._snippet(digest, query)) for path, tipus, date, invoice, digest in rows]
+
+    def _snippet(self, digest: str, query: str | None, width: int = 80) -> str:
+        """
+        Rövid részlet a találat első előfordulása körül (contentless FTS mellett a snippet() nem elérhető)
+        """
+        text = " ".join((self.get_text(digest) or "").split())
+        pos = 0
+        if query:
+            folded = strip_accents(text).lower()
+            for term in strip_accents(query).lower().replace('"', " ").split():
+                found = folded.find(term.rstrip("*"))
+                if found >= 0 and term.upper() not in ("AND", "OR", "NOT"):
+                    pos = found
+                    break
+        start = max(0, pos - width // 2)
+        return ("…" if start else "") + text[start:start + width] + ("…" if start + width < len(text) else "")
+
+
+def source_key(file_path: Path) -> str:
+    """
+    Szövegtár-kulcs tartalom-hash helyett: forrásútvonal, méret és mtime (a hex hash-sel nem ütközhet)
+    """
+    st = os.stat(file_path)
+    return f"{file_path}|{st.st_size}|{st.st_mtime_ns}"
+
+
+_store = None
+_deferred = False
+
+def get_store() -> TextStore:
+    """
+    Folyamatonként egy tár, az első dokumentumnál megnyitva
+    """
+    global _store
+    if _store is None:
+        _store = TextStore()
+    return _store
+
+
+def defer_store_writes():
+    """
+    Worker folyamatban: az írások pufferben maradnak, a dispatch hozza vissza őket a fő folyamatba
+    """
+    global _store, _deferred
+    _store = None  # fork esetén a szülő kapcsolata nem használható tovább
+    _deferred = True
+
+
+def flush_store():
+    if _store is not None:
+        _store.flush()
+
+
+def drain_store() -> list:
+    return _store.drain() if _store is not None else []
+
+
+def merge_store(pending: list):
+    if pending:
+        get_store().merge(pending)
+
+
+def close_store():
+    """
+    A fő folyamat tárának lezárása (a maradék puffer kiírásával)
+    """
+    global _store
+    if _store is not None:
+        _store.close()
+        _store = None
@@ -0,0 +1,231 @@
+"""
+Eseményvezérelt figyelés (watch mód).
+Linuxon inotify-jal iratkozik fel a bemeneti mappa változásaira, máshol időszakos
+lekérdezéssel (polling) dolgozik. Egy fájl akkor kész a feldolgozásra, ha a mérete és
+mtime-ja N másodpercig nem változott, és egyetlen folyamat sem tartja írásra nyitva.
+"""
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import time
+from pathlib import Path
+
+from file_utils.common import log, is_file_locked
+
+# inotify maszkok (linux/inotify.h)
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+class InotifyWatcher:
+    """
+    Rekurzív inotify figyelő; az új alkönyvtárakra automatikusan feliratkozik.
+    """
+
+    def __init__(self, root: Path):
+        libc_name = ctypes.util.find_library("c")
+        self.libc = ctypes.CDLL(libc_name, use_errno=True)
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 sikertelen")
+        self.dirs = {}
+        for dirpath, _dirnames, _files in os.walk(root):
+            self._add(Path(dirpath))
+
+    def _add(self, directory: Path):
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK)
+        if wd >= 0:
+            self.dirs[wd] = directory
+
+    def poll(self, timeout: float) -> set[Path]:
+        """
+        Várakozás eseményekre legfeljebb timeout másodpercig; visszatér az érintett fájlokkal.
+        """
+        changed = set()
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return changed
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return changed
+        pos = 0
+        while pos + _EVENT_HEADER.size <= len(data):
+            wd, mask, _cookie, length = _EVENT_HEADER.unpack_from(data, pos)
+            name = data[pos + _EVENT_HEADER.size:pos + _EVENT_HEADER.size + length].rstrip(b"\0")
+            pos += _EVENT_HEADER.size + length
+            directory = self.dirs.get(wd)
+            if directory is None or not name:
+                continue
+            path = directory / os.fsdecode(name)
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    # az új mappát és a már benne lévő fájlokat is felvesszük
+                    for dirpath, _dirnames, filenames in os.walk(path):
+                        self._add(Path(dirpath))
+                        changed.update(Path(dirpath) / f for f in filenames)
+            else:
+                changed.add(path)
+        return changed
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """
+    Tartalék figyelő, ha nincs inotify: időszakos bejárás (méret, mtime) összehasonlítással.
+    """
+
+    def __init__(self, root: Path):
+        self.root = root
+        self.seen = {}
+
+    def poll(self, timeout: float) -> set[Path]:
+        time.sleep(timeout)
+        changed = set()
+        current = {}
+        for dirpath, _dirnames, filenames in os.walk(self.root):
+            for name in filenames:
+                path = Path(dirpath) / name
+                try:
+                    st = path.stat()
+                except OSError:
+                    continue
+                current[path] = (st.st_size, st.st_mtime)
+                if self.seen.get(path) != current[path]:
+                    changed.add(path)
+        self.seen = current
+        return changed
+
+    def close(self):
+        pass
+
+
+def create_watcher(root: Path):
+    """
+    inotify figyelő Linuxon, egyébként polling
+    """
+    if hasattr(select, "select") and os.name == "posix" and Path("/proc/self").exists():
+        try:
+            return InotifyWatcher(root)
+        except (OSError, AttributeError) as e:
+            log(f"⚠️ inotify nem elérhető, polling mód: {e}", level="WARNING", module="watch")
+    return PollingWatcher(root)
+
+
+def open_for_writing() -> set[str] | None:
+    """
+    Az írásra (O_WRONLY/O_RDWR) nyitott fájlok halmaza a /proc/<pid>/fdinfo flagjei alapján.
+    None, ha nincs /proc (ilyenkor fájlonként a zárolást próbáljuk).
+    """
+    proc = Path("/proc")
+    if not (proc / "self" / "fdinfo").exists():
+        return None
+    result = set()
+    for pid_dir in proc.iterdir():
+        if not pid_dir.name.isdigit():
+            continue
+        try:
+            fds = list(os.scandir(pid_dir / "fd"))
+        except OSError:
+            continue
+        for fd in fds:
+            try:
+                target = os.readlink(fd.path)
+                if not target.startswith("/"):
+                    continue
+                with open(pid_dir / "fdinfo" / fd.name) as info:
+                    for line in info:
+                        if line.startswith("flags:"):
+                            if int(line.split()[1], 8) & (os.O_WRONLY | os.O_RDWR):
+                                result.add(target)
+                            break
+            except OSError:
+                continue
+    return result
+
+
+class QuiescenceTracker:
+    """
+    Fájlonként követi, mióta stabil a méret és az mtime.
+    """
+
+    def __init__(self, quiet_seconds: float):
+        self.quiet_seconds = quiet_seconds
+        self.pending = {}  # path → ((méret, mtime), stabil ekkortól)
+
+    def touch(self, path: Path):
+        try:
+            st = path.stat()
+        except OSError:
+            self.pending.pop(path, None)
+            return
+        signature = (st.st_size, st.st_mtime)
+        previous = self.pending.get(path)
+        if previous is None:
+            # új fájlnál a stabilitást az utolsó módosítástól mérjük
+            self.pending[path] = (signature, min(st.st_mtime, time.time()))
+        elif previous[0] != signature:
+            self.pending[path] = (signature, time.time())
+
+    def ready(self) -> list[Path]:
+        """
+        A nyugalmi időt letöltött, írásra senki által nem nyitott fájlok (ezeket ki is veszi a listából)
+        """
+        now = time.time()
+        quiet = []
+        for path, (signature, since) in list(self.pending.items()):
+            try:
+                st = path.stat()
+            except OSError:
+                del self.pending[path]
+                continue
+            if (st.st_size, st.st_mtime) != signature:
+                self.pending[path] = ((st.st_size, st.st_mtime), now)
+            elif now - since >= self.quiet_seconds:
+                quiet.append(path)
+        if not quiet:
+            return []
+
+        # a /proc bejárás drága, ezért körönként csak egyszer, és csak ha van jelölt
+        writers = open_for_writing()
+        result = []
+        for path in quiet:
+            busy = is_file_locked(path) if writers is None else str(path.resolve()) in writers
+            if not busy:
+                del self.pending[path]
+                result.append(path)
+        return result
+
+
+def watch(root: Path, quiet_seconds: float, poll_interval: float, on_ready):
+    """
+    Végtelen figyelő ciklus: a nyugalomba került fájlokat kötegben átadja az on_ready(list[Path]) callbacknek.
+    """
+    watcher = create_watcher(root)
+    tracker = QuiescenceTracker(quiet_seconds)
+    for dirpath, _dirnames, filenames in os.walk(root):
+        for name in filenames:
+            tracker.touch(Path(dirpath) / name)
+    log(f"👀 Figyelés indult: {root} ({type(watcher).__name__})", module="watch", to_console=True)
+    try:
+        while True:
+            for path in watcher.poll(poll_interval):
+                tracker.touch(path)
+            ready = tracker.ready()
+            if ready:
+                on_ready(ready)
+    except KeyboardInterrupt:
+        log("⏹️ Figyelés leállítva", module="watch", to_console=True)
+    finally:
+        watcher.close()
@@ -2,19 +2,27 @@
 
 import time
 import os
-import shutil
+import argparse
+from functools import partial
 from pathlib import Path
 
-import file_utils.pdf as pdf
-import file_utils.office as office
-import file_utils.exe as exe
-import file_utils.images as img
-import file_utils.mp3 as mp3
-from config import cfg, MINIMUM_AGE
+from config import cfg, MINIMUM_AGE, DEDUPLICATE, WATCH_QUIET_SECONDS, WATCH_POLL_INTERVAL
 #from file_utils.common import clean_filename
-from file_utils.common import log, clear_terminal
+from file_utils.common import log, clear_terminal, move_unique, start_plan, stop_plan, is_planning, plan_move, set_journal
+from file_utils.dispatch import run_jobs
+from file_utils.hashindex import HashIndex, RunCopies, is_same_content, set_index
+from file_utils.watch import watch
+from file_utils.scanner import scan, ScanCheckpoint
+from file_utils.registry import get_handler, enable_photo_events, bind_header
+from file_utils.sniff import read_header, resolve_suffix
+from file_utils.mover import resolve_plan, print_plan, execute_plan
+from file_utils.journal import Journal, recover, undo
+from file_utils.metrics import stage, timed_iter, count_file, reset_metrics, write_reports
+from file_utils.reclassify import reclassify
+from file_utils.textstore import TextStore, get_store, flush_store, close_store
 
 INPUT_DIR = Path(cfg["input"])
+SCAN_CHECKPOINT = cfg["scan_checkpoint"]
 failed_dir = cfg["failed_output"]
 
 def should_delete(file_path: Path):
@@ -24,7 +32,182 @@ def should_delete(file_path: Path):
     return file_path.suffix.lower() in [".torrent", ".tmp", ".crdownload"]
 
 
-def main():
+def move_to_failed(file_path: Path) -> Path:
+    """
+    Nem támogatott fájl áthelyezése a _FAILED mappába
+    """
+    log(f"[INFO] Nem támogatott fájltípus: {file_path.name}", level="INFO", to_console=True)
+    destination_path = move_unique(file_path, failed_dir / file_path.name, "nem támogatott")
+    if not is_planning():
+        log(f"[INFO] Áthelyezve ide: {destination_path}", level="INFO", to_console=True)
+    return destination_path
+
+
+def move_to_known(file_path: Path, destination: Path) -> Path:
+    """
+    Korábban már rendezett tartalom áthelyezése az indexben rögzített célhelyre, újraelemzés nélkül
+    """
+    return move_unique(file_path, destination, "index: ismert tartalom")
+
+
+def check_index(index: HashIndex, file_path: Path, pending: dict, st: os.stat_result = None,
+                header: bytes = None, suffix: str = None, copies: RunCopies = None):
+    """
+    Tartalom-hash index ellenőrzése. Visszatér a lefuttatandó (handler, kind) párral,
+    vagy None-nal, ha a fájl duplikátumként törölve lett, illetve egy ebben a futásban még függő
+    azonos tartalmú fájl másolataként visszatartva (copies; az első példány eredményéig).
+    A kezelő a tartalom alapján megállapított kiterjesztés (suffix) szerint választódik.
+    """
+    if st is None:
+        st = file_path.stat()
+    digest, known = index.lookup(file_path, st, header)
+    if known is not None:
+        if DEDUPLICATE and is_same_content(known, st.st_size, digest):
+            if is_planning():
+                plan_move(file_path, None, f"duplikátum: {known}")
+                return None
+            file_path.unlink()
+            count_file(file_path, "duplicate")
+            log(f"♻️ Duplikátum törölve: {file_path.name} (már rendezve: {known})", level="INFO", module="index", to_console=True)
+            return None
+    if DEDUPLICATE and copies is not None:
+        digest, held = copies.hold(file_path, st, digest, header)
+        if held:
+            if is_planning():
+                plan_move(file_path, None, "duplikátum: ebben a futásban már rendezve")
+            log(f"⏸️ Azonos tartalmú másolat visszatartva: {file_path.name}", level="DEBUG", module="index")
+            return None
+    pending[file_path] = (st, digest)
+    if known is not None:
+        return partial(move_to_known, destination=known), "io"
+    return get_handler(file_path.suffix if suffix is None else suffix, (move_to_failed, "io"))
+
+
+def drop_run_copies(copies: list, destination: Path):
+    """
+    Az első példány helyre kerülése után a visszatartott, azonos tartalmú másolatok törlése
+    """
+    for file_path, st, digest in copies:
+        if not is_same_content(destination, st.st_size, digest):
+            log(f"⚠️ Másolat a bemenetben marad (a célhely tartalma eltér): {file_path.name}", level="WARNING", module="index")
+            continue
+        try:
+            file_path.unlink()
+        except FileNotFoundError:  # a végrehajtott terv már törölte
+            continue
+        count_file(file_path, "duplicate")
+        log(f"♻️ Duplikátum törölve: {file_path.name} (ebben a futásban rendezve: {destination})", level="INFO", module="index", to_console=True)
+
+
+def prepare_job(file_path: Path, index: HashIndex = None, pending: dict = None, check_age: bool = True,
+                st: os.stat_result = None, copies: RunCopies = None):
+    """
+    Egy bemeneti fájl előkészítése: törlendők törlése, a feldolgozandókhoz (handler, kind, path) feladat.
+    None, ha a fájllal nincs teendő (kihagyva, törölve, még túl friss vagy duplikátum).
+    A bejárótól kapott st stat eredményt újrahasznosítja; a fájl fejlécét egyszer olvassa be
+    (típusfelismerés, hash, kezelők).
+    """
+    if file_path.name.startswith("~$"):
+        return None
+    elif should_delete(file_path):
+        if is_planning():
+            plan_move(file_path, None, "ideiglenes fájl")
+            return None
+        file_path.unlink()
+        count_file(file_path, "deleted")
+        log(f"🗑️ Törölve: {file_path.name}", level="INFO", to_console=True)
+        return None
+    elif check_age and time.time() - (st.st_mtime if st else os.path.getmtime(file_path)) <= MINIMUM_AGE:
+        return None
+    with stage("sniff"):
+        header = read_header(file_path)
+        suffix = resolve_suffix(file_path, header)
+        if suffix != file_path.suffix.lower():
+            log(f"🔍 Tartalom szerint {suffix}: {file_path.name}", level="INFO", module="sniff")
+        if index is None:
+            job = get_handler(suffix, (move_to_failed, "io"))
+        else:
+            job = check_index(index, file_path, pending, st, header, suffix, copies)
+    if job is None:
+        return None
+    handler, kind = job
+    digest = pending[file_path][1] if pending and file_path in pending else None
+    return bind_header(handler, header, digest), kind, file_path
+
+
+def collect_jobs(index: HashIndex = None, pending: dict = None, checkpoint: ScanCheckpoint = None,
+                 copies: RunCopies = None):
+    """
+    Bemeneti mappa bejárása: törlendők törlése, a kellően régi fájlokhoz feladat (handler, kind, path) előállítása.
+    Generátor: a feldolgozás már a bejárás közben elindul.
+    """
+    for file_path, st in timed_iter("scan", scan(INPUT_DIR, checkpoint)):
+        job = prepare_job(file_path, index, pending, st=st, copies=copies)
+        if job is not None:
+            yield job
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="AI File Butler")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="párhuzamos workerek száma (1 = soros feldolgozás)")
+    parser.add_argument("--watch", action="store_true",
+                        help="folyamatos figyelés: a letöltés után nyugalomba került fájlok azonnali rendezése")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="csak az áthelyezési terv kiírása (forrás → cél [ok]), fájlművelet nélkül")
+    parser.add_argument("--plan", action="store_true",
+                        help="kétfázisú futás: előbb teljes terv, majd kötegelt végrehajtás")
+    parser.add_argument("--undo", nargs="?", const="", metavar="RUN_ID",
+                        help="egy futás áthelyezéseinek visszafordítása a napló alapján (alapértelmezés: a legutóbbi)")
+    parser.add_argument("--reclassify", action="store_true",
+                        help="a rendezett dokumentumok újraosztályozása a tárolt szövegek alapján (szabálymódosítás után)")
+    parser.add_argument("--search", nargs="?", const="", metavar="QUERY",
+                        help="keresés a rendezett PDF / Office dokumentumok szövegében (FTS5 szintaxis, pl. \"bérleti szerz*\"); "
+                             "csak az osztályozáskor kiolvasott rész kereshető (PDF: PDF_PAGE_BUDGET oldal / PDF_BYTE_BUDGET "
+                             "karakter, Office: OFFICE_BYTE_BUDGET karakter, lásd config.py)")
+    parser.add_argument("--type", help="keresési szűrő: dokumentumtípus (pl. SZAMLA)")
+    parser.add_argument("--date", help="keresési szűrő: dátum eleje (pl. 2023 vagy 2023-04)")
+    parser.add_argument("--invoice", help="keresési szűrő: számlaszám")
+    parser.add_argument("--limit", type=int, default=20, help="keresési találatok legnagyobb száma")
+    parser.add_argument("--events", action="store_true",
+                        help="fényképek eseményekbe csoportosítása idő és hely szerint (napi mappák helyett)")
+    parser.add_argument("--profile", type=int, default=0, metavar="N",
+                        help="a leglassabb N fájl cProfile eredményének mentése (output/profiles)")
+    args = parser.parse_args(argv)
+    if args.watch and (args.dry_run or args.plan or args.undo is not None or args.reclassify):
+        parser.error("a --dry-run / --plan / --undo / --reclassify nem használható --watch módban")
+    return args
+
+
+def search(args):
+    """
+    Keresés a szövegtárban; találatonként hely, típus, dátum, számlaszám és egy szövegrészlet
+    """
+    started = time.perf_counter()
+    if not cfg["text_store"].exists():
+        print(f"❌ A szövegtár még nem létezik: {cfg['text_store']}")
+        return
+    # csak olvasó kapcsolat: futó rendezés / figyelés mellett sem vár az írózárra
+    store = TextStore(readonly=True)
+    try:
+        hits = store.search(args.search or None, args.type, args.date, args.invoice, args.limit)
+    except Exception as e:  # pl. hibás FTS5 lekérdezés
+        print(f"❌ Keresési hiba: {e}")
+        return
+    finally:
+        store.close()
+    for path, tipus, datum, szamla, snippet in hits:
+        print(f"📄 {path}  [{tipus or '-'} | {datum or '-'} | {szamla or '-'}]")
+        if snippet:
+            print(f"    {snippet}")
+    print(f"🔎 {len(hits)} találat ({(time.perf_counter() - started) * 1000:.1f} ms)")
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.search is not None:
+        search(args)
+        return
     clear_terminal()
 
     if not INPUT_DIR.exists():
@@ -32,32 +215,94 @@ def main():
         print(f"❌ A bemeneti mappa nem található: {INPUT_DIR}")
         return
 
-    for file_path in INPUT_DIR.glob("**/*"):
-        if file_path.is_file():
-            if file_path.name.startswith("~$"):
-                continue
-            elif should_delete(file_path):
-                file_path.unlink()
-                log(f"🗑️ Törölve: {file_path.name}", level="INFO", to_console=True)                
-                continue
-            elif time.time() - os.path.getmtime(file_path) > MINIMUM_AGE:
-                ext = file_path.suffix.lower()
-                if ext == ".pdf":
-                    pdf.process_pdf(file_path)
-                elif ext in [".mp3", ".wav"]:
-                    mp3.process_mp3(file_path)
-                elif ext in [".jpg", ".jpeg", ".png"]:
-                    img.process_image(file_path)
-                elif ext in [".doc", ".docx", ".xls", ".xlsx"]:
-                    office.process_office(file_path)                                        
-                elif ext == ".exe":
-                    exe.process_exe(file_path)                                        
-                else:
-                    log(f"[INFO] Nem támogatott fájltípus: {file_path.name}", level="INFO", to_console=True)
-                    failed_dir.mkdir(parents=True, exist_ok=True)                    
-                    destination_path = os.path.join(failed_dir, file_path.name)                        
-                    shutil.move(file_path, destination_path)
-                    log(f"[INFO] Áthelyezve ide: {destination_path}", level="INFO", to_console=True)                    
+    if args.events:
+        enable_photo_events()
+
+    index = HashIndex()
+    set_index(index)
+    pending = {}
+    copies = RunCopies()
+    reset_metrics(args.profile)
+
+    def on_result(file_path, destination):
+        st, digest = pending.pop(file_path, (None, None))
+        held = copies.settle(file_path, st) if st is not None else []
+        if isinstance(destination, Path):
+            count_file(file_path, "unsupported" if failed_dir in destination.parents else "moved")
+            if st is not None:
+                index.record(file_path, st, digest, destination)
+            drop_run_copies(held, destination)
+        else:
+            count_file(file_path, "failed")
+            if held:
+                log(f"⏸️ {file_path.name}: {len(held)} azonos tartalmú másolat a következő futásig a bemenetben marad",
+                    level="INFO", module="index", to_console=True)
+
+    def report():
+        summary = write_reports(cfg["metrics_json"], cfg["metrics_prom"], cfg["profile_dir"] if args.profile else None)
+        log(f"📊 {summary['files_total']} fájl, {summary['files_per_sec']} fájl/mp – {cfg['metrics_json']}",
+            level="INFO", module="metrics", to_console=True)
+        for path in summary.get("profiles", []):
+            log(f"🐢 Profil: {path}", level="INFO", module="metrics", to_console=True)
+
+    def on_ready(paths):
+        jobs = (prepare_job(p, index, pending, check_age=False, copies=copies) for p in paths if p.is_file())
+        run_jobs((job for job in jobs if job is not None), workers=args.workers, on_result=on_result)
+        index.commit()
+        flush_store()
+        report()
+
+    if args.undo is not None:
+        try:
+            undo(args.undo or None, index=index)
+        finally:
+            index.close()
+        return
+
+    # megszakadt korábbi futások lezárása a napló alapján, majd új napló ehhez a futáshoz
+    journal = None
+    if not args.dry_run:
+        recover(index=index)
+        journal = Journal.create()
+        set_journal(journal)
+
+    try:
+        if args.reclassify:
+            if args.dry_run:
+                start_plan()
+                reclassify(index=index)
+                print_plan(resolve_plan(stop_plan()))
+            else:
+                reclassify(index=index)
+            return
+        if args.watch:
+            watch(INPUT_DIR, WATCH_QUIET_SECONDS, WATCH_POLL_INTERVAL, on_ready)
+        else:
+            checkpoint = ScanCheckpoint(SCAN_CHECKPOINT)
+            planning = args.dry_run or args.plan
+            if planning:
+                start_plan()
+            # tervező módban a célhely csak a végrehajtás után kerül az indexbe
+            run_jobs(collect_jobs(index, pending, checkpoint, copies), workers=args.workers,
+                     on_result=None if planning else on_result)
+            if planning:
+                plan = resolve_plan(stop_plan())
+                if args.dry_run:
+                    print_plan(plan)
+                    return
+                for entry, destination in execute_plan(plan):
+                    if entry.destination is not None:
+                        on_result(entry.source, destination)
+                    else:
+                        count_file(entry.source, "deleted")
+            checkpoint.save()
+            report()
+    finally:
+        if journal:
+            journal.end()
+            set_journal(None)
+        close_store()
+        index.close()
 
 if __name__ == "__main__":
     main()
@@ -65,5 +310,5 @@ if __name__ == "__main__":
 """
 ÖTLETK:
 - szolgáltatás és exe-t is csináljunk (hogy gyakoroljam)
-- zip, iso ?
+- iso ?
 """
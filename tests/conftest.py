@@ -0,0 +1,14 @@
+"""
+A tesztek saját, ideiglenes munkakönyvtárral futnak: a napló, az indexek és a gyorsítótárak
+nem a valódi WORK/output mappába íródnak. A config import előtt kell beállítani.
+"""
+import os
+import shutil
+import tempfile
+
+_work_dir = tempfile.mkdtemp(prefix="butler_test_")
+os.environ["BUTLER_WORK_DIR"] = _work_dir
+
+
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(_work_dir, ignore_errors=True)
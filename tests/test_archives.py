@@ -0,0 +1,56 @@
+import zipfile
+from functools import partial
+
+import pytest
+
+from file_utils import archives
+from file_utils.common import move_unique
+from file_utils.hashindex import HashIndex, set_index
+
+
+@pytest.fixture
+def env(tmp_path, monkeypatch):
+    sorted_dir = tmp_path / "sorted"
+
+    def handler(file_path, header=None):
+        return move_unique(file_path, sorted_dir / file_path.name, "teszt")
+
+    monkeypatch.setattr(archives, "get_handler", lambda suffix, default=None: (handler, "cpu"))
+    monkeypatch.setattr(archives, "out_dir", tmp_path / "ZIP")
+    monkeypatch.setattr(archives, "failed_dir", tmp_path / "_FAILED")
+    monkeypatch.setattr(archives, "staging_root", tmp_path / "_ZIP_TMP")
+    index = HashIndex(tmp_path / "index.db")
+    set_index(index)
+    yield tmp_path, sorted_dir
+    set_index(None)
+    index.close()
+
+
+def _write_zip(path, members):
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for name, data in members:
+            zf.writestr(name, data)
+    return path
+
+
+def test_limit_error_in_nested_archive_sorts_nothing(env, monkeypatch):
+    tmp_path, sorted_dir = env
+    inner = _write_zip(tmp_path / "inner.zip", [("nagy.txt", b"a" * 3000)])
+    archive = _write_zip(tmp_path / "a.zip", [("elso.txt", b"x" * 1000), ("inner.zip", inner.read_bytes())])
+    # a külső archívum belefér a keretbe, a beágyazott (már az első tag kiírása után) nem
+    monkeypatch.setattr(archives, "_Budget", partial(archives._Budget, max_bytes=3500))
+    result = archives.process_zip(archive)
+    assert result.parent == tmp_path / "_FAILED"
+    assert not sorted_dir.exists()
+    assert not any((tmp_path / "_ZIP_TMP").glob("*"))
+
+
+def test_reprocessed_archive_members_are_duplicates(env):
+    tmp_path, sorted_dir = env
+    members = [("egy.txt", b"egy" * 100), ("belso/ketto.txt", b"ketto" * 100)]
+    archives.process_zip(_write_zip(tmp_path / "a.zip", members))
+    assert sorted(p.name for p in sorted_dir.iterdir()) == ["egy.txt", "ketto.txt"]
+
+    archives.process_zip(_write_zip(tmp_path / "a.zip", members))
+    assert sorted(p.name for p in sorted_dir.iterdir()) == ["egy.txt", "ketto.txt"]
+    assert not any((tmp_path / "_ZIP_TMP").glob("*"))
@@ -0,0 +1,132 @@
+import numpy as np
+import pytest
+
+from file_utils.events import EARTH_KM, cluster_events
+
+GAP = 16 * 3600
+RADIUS_KM = 3.0
+
+
+def _brute_force(times, lats, lons, gap, radius_km, min_photos):
+    """
+    DBSCAN páronkénti vizsgálattal (négyzetes környezet, ugyanazokban a normalizált koordinátákban)
+
+    :return: (magpontok maszkja, szomszédsági mátrix)
+    """
+    coords = np.stack([
+        times / gap,
+        np.radians(lats) * EARTH_KM / radius_km,
+        np.radians(lons) * EARTH_KM * np.cos(np.radians(lats)) / radius_km,
+    ], axis=1)
+    near = (np.abs(coords[:, None, :] - coords[None, :, :]) <= 1.0).all(axis=2)
+    core = near.sum(axis=1) >= min_photos
+    return core, near
+
+
+def _core_components(core, near):
+    n = len(core)
+    component = np.full(n, -1)
+    for start in np.flatnonzero(core):
+        if component[start] >= 0:
+            continue
+        component[start] = start
+        stack = [start]
+        while stack:
+            i = stack.pop()
+            for j in np.flatnonzero(near[i] & core):
+                if component[j] < 0:
+                    component[j] = start
+                    stack.append(j)
+    return component
+
+
+def _random_case(rng):
+    n = int(rng.integers(1, 120))
+    bursts = int(rng.integers(1, 6))
+    centres_t = rng.uniform(0, 30 * 86400, bursts)
+    centres = rng.uniform([46.0, 16.0], [48.5, 22.5], (bursts, 2))
+    which = rng.integers(0, bursts, n)
+    times = centres_t[which] + rng.normal(0, rng.uniform(600, 3 * GAP), n)
+    spread = rng.uniform(0.001, 0.08)
+    lats = centres[which, 0] + rng.normal(0, spread, n)
+    lons = centres[which, 1] + rng.normal(0, spread, n)
+    return times, lats, lons, int(rng.integers(1, 8))
+
+
+def _assert_dbscan(times, lats, lons, min_photos):
+    """
+    A címkék egyeznek a páronkénti DBSCAN-nel (a komponensek számozásától eltekintve)
+    """
+    times, lats, lons = (np.asarray(a, dtype=float) for a in (times, lats, lons))
+    labels = cluster_events(times, lats, lons, GAP, RADIUS_KM, min_photos)
+    core, near = _brute_force(times, lats, lons, GAP, RADIUS_KM, min_photos)
+    component = _core_components(core, near)
+
+    # magpontok: azonos esemény ⇔ azonos komponens
+    core_ids = np.flatnonzero(core)
+    assert (labels[core_ids] >= 0).all()
+    same_label = labels[core_ids][:, None] == labels[core_ids][None, :]
+    same_component = component[core_ids][:, None] == component[core_ids][None, :]
+    assert (same_label == same_component).all()
+
+    # határpontok: egy szomszédos magpont eseményébe kerülnek; magpont nélküli környezetben zaj
+    for i in np.flatnonzero(~core):
+        neighbours = np.flatnonzero(near[i] & core)
+        if len(neighbours):
+            assert labels[i] in set(labels[neighbours].tolist())
+        else:
+            assert labels[i] == -1
+    return labels
+
+
+@pytest.mark.parametrize("seed", [0, 1, 7, 42, 1234])
+def test_matches_brute_force_dbscan(seed):
+    _assert_dbscan(*_random_case(np.random.default_rng(seed)))
+
+
+def test_time_gap_splits_events():
+    times = np.concatenate([np.arange(4) * 600.0, np.arange(4) * 600.0 + 2 * 86400])
+    labels = _assert_dbscan(times, np.full(8, 47.5), np.full(8, 19.0), 3)
+    assert labels.tolist() == [0] * 4 + [1] * 4
+
+
+def test_distance_splits_simultaneous_events():
+    # Budapest és Debrecen, ugyanabban az órában
+    times = np.tile(np.arange(4) * 600.0, 2)
+    lats = np.array([47.50] * 4 + [47.53] * 4)
+    lons = np.array([19.04] * 4 + [21.63] * 4)
+    labels = _assert_dbscan(times, lats, lons, 3)
+    assert labels.tolist() == [0] * 4 + [1] * 4
+
+
+def test_chain_of_core_photos_is_one_event():
+    # 10 óránként egy kép: csak a szomszédok vannak az időablakon belül, a lánc mégis egy esemény
+    times = np.arange(6) * 10 * 3600.0
+    labels = _assert_dbscan(times, np.full(6, 47.5), np.full(6, 19.0), 3)
+    assert labels.tolist() == [0] * 6
+
+
+def test_border_and_noise_photos():
+    # a 4. kép csak egy magpont környezetében van (határpont), az 5. semelyikében (zaj)
+    times = np.array([0.0, 600.0, 1200.0, 1200.0 + 15.9 * 3600, 5 * 86400])
+    labels = _assert_dbscan(times, np.full(5, 47.5), np.full(5, 19.0), 3)
+    assert labels.tolist() == [0, 0, 0, 0, -1]
+
+
+def test_labels_ordered_by_start_time():
+    times = np.concatenate([np.arange(5) * 60.0 + 10 * 86400, np.arange(5) * 60.0])
+    lats, lons = np.full(10, 47.5), np.full(10, 19.0)
+    labels = cluster_events(times, lats, lons, GAP, RADIUS_KM, 5)
+    assert labels.tolist() == [1] * 5 + [0] * 5
+
+
+def test_missing_gps_inherits_previous_position():
+    times = np.arange(6) * 600.0
+    lats = np.array([47.5, np.nan, np.nan, 47.5, np.nan, 47.5])
+    lons = np.array([19.0, np.nan, np.nan, 19.0, np.nan, 19.0])
+    labels = cluster_events(times, lats, lons, GAP, RADIUS_KM, 6)
+    assert labels.tolist() == [0] * 6
+
+
+def test_empty():
+    assert cluster_events([], [], [], GAP, RADIUS_KM, 5).tolist() == []
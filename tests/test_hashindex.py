@@ -0,0 +1,63 @@
+from file_utils.hashindex import HashIndex, RunCopies, file_hash, is_same_content
+
+
+def _file(path, data: bytes):
+    path.write_bytes(data)
+    return path, path.stat()
+
+
+def test_copies_held_until_first_settles(tmp_path):
+    copies = RunCopies()
+    first, st1 = _file(tmp_path / "a.pdf", b"azonos")
+    second, st2 = _file(tmp_path / "b.pdf", b"azonos")
+    third, st3 = _file(tmp_path / "c.pdf", b"masikk")  # azonos méret, más tartalom
+
+    assert copies.hold(first, st1, None) == (None, False)  # egyedüli méret: nincs hash
+    digest, held = copies.hold(second, st2, None)
+    assert held and digest == file_hash(second)
+    assert copies.hold(third, st3, None) == (file_hash(third), False)
+
+    assert copies.settle(first, st1) == [(second, st2, digest)]
+    assert copies.settle(third, st3) == []
+    assert copies.by_size == {} and copies.first == {} and copies.digests == {}
+
+
+def test_digest_from_index_registers_first_copy(tmp_path):
+    copies = RunCopies()
+    first, st1 = _file(tmp_path / "a.pdf", b"azonos")
+    second, st2 = _file(tmp_path / "b.pdf", b"azonos")
+    digest = file_hash(first)
+    assert copies.hold(first, st1, digest) == (digest, False)
+    assert copies.hold(second, st2, None) == (digest, True)
+
+
+def test_first_copy_already_moved_is_not_a_match(tmp_path):
+    copies = RunCopies()
+    first, st1 = _file(tmp_path / "a.pdf", b"azonos")
+    second, st2 = _file(tmp_path / "b.pdf", b"azonos")
+    copies.hold(first, st1, None)
+    first.unlink()  # a kezelője közben áthelyezte
+    assert copies.hold(second, st2, None) == (file_hash(second), False)
+
+
+def test_index_finds_sorted_content_by_size_then_hash(tmp_path):
+    index = HashIndex(tmp_path / "index.sqlite")
+    destination, st = _file(tmp_path / "rendezett.pdf", b"tartalom")
+    index.record(tmp_path / "regi.pdf", st, None, destination)  # egyedüli méret: hash nélkül rögzítve
+
+    copy, copy_st = _file(tmp_path / "uj.pdf", b"tartalom")
+    other, other_st = _file(tmp_path / "masik.pdf", b"tartalmaz")
+    assert index.lookup(copy, copy_st) == (file_hash(copy), destination)
+    assert index.lookup(other, other_st) == (None, None)
+    index.close()
+
+
+def test_same_content_rechecks_destination(tmp_path):
+    destination, st = _file(tmp_path / "rendezett.pdf", b"tartalom")
+    digest = file_hash(destination)
+    assert is_same_content(destination, st.st_size, digest)
+    assert not is_same_content(destination, st.st_size, None)
+    destination.write_bytes(b"masvalam")  # azonos méret, lecserélt tartalom
+    assert not is_same_content(destination, st.st_size, digest)
+    destination.unlink()
+    assert not is_same_content(destination, st.st_size, digest)
@@ -0,0 +1,103 @@
+from pathlib import Path
+
+from file_utils.journal import Journal, read_journal, recover, release_lock, try_lock, undo
+
+
+def _journal(directory: Path) -> Journal:
+    return Journal.create(directory / "journal")
+
+
+def _ops(journal: Journal) -> list:
+    return [r["op"] for r in read_journal(journal.path)]
+
+
+def _crash(journal: Journal):
+    # a folyamat halála: a zár elengedődik, "end" bejegyzés nélkül
+    release_lock(journal.path, journal.lock_fd)
+    journal.lock_fd = None
+
+
+def test_recover_settles_interrupted_moves(tmp_path):
+    journal = _journal(tmp_path)
+    moved_src, moved_dst = tmp_path / "a.pdf", tmp_path / "out" / "a.pdf"
+    moved_dst.parent.mkdir()
+    moved_dst.write_bytes(b"kesz")  # áthelyezve, a "done" már nem íródott ki
+    journal.intent(moved_src, moved_dst)
+
+    waiting_src, waiting_dst = tmp_path / "b.pdf", tmp_path / "out" / "b.pdf"
+    waiting_src.write_bytes(b"el sem indult")
+    journal.intent(waiting_src, waiting_dst)
+
+    copied_src, copied_dst = tmp_path / "c.pdf", tmp_path / "out" / "c.pdf"
+    copied_src.write_bytes(b"teljes masolat")
+    copied_dst.write_bytes(b"teljes masolat")  # a másolás kész, a forrás törlése elmaradt
+    journal.intent(copied_src, copied_dst)
+
+    partial_src, partial_dst = tmp_path / "d.pdf", tmp_path / "out" / "d.pdf"
+    partial_src.write_bytes(b"csonka masolat")
+    partial_dst.write_bytes(b"csonka")
+    journal.intent(partial_src, partial_dst)
+    _crash(journal)
+
+    assert recover(tmp_path / "journal") == {"done": 2, "rolledback": 2}
+    assert moved_dst.exists() and not moved_src.exists()
+    assert waiting_src.exists() and not waiting_dst.exists()
+    assert copied_dst.exists() and not copied_src.exists()
+    assert partial_src.read_bytes() == b"csonka masolat" and not partial_dst.exists()
+    assert _ops(journal)[-1] == "end"
+    # a lezárt napló nem kerül újra sorra
+    assert recover(tmp_path / "journal") == {}
+
+
+def test_recover_skips_live_run(tmp_path):
+    journal = _journal(tmp_path)
+    source = tmp_path / "a.pdf"
+    source.write_bytes(b"x")
+    journal.intent(source, tmp_path / "out" / "a.pdf")
+
+    assert recover(tmp_path / "journal") == {}
+    assert "end" not in _ops(journal)
+    journal.end()
+    assert _ops(journal)[-1] == "end"
+
+
+def test_undo_restores_moves_of_last_run(tmp_path):
+    journal = _journal(tmp_path)
+    moves = []
+    for name in ("a.pdf", "b.pdf"):
+        source, destination = tmp_path / name, tmp_path / "out" / name
+        destination.parent.mkdir(exist_ok=True)
+        destination.write_bytes(name.encode())
+        journal.done(journal.intent(source, destination))
+        moves.append((source, destination))
+    journal.failed(journal.intent(tmp_path / "c.pdf", tmp_path / "out" / "c.pdf"))
+    journal.end()
+
+    assert undo(directory=tmp_path / "journal") == 2
+    for source, destination in moves:
+        assert source.exists() and not destination.exists()
+    assert _ops(journal).count("undone") == 2
+    # ismételt futtatásnál nincs több visszafordítható áthelyezés
+    assert undo(journal.run_id, tmp_path / "journal") == 0
+
+
+def test_undo_refuses_live_run(tmp_path):
+    journal = _journal(tmp_path)
+    source, destination = tmp_path / "a.pdf", tmp_path / "b.pdf"
+    destination.write_bytes(b"x")
+    journal.done(journal.intent(source, destination))
+
+    assert undo(journal.run_id, tmp_path / "journal") == 0
+    assert destination.exists() and not source.exists()
+    journal.end()
+
+
+def test_lock_is_exclusive(tmp_path):
+    path = tmp_path / "run.jsonl"
+    fd = try_lock(path)
+    assert fd is not None
+    assert try_lock(path) is None
+    release_lock(path, fd)
+    fd = try_lock(path)
+    assert fd is not None
+    release_lock(path, fd)
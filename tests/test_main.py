@@ -0,0 +1,65 @@
+from main import check_index, drop_run_copies, move_to_known
+from file_utils.hashindex import HashIndex, RunCopies, file_hash
+
+
+def _file(path, data: bytes):
+    path.write_bytes(data)
+    return path, path.stat()
+
+
+def test_duplicate_of_sorted_file_is_deleted(tmp_path):
+    index = HashIndex(tmp_path / "index.sqlite")
+    destination, st = _file(tmp_path / "rendezett.pdf", b"tartalom")
+    index.record(tmp_path / "regi.pdf", st, file_hash(destination), destination)
+    copy, copy_st = _file(tmp_path / "uj.pdf", b"tartalom")
+    pending = {}
+
+    assert check_index(index, copy, pending, copy_st) is None
+    assert not copy.exists() and destination.exists() and pending == {}
+    index.close()
+
+
+def test_changed_destination_is_not_a_duplicate(tmp_path):
+    index = HashIndex(tmp_path / "index.sqlite")
+    destination, st = _file(tmp_path / "rendezett.pdf", b"tartalom")
+    index.record(tmp_path / "regi.pdf", st, file_hash(destination), destination)
+    destination.write_bytes(b"masvalam")  # a célfájl azóta lecserélődött
+    copy, copy_st = _file(tmp_path / "uj.pdf", b"tartalom")
+    pending = {}
+
+    handler, kind = check_index(index, copy, pending, copy_st)
+    assert copy.exists() and kind == "io"
+    assert handler.func is move_to_known and handler.keywords == {"destination": destination}
+    assert pending == {copy: (copy_st, file_hash(copy))}
+    index.close()
+
+
+def test_copies_in_same_run_deleted_after_first_is_sorted(tmp_path):
+    index = HashIndex(tmp_path / "index.sqlite")
+    copies = RunCopies()
+    pending = {}
+    first, st1 = _file(tmp_path / "a.txt", b"azonos")
+    second, st2 = _file(tmp_path / "b.txt", b"azonos")
+
+    assert check_index(index, first, pending, st1, copies=copies) is not None
+    assert check_index(index, second, pending, st2, copies=copies) is None
+    assert second.exists() and list(pending) == [first]
+
+    destination = tmp_path / "out" / "a.txt"
+    destination.parent.mkdir()
+    first.rename(destination)
+    drop_run_copies(copies.settle(first, st1), destination)
+    assert not second.exists() and destination.exists()
+    index.close()
+
+
+def test_copy_kept_when_first_lands_with_other_content(tmp_path):
+    copies = RunCopies()
+    first, st1 = _file(tmp_path / "a.txt", b"azonos")
+    second, st2 = _file(tmp_path / "b.txt", b"azonos")
+    copies.hold(first, st1, None)
+    copies.hold(second, st2, None)
+
+    destination, _ = _file(tmp_path / "masik.txt", b"eltero")
+    drop_run_copies(copies.settle(first, st1), destination)
+    assert second.exists()
@@ -0,0 +1,83 @@
+import os
+from pathlib import Path
+
+import pytest
+
+from file_utils import mover
+from file_utils.common import PlannedMove
+from file_utils.hashindex import file_hash
+from file_utils.mover import copy_with_checksum, execute_plan, resolve_plan
+
+
+def test_resolve_plan_starts_from_requested_name(tmp_path):
+    (tmp_path / "szamla.pdf").write_bytes(b"x")
+    # két worker külön foglalt, mindkettő ugyanazt a toldalékolt nevet kapta
+    entries = [
+        PlannedMove(Path("a.pdf"), tmp_path / "szamla(1).pdf", "PDF", tmp_path / "szamla.pdf"),
+        PlannedMove(Path("b.pdf"), tmp_path / "szamla(1).pdf", "PDF", tmp_path / "szamla.pdf"),
+        PlannedMove(Path("c.pdf"), tmp_path / "masik.pdf", "PDF"),
+        PlannedMove(Path("d.tmp"), None, "ideiglenes fájl"),
+    ]
+    resolved = resolve_plan(entries)
+    assert [e.destination.name if e.destination else None for e in resolved] == \
+        ["szamla(1).pdf", "szamla(2).pdf", "masik.pdf", None]
+    assert not (tmp_path / "szamla(1).pdf").exists()
+
+
+def _cross_device(monkeypatch, source_dir: Path):
+    """A source_dir-beli fájlok más eszközön lévőnek látszanak (a másolós ág kikényszerítése)"""
+    real_stat = os.stat
+
+    def stat(path, *args, **kwargs):
+        st = real_stat(path, *args, **kwargs)
+        if Path(path).parent == source_dir:
+            return os.stat_result((st.st_mode, st.st_ino, st.st_dev + 1, *st[3:]))
+        return st
+
+    monkeypatch.setattr(os, "stat", stat)
+
+
+def test_copy_with_checksum_hashes_while_copying(tmp_path):
+    data = os.urandom(300_000)
+    source, destination = tmp_path / "forras.bin", tmp_path / "cel.bin"
+    source.write_bytes(data)
+    digest = copy_with_checksum(source, destination, chunk_size=64 * 1024)
+    assert destination.read_bytes() == data and digest == file_hash(source)
+    # létező célt nem ír felül
+    with pytest.raises(FileExistsError):
+        copy_with_checksum(source, destination)
+
+
+def test_cross_device_move_copies_then_deletes_source(tmp_path, monkeypatch):
+    (tmp_path / "be").mkdir()
+    source = tmp_path / "be" / "szamla.pdf"
+    source.write_bytes(b"tartalom")
+    _cross_device(monkeypatch, tmp_path / "be")
+
+    [(entry, target)] = execute_plan([PlannedMove(source, tmp_path / "ki" / "szamla.pdf", "PDF")], verify=True)
+    assert target == tmp_path / "ki" / "szamla.pdf"
+    assert target.read_bytes() == b"tartalom" and not source.exists()
+
+
+def test_cross_device_checksum_mismatch_keeps_source(tmp_path, monkeypatch):
+    (tmp_path / "be").mkdir()
+    source = tmp_path / "be" / "szamla.pdf"
+    source.write_bytes(b"tartalom")
+    _cross_device(monkeypatch, tmp_path / "be")
+    real_copy = mover.copy_with_checksum
+    monkeypatch.setattr(mover, "copy_with_checksum", lambda src, dst: real_copy(src, dst) and "0" * 40)
+
+    [(entry, target)] = execute_plan([PlannedMove(source, tmp_path / "ki" / "szamla.pdf", "PDF")], verify=True)
+    assert target is None
+    assert source.read_bytes() == b"tartalom" and not (tmp_path / "ki" / "szamla.pdf").exists()
+
+
+def test_same_device_move_renames(tmp_path):
+    source = tmp_path / "szamla.pdf"
+    source.write_bytes(b"tartalom")
+    (tmp_path / "ki").mkdir()
+    (tmp_path / "ki" / "szamla.pdf").write_bytes(b"masik")
+
+    [(entry, target)] = execute_plan([PlannedMove(source, tmp_path / "ki" / "szamla.pdf", "PDF")])
+    assert target == tmp_path / "ki" / "szamla(1).pdf"
+    assert target.read_bytes() == b"tartalom" and not source.exists()
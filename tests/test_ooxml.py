@@ -0,0 +1,70 @@
+import io
+import zipfile
+
+from file_utils.ooxml import _shared_strings, iter_xlsx_rows, read_docx_text, read_xlsx_text
+
+W = 'xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"'
+S = 'xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"'
+
+
+def _package(parts: dict) -> io.BytesIO:
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as zf:
+        for name, xml in parts.items():
+            zf.writestr(name, xml)
+    buf.seek(0)
+    return buf
+
+
+def _xlsx(strings, rows):
+    sst = "".join(f"<si><t>{s}</t></si>" for s in strings)
+    sheet = "".join(
+        "<row>" + "".join(f'<c t="s"><v>{i}</v></c>' for i in row) + "</row>" for row in rows)
+    return _package({"xl/sharedStrings.xml": f"<sst {S}>{sst}</sst>",
+                     "xl/worksheets/sheet1.xml": f"<worksheet {S}><sheetData>{sheet}</sheetData></worksheet>"})
+
+
+def test_docx_paragraphs_in_tables():
+    body = ("<w:p><w:r><w:t>Számla</w:t></w:r></w:p>"
+            "<w:tbl><w:tr><w:tc><w:p><w:r><w:t>A</w:t><w:tab/><w:t>B</w:t></w:r></w:p></w:tc></w:tr></w:tbl>"
+            "<w:p><w:r><w:t>vége</w:t></w:r></w:p>")
+    docx = _package({"word/document.xml": f"<w:document {W}><w:body>{body}</w:body></w:document>"})
+    assert read_docx_text(docx) == "Számla\nA\tB\nvége"
+
+
+def test_docx_nested_paragraph_keeps_outer_text():
+    # szövegdoboz: a külső bekezdés futásai között egy belső bekezdés
+    body = ("<w:p><w:r><w:t>előtte </w:t></w:r>"
+            "<w:r><w:txbxContent><w:p><w:r><w:t>doboz</w:t></w:r></w:p></w:txbxContent></w:r>"
+            "<w:r><w:t>utána</w:t></w:r></w:p>")
+    docx = _package({"word/document.xml": f"<w:document {W}><w:body>{body}</w:body></w:document>"})
+    assert read_docx_text(docx) == "doboz\nelőtte utána"
+
+
+def test_xlsx_rows_resolve_shared_strings():
+    xlsx = _xlsx(["név", "összeg", "Kiss", "100"], [[0, 1], [2, 3]])
+    assert read_xlsx_text(xlsx) == "név\tösszeg\nKiss\t100"
+
+
+def test_shared_strings_capped_by_length():
+    xlsx = _xlsx(["a" * 10, "b" * 10, "c" * 10, "d"], [[0, 1, 2, 3]])
+    with zipfile.ZipFile(xlsx) as zf:
+        assert _shared_strings(zf, 15) == ["a" * 10]
+        assert _shared_strings(zf, 20) == ["a" * 10, "b" * 10]
+    xlsx.seek(0)
+    # a kereten túli szövegekre hivatkozó cellák üresek
+    assert list(iter_xlsx_rows(xlsx, max_string_bytes=15)) == ["a" * 10 + "\t\t\t"]
+
+
+def test_xlsx_first_sheet_follows_workbook_order():
+    # a munkafüzet első lapja a sheet2.xml-re mutat (átrendezett lapok)
+    rows = lambda text: f"<worksheet {S}><sheetData><row><c t=\"inlineStr\"><is><t>{text}</t></is></c></row></sheetData></worksheet>"
+    workbook = (f'<workbook {S} xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+                '<sheets><sheet name="Összesítő" sheetId="2" r:id="rId2"/><sheet name="Adatok" sheetId="1" r:id="rId1"/></sheets>'
+                '</workbook>')
+    rels = ('<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            '<Relationship Id="rId1" Target="worksheets/sheet1.xml"/>'
+            '<Relationship Id="rId2" Target="/xl/worksheets/sheet2.xml"/></Relationships>')
+    xlsx = _package({"xl/workbook.xml": workbook, "xl/_rels/workbook.xml.rels": rels,
+                     "xl/worksheets/sheet1.xml": rows("adatok"), "xl/worksheets/sheet2.xml": rows("összesítő")})
+    assert read_xlsx_text(xlsx) == "összesítő"
@@ -0,0 +1,26 @@
+import fitz
+
+from file_utils.pdf import classify_pdf
+
+
+def _pdf(path, *pages: str):
+    doc = fitz.open()
+    for text in pages:
+        doc.new_page().insert_text((72, 72), text)
+    doc.save(str(path))
+    doc.close()
+    return path
+
+
+def test_non_invoice_stops_after_type_and_date(tmp_path):
+    path = _pdf(tmp_path / "szerzodes.pdf", "Szerzodes 2023-01-02", "masodik oldal", "harmadik oldal")
+    classifier = classify_pdf(path)
+    assert (classifier.tipus, classifier.datum) == ("SZERZODES", "2023-01-02")
+    assert len(classifier.parts) == 1
+
+
+def test_invoice_reads_on_until_invoice_number(tmp_path):
+    path = _pdf(tmp_path / "szamla.pdf", "Szamla 2023-01-02", "Sorszam: A-17", "harmadik oldal")
+    classifier = classify_pdf(path)
+    assert (classifier.tipus, classifier.szamla) == ("SZAMLA", "A-17")
+    assert len(classifier.parts) == 2
@@ -0,0 +1,69 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from file_utils.rules import RuleEngine
+
+RULES = json.loads((Path(__file__).parent.parent / "pdf_rules.json").read_text(encoding="utf-8"))
+
+
+@pytest.fixture(scope="module")
+def engine():
+    return RuleEngine(RULES)
+
+
+def test_date_inside_invoice_number(engine):
+    result = engine.scan("Számla sorszám: 2023-05-04-0017")
+    assert result.szamla == "2023-05-04-0017"
+    assert result.datum == "2023-05-04"
+    assert result.scores["SZAMLA"] == 1
+
+
+def test_invoice_keyword_counted_inside_invoice_match(engine):
+    result = engine.scan("Számlasorszám: ABC-123, kelt 2023.06.30.")
+    assert result.szamla == "ABC-123,"
+    assert result.datum == "2023-06-30"
+    assert result.scores["SZAMLA"] == 1
+
+
+def test_first_date_and_invoice_independent_of_order(engine):
+    result = engine.scan("Kelt: 2022-01-15\nSorszám: 2023-05-04-0017\nInvoice 2024-02-02")
+    assert result.datum == "2022-01-15"
+    assert result.szamla == "2023-05-04-0017"
+    assert result.scores["SZAMLA"] == 1
+
+
+def test_no_matches(engine):
+    result = engine.scan("semmi érdekes")
+    assert (result.datum, result.szamla, result.scores) == (None, None, {})
+
+
+def test_missing_patterns():
+    result = RuleEngine({"types": RULES["types"]}).scan("Számla sorszám: 2023-05-04-0017")
+    assert (result.datum, result.szamla) == (None, None)
+    assert result.scores["SZAMLA"] == 1
+
+
+def test_invoice_number_keeps_original_accents(engine):
+    result = engine.scan("Sorszám: ÁRV-2023/ő17 – számla")
+    assert result.szamla == "ÁRV-2023/ő17"
+    assert result.scores["SZAMLA"] == 1
+
+
+def test_accents_do_not_shift_spans(engine):
+    result = engine.scan("€€ ﬁ árvíztűrő tükörfúrógép, kelt 2023.06.30, sorszám: X-1")
+    assert (result.datum, result.szamla) == ("2023-06-30", "X-1")
+
+
+def test_character_class_paren_is_not_the_capture_group():
+    engine = RuleEngine({"types": [], "invoice": r"[(#]?sorszám[)]?\s*(\d+)", "date": r"[(](\d{4})[)]"})
+    result = engine.scan("(Sorszám) 4711, év: (2024)")
+    assert (result.szamla, result.datum) == ("4711", "2024")
+
+
+def test_pattern_without_capture_group_falls_back_to_default(tmp_path):
+    path = tmp_path / "rules.json"
+    path.write_text(json.dumps({"types": [], "invoice": r"sorszám:\s*\S+"}), encoding="utf-8")
+    engine = RuleEngine.from_file(path, RULES)
+    assert engine.rules is RULES
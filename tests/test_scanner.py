@@ -0,0 +1,53 @@
+import os
+
+from file_utils.scanner import ScanCheckpoint, scan
+
+
+def _names(found) -> set:
+    return {path.name for path, st in found}
+
+
+def test_scan_yields_files_with_stat(tmp_path):
+    (tmp_path / "a" / "b").mkdir(parents=True)
+    (tmp_path / "egy.pdf").write_bytes(b"1")
+    (tmp_path / "a" / "b" / "ketto.pdf").write_bytes(b"22")
+
+    found = list(scan(tmp_path))
+    assert _names(found) == {"egy.pdf", "ketto.pdf"}
+    assert {path.name: st.st_size for path, st in found} == {"egy.pdf": 1, "ketto.pdf": 2}
+
+
+def test_checkpoint_skips_unchanged_directories(tmp_path):
+    root, inner = tmp_path / "be", tmp_path / "be" / "belso"
+    inner.mkdir(parents=True)
+    (inner / "kesz.pdf").write_bytes(b"x")
+    checkpoint = ScanCheckpoint(tmp_path / "checkpoint.json")
+    for path, st in scan(root, checkpoint):
+        path.unlink()  # feldolgozva
+    checkpoint.save()
+
+    # változatlan mtime mellett becsempészett fájl: a könyvtár nem listázódik újra
+    st = os.stat(inner)
+    (inner / "rejtett.pdf").write_bytes(b"x")
+    os.utime(inner, ns=(st.st_atime_ns, st.st_mtime_ns))
+    # új fájl a gyökérben: a gyökér mtime-ja változik, az újra listázódik
+    (root / "uj.pdf").write_bytes(b"x")
+
+    assert _names(scan(root, ScanCheckpoint(tmp_path / "checkpoint.json"))) == {"uj.pdf"}
+
+
+def test_directory_with_leftover_files_is_not_checkpointed(tmp_path):
+    root = tmp_path / "be"
+    root.mkdir()
+    (root / "tul_friss.pdf").write_bytes(b"x")
+    checkpoint = ScanCheckpoint(tmp_path / "checkpoint.json")
+    list(scan(root, checkpoint))  # a fájl a helyén marad
+    checkpoint.save()
+
+    assert _names(scan(root, ScanCheckpoint(tmp_path / "checkpoint.json"))) == {"tul_friss.pdf"}
+
+
+def test_corrupt_checkpoint_starts_empty(tmp_path):
+    path = tmp_path / "checkpoint.json"
+    path.write_text("{csonka", encoding="utf-8")
+    assert ScanCheckpoint(path).dirs == {}
@@ -0,0 +1,102 @@
+import time
+from functools import partial
+from pathlib import Path
+
+from file_utils import scheduler
+from file_utils.scheduler import RateLimiter, Scheduler
+
+
+def kepek(file_path, header=None):
+    return file_path
+
+
+def dokumentumok(file_path, header=None):
+    return file_path
+
+
+def test_fill_reads_jobs_only_up_to_window():
+    consumed = []
+
+    def jobs():
+        for i in range(10):
+            consumed.append(i)
+            yield kepek, "io", Path(f"{i}.jpg")
+
+    sched = Scheduler({"io": 2}, window=3)
+    it = jobs()
+    sched.fill(it, on_batch=None)
+    assert len(sched) == 3 and consumed == [0, 1, 2] and not sched.exhausted
+
+    sched.pop()
+    sched.fill(it, on_batch=None)
+    assert len(sched) == 3 and consumed == [0, 1, 2, 3]
+
+
+def test_batch_jobs_bypass_the_queue():
+    batched = []
+    sched = Scheduler({"io": 1}, window=5)
+    sched.fill(iter([(kepek, "batch", Path("a.mp3")), (kepek, "io", Path("b.jpg"))]),
+               on_batch=lambda handler, path: batched.append(path))
+    assert batched == [Path("a.mp3")] and len(sched) == 1 and sched.exhausted
+
+
+def test_cheapest_job_first_across_lanes():
+    sched = Scheduler({"cpu": 4})
+    sched.push(dokumentumok, "cpu", Path("nagy.pdf"), size=500 * 1024 * 1024)
+    sched.push(kepek, "cpu", Path("kicsi.jpg"), size=1024)
+    sched.push(dokumentumok, "cpu", Path("kozepes.pdf"), size=1024 * 1024)
+    order = [sched.pop()[2].name for _ in range(3)]
+    assert order == ["kicsi.jpg", "kozepes.pdf", "nagy.pdf"]
+
+
+def test_capacity_and_lane_limit_hold_back_jobs(monkeypatch):
+    monkeypatch.setitem(scheduler.SCHEDULER_LANES, "dokumentumok", {"limit": 1})
+    sched = Scheduler({"cpu": 2, "io": 1})
+    for name in ("a.pdf", "b.pdf"):
+        sched.push(dokumentumok, "cpu", Path(name), size=0)
+    sched.push(kepek, "io", Path("c.jpg"), size=0)
+
+    first = sched.pop()
+    second = sched.pop()
+    assert {first[2].name, second[2].name} == {"a.pdf", "c.jpg"}
+    assert sched.pop() is None  # a pdf sáv korlátja 1
+    sched.release(first[3] if first[1] == "cpu" else second[3])
+    assert sched.pop()[2].name == "b.pdf"
+
+
+def test_occupy_reserves_capacity_outside_lanes():
+    sched = Scheduler({"io": 1})
+    sched.push(kepek, "io", Path("a.jpg"), size=0)
+    sched.occupy("io")  # pl. egy köteg fut az I/O szálon
+    assert sched.pop() is None
+    sched.occupy("io", -1)
+    assert sched.pop()[2].name == "a.jpg"
+
+
+def test_rate_limited_lane_waits(monkeypatch):
+    monkeypatch.setitem(scheduler.SCHEDULER_LANES, "kepek", {"rate": 2})
+    sched = Scheduler({"io": 4})
+    for name in ("a.jpg", "b.jpg"):
+        sched.push(kepek, "io", Path(name), size=0)
+    now = time.monotonic()
+    assert sched.pop(now) is not None
+    assert sched.pop(now) is None
+    assert 0 < sched.wait_time(now) <= 0.5
+    assert sched.pop(now + 0.5) is not None
+
+
+def test_rate_limiter_refills_tokens():
+    limiter = RateLimiter(rate=4, burst=2)
+    assert limiter.reserve(now=limiter.updated) == 0
+    assert limiter.reserve(now=limiter.updated) == 0
+    assert limiter.ready_in(now=limiter.updated) == 0.25
+
+
+def test_only_a_few_queued_jobs_keep_their_header():
+    sched = Scheduler({"io": 2})
+    for i in range(5):
+        sched.push(partial(kepek, header=b"\xff\xd8"), "io", Path(f"{i}.jpg"), size=0)
+    kept = [keep for lane in sched.lanes.values() for *_, keep in lane.heap]
+    assert sum(kept) == 2 and sched.headers == 2
+    sched.pop()
+    assert sched.headers == 1
@@ -0,0 +1,73 @@
+import io
+import zipfile
+from pathlib import Path
+
+from file_utils.sniff import sniff, resolve_suffix
+
+PDF = b"%PDF-1.4\n1 0 obj << /Type /Catalog >> endobj\n%%EOF\n"
+
+
+def _stored_zip(*members: tuple[str, bytes]) -> bytes:
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", compression=zipfile.ZIP_STORED) as zf:
+        for name, data in members:
+            zf.writestr(name, data)
+    return buf.getvalue()
+
+
+def test_stored_zip_with_pdf_member_is_zip():
+    header = _stored_zip(("szamla.pdf", PDF), ("masik.pdf", PDF))
+    assert sniff(header) == "zip"
+    assert resolve_suffix(Path("szamlak.zip"), header) == ".zip"
+    assert resolve_suffix(Path("szamlak"), header) == ".zip"
+
+
+def test_nested_stored_zip_is_zip():
+    inner = _stored_zip(("szamla.pdf", PDF))
+    header = _stored_zip(("belso.zip", inner))
+    assert sniff(header) == "zip"
+
+
+def test_pdf_at_offset_zero():
+    assert sniff(PDF) == "pdf"
+    assert resolve_suffix(Path("letoltes.bin"), PDF) == ".pdf"
+
+
+def test_pdf_after_junk_prefix():
+    assert sniff(b"\r\n" * 100 + PDF) == "pdf"
+
+
+def test_fixed_magics_win_over_embedded_pdf():
+    tail = b"\0" * 64 + PDF
+    assert sniff(b"\x89PNG\r\n\x1a\n" + tail) == "png"
+    assert sniff(b"\xff\xd8\xff\xe0" + tail) == "jpeg"
+    assert sniff(b"MZ" + tail) == "exe"
+    assert sniff(b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1" + tail) == "ole2"
+
+
+def _ooxml(*parts: str) -> bytes:
+    return _stored_zip(("[Content_Types].xml", b"<Types/>"), *((part, b"<x/>") for part in parts))
+
+
+def test_ooxml_by_part_names():
+    assert sniff(_ooxml("_rels/.rels", "word/document.xml")) == "docx"
+    assert sniff(_ooxml("_rels/.rels", "xl/workbook.xml", "xl/worksheets/sheet1.xml")) == "xlsx"
+
+
+def test_zip_with_word_substring_in_member_name_is_zip():
+    header = _stored_zip(("password/notes.txt", b"titok"))
+    assert sniff(header) == "zip"
+    assert resolve_suffix(Path("backup.zip"), header) == ".zip"
+
+
+def test_zip_with_nested_xl_folder_is_zip():
+    header = _stored_zip(("excel/xl/report.txt", b"riport"))
+    assert sniff(header) == "zip"
+    assert resolve_suffix(Path("riportok.zip"), header) == ".zip"
+
+
+def test_stored_zip_with_docx_member_is_zip():
+    docx = _ooxml("word/document.xml")
+    header = _stored_zip(("level.docx", docx))
+    assert sniff(header) == "zip"
+    assert resolve_suffix(Path("levelek.zip"), header) == ".zip"
@@ -0,0 +1,26 @@
+import sqlite3
+import time
+
+from file_utils.textstore import TextStore
+
+
+def test_search_does_not_wait_for_a_writer(tmp_path):
+    db = tmp_path / "texts.sqlite"
+    store = TextStore(db)
+    store.put_text("abc", "Bérleti szerződés a lakásra")
+    store.record(tmp_path / "szerzodes.pdf", "abc", "pdf", "szerzodes.pdf", {"scores": {}, "datum": "2023-04-01", "szamla": None})
+    store.flush()
+
+    writer = sqlite3.connect(str(db))
+    writer.execute("BEGIN IMMEDIATE")  # egy futó rendezés írótranzakciója
+    try:
+        started = time.perf_counter()
+        reader = TextStore(db, readonly=True)
+        hits = reader.search("berleti", date="2023-04")
+        reader.close()
+        assert time.perf_counter() - started < 1
+    finally:
+        writer.rollback()
+        writer.close()
+        store.close()
+    assert [(path, date) for path, _, date, _, _ in hits] == [(str(tmp_path / "szerzodes.pdf"), "2023-04-01")]